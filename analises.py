@@ -0,0 +1,297 @@
+"""
+Cache persistente de análises em SQLite, indexado pela chave Zobrist da posição: lances legais, estado (xeque, mate,
+afogamento), melhor lance, valor e profundidade da busca. Cada execução continua de onde as anteriores pararam em
+vez de começar do zero.
+
+As gravações ficam num dicionário e vão em lote para uma thread de escrita com a sua própria conexão, então quem
+grava nunca espera o disco. O banco fica em modo WAL: processos trabalhadores abrem com somente_leitura=True e leem
+ao mesmo tempo que o escritor grava. Quando passa de `maximo` entradas, as usadas há mais tempo saem primeiro.
+
+    analises = Analises('analises.db')
+    analises.buscar(jogo.chave)    ->  Analise(lances, estado, lance, valor, profundidade) ou None
+    analises.gravar(jogo.chave, lance=codificar(*lance), valor=35, profundidade=6)
+    analises.fechar()
+
+    python analises.py info analises.db
+    python analises.py medir analises.db -n 30 -d 4    Tempo e acertos de uma passada fria e de uma quente
+"""
+import argparse
+import json
+import queue
+import sqlite3
+import sys
+import threading
+from array import array
+from collections import Counter, namedtuple
+from time import perf_counter, time
+
+# Campos sem análise ficam None. lances: códigos de transposicao.codificar de cada (origem, destino) legal;
+# estado: regras.NADA/XEQUE/MATE/AFOGADO; lance: código do melhor lance da busca, com valor e profundidade
+Analise = namedtuple('Analise', 'lances estado lance valor profundidade')
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS analises (
+    chave INTEGER PRIMARY KEY,
+    lances BLOB,
+    estado INTEGER,
+    lance INTEGER,
+    valor INTEGER,
+    profundidade INTEGER,
+    usado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analises_usado ON analises (usado);
+"""
+
+# Campos que chegam como None não apagam o que já está gravado; a busca só substitui uma análise mais rasa
+_ATUALIZAR = """
+UPDATE analises SET
+    lances = COALESCE(:lances, lances),
+    estado = COALESCE(:estado, estado),
+    lance = CASE WHEN :profundidade >= COALESCE(profundidade, -1) THEN :lance ELSE lance END,
+    valor = CASE WHEN :profundidade >= COALESCE(profundidade, -1) THEN :valor ELSE valor END,
+    profundidade = CASE WHEN :profundidade >= COALESCE(profundidade, -1) THEN :profundidade ELSE profundidade END,
+    usado = :usado
+WHERE chave = :chave
+"""
+
+
+def _sinal(chave):
+    # O SQLite guarda inteiros de 64 bits com sinal
+    return chave - (1 << 64) if chave >= 1 << 63 else chave
+
+
+def _juntar(antiga, nova):
+    """
+    Sobrepõe os campos de `nova` aos de `antiga` com as mesmas regras de _ATUALIZAR.
+    """
+    if antiga is None:
+        return nova
+    lances = nova.lances if nova.lances is not None else antiga.lances
+    estado = nova.estado if nova.estado is not None else antiga.estado
+    if nova.profundidade is not None and nova.profundidade >= (antiga.profundidade or -1):
+        return Analise(lances, estado, nova.lance, nova.valor, nova.profundidade)
+    return Analise(lances, estado, antiga.lance, antiga.valor, antiga.profundidade)
+
+
+class Analises:
+    def __init__(self, caminho, maximo=1_000_000, validade=None, lote=512, somente_leitura=False):
+        """
+        :param maximo: Entradas guardadas; as usadas há mais tempo são descartadas
+        :param validade: Segundos sem uso depois dos quais uma entrada é descartada ao abrir (None: sem validade)
+        :param lote: Gravações acumuladas antes de irem para a thread de escrita
+        :param somente_leitura: Só consulta um banco já criado (processos trabalhadores); gravar é ignorado
+        """
+        self.caminho = caminho
+        self.maximo = maximo
+        self.lote = lote
+        self.somente_leitura = somente_leitura
+        self.contadores = Counter()
+        self.__pendentes = {}  # chave -> Analise ainda não entregue à thread de escrita
+        self.__usadas = {}  # chave -> momento da consulta que acertou, para a ordem de descarte
+        self.__trava = threading.Lock()
+        self.__escritor = None
+        if not somente_leitura:
+            with sqlite3.connect(caminho) as conexao:
+                conexao.execute('PRAGMA journal_mode=WAL')
+                conexao.executescript(_ESQUEMA)
+                if validade is not None:
+                    apagadas = conexao.execute('DELETE FROM analises WHERE usado < ?', (time() - validade,)).rowcount
+                    self.contadores['vencidas'] += apagadas
+            conexao.close()
+            self.__fila = queue.Queue()
+            self.__escritor = threading.Thread(target=self.__escrever, daemon=True)
+            self.__escritor.start()
+        self.__leitura = sqlite3.connect(f'file:{caminho}?mode=ro', uri=True, check_same_thread=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def buscar(self, chave, campo=None):
+        """
+        :param campo: Campo de Analise que quem consulta precisa; para as estatísticas, a consulta só acerta se ele
+            estiver preenchido
+        :return: Analise da posição (gravada ou ainda pendente) ou None
+        """
+        self.contadores['consultas'] += 1
+        linha = self.__leitura.execute('SELECT lances, estado, lance, valor, profundidade FROM analises '
+                                       'WHERE chave = ?', (_sinal(chave),)).fetchone()
+        analise = None
+        if linha is not None:
+            lances = linha[0]
+            analise = Analise(None if lances is None else tuple(array('H', lances)), *linha[1:])
+            if not self.somente_leitura:
+                with self.__trava:  # descarregar troca o dicionário enquanto outra thread consulta
+                    self.__usadas[chave] = time()
+                    cheio = len(self.__usadas) >= self.lote
+                if cheio:
+                    self.descarregar()
+        with self.__trava:
+            pendente = self.__pendentes.get(chave)
+        if pendente is not None:
+            analise = _juntar(analise, pendente)
+        acerto = analise is not None and (campo is None or getattr(analise, campo) is not None)
+        self.contadores['acertos' if acerto else 'falhas'] += 1
+        return analise
+
+    def gravar(self, chave, lances=None, estado=None, lance=None, valor=None, profundidade=None):
+        """
+        Guarda parte da análise de uma posição; os campos None mantêm o que já se sabe. Não espera o disco.
+        :param lances: Códigos dos lances legais (ver Analise)
+        """
+        if self.somente_leitura:
+            return
+        nova = Analise(None if lances is None else tuple(lances), estado, lance, valor, profundidade)
+        with self.__trava:
+            self.__pendentes[chave] = _juntar(self.__pendentes.get(chave), nova)
+            cheio = len(self.__pendentes) >= self.lote
+        self.contadores['gravacoes'] += 1
+        if cheio:
+            self.descarregar()
+
+    def descarregar(self):
+        """
+        Entrega as gravações pendentes à thread de escrita, sem esperar que cheguem ao disco.
+        """
+        if self.somente_leitura:
+            return
+        with self.__trava:
+            pendentes, self.__pendentes = self.__pendentes, {}
+            usadas, self.__usadas = self.__usadas, {}
+        if pendentes or usadas:
+            self.__fila.put((pendentes, usadas))
+
+    def sincronizar(self):
+        """
+        Descarrega e espera a thread de escrita gravar tudo.
+        """
+        if not self.somente_leitura:
+            self.descarregar()
+            self.__fila.join()
+
+    def fechar(self):
+        if self.__escritor is not None:
+            self.sincronizar()
+            self.__fila.put(None)
+            self.__escritor.join()
+            self.__escritor = None
+        self.__leitura.close()
+
+    def __escrever(self):
+        conexao = sqlite3.connect(self.caminho)
+        conexao.execute('PRAGMA synchronous=NORMAL')  # No WAL, só os checkpoints esperam o fsync
+        entradas = conexao.execute('SELECT COUNT(*) FROM analises').fetchone()[0]
+        while True:
+            tarefa = self.__fila.get()
+            if tarefa is None:
+                self.__fila.task_done()
+                break
+            pendentes, usadas = tarefa
+            agora = time()
+            with conexao:
+                antes = conexao.total_changes
+                conexao.executemany('INSERT OR IGNORE INTO analises (chave, usado) VALUES (?, ?)',
+                                    ((_sinal(chave), agora) for chave in pendentes))
+                entradas += conexao.total_changes - antes
+                conexao.executemany(_ATUALIZAR, (
+                    {'chave': _sinal(chave), 'usado': agora, 'estado': analise.estado, 'lance': analise.lance,
+                     'valor': analise.valor, 'profundidade': analise.profundidade,
+                     'lances': None if analise.lances is None else array('H', analise.lances).tobytes()}
+                    for chave, analise in pendentes.items()))
+                conexao.executemany('UPDATE analises SET usado = ? WHERE chave = ?',
+                                    ((momento, _sinal(chave)) for chave, momento in usadas.items()))
+                if entradas > self.maximo:
+                    # Descarta um décimo a mais para não voltar aqui a cada lote
+                    excesso = entradas - self.maximo + self.maximo // 10
+                    apagadas = conexao.execute('DELETE FROM analises WHERE chave IN '
+                                               '(SELECT chave FROM analises ORDER BY usado LIMIT ?)',
+                                               (excesso,)).rowcount
+                    entradas -= apagadas
+                    self.contadores['descartadas'] += apagadas
+            self.contadores['escritas'] += len(pendentes)
+            self.__fila.task_done()
+        conexao.close()
+
+    def entradas(self):
+        return self.__leitura.execute('SELECT COUNT(*) FROM analises').fetchone()[0]
+
+    def profundidades(self):
+        """
+        :return: {profundidade da busca (None sem busca): entradas}
+        """
+        return dict(self.__leitura.execute('SELECT profundidade, COUNT(*) FROM analises GROUP BY profundidade'))
+
+    def estatisticas(self):
+        consultas = self.contadores['consultas']
+        return {
+            'consultas': consultas,
+            'acertos': self.contadores['acertos'],
+            'taxa_acertos': round(self.contadores['acertos'] / consultas, 4) if consultas else None,
+            'gravacoes': self.contadores['gravacoes'],
+            'escritas': self.contadores['escritas'],
+            'descartadas': self.contadores['descartadas'] + self.contadores['vencidas'],
+            'entradas': self.entradas(),
+        }
+
+
+# Medição
+
+def medir(caminho, n=30, profundidade=4, semente=0):
+    """
+    Analisa as mesmas n posições de partidas aleatórias duas vezes até `profundidade`, cada passada com uma busca
+    nova (tabela de transposição vazia): a primeira começa com o cache frio, a segunda encontra o que a primeira
+    gravou.
+    :return: Tempo e estatísticas do cache de cada passada
+    """
+    from busca import Busca
+    from posicao import _partidas
+    from transposicao import Transposicao
+
+    jogos = [jogo.clonar() for jogo in _partidas(n, semente)]
+    res = {}
+    for passada in ('fria', 'quente'):
+        with Analises(caminho) as analises:
+            inicio = perf_counter()
+            for jogo in jogos:
+                jogo.analises = analises
+                jogo.estado()
+                Busca(Transposicao(4), analises=analises).best_move(jogo, None, profundidade)
+            segundos = perf_counter() - inicio
+            analises.sincronizar()
+            res[passada] = {'segundos': round(segundos, 3), **analises.estatisticas()}
+    return res
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cache persistente de análises')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    info = comandos.add_parser('info', help='Entradas e profundidades guardadas')
+    info.add_argument('banco')
+    medir_ = comandos.add_parser('medir', help='Duas passadas de busca sobre as mesmas posições')
+    medir_.add_argument('banco')
+    medir_.add_argument('-n', '--posicoes', type=int, default=30)
+    medir_.add_argument('-d', '--profundidade', type=int, default=4)
+    medir_.add_argument('--semente', type=int, default=0)
+    medir_.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args(argv)
+
+    if args.comando == 'info':
+        with Analises(args.banco, somente_leitura=True) as analises:
+            print(f'{analises.entradas():,} entradas')
+            for profundidade, quantas in sorted(analises.profundidades().items(), key=lambda item: item[0] or -1):
+                print(f'  profundidade {"-" if profundidade is None else profundidade:>3}: {quantas:,}')
+        return 0
+
+    res = medir(args.banco, args.posicoes, args.profundidade, args.semente)
+    for passada, dados in res.items():
+        print(passada, ' '.join(f'{nome}={valor}' for nome, valor in dados.items()))
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(res, arquivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
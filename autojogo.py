@@ -0,0 +1,170 @@
+"""
+Partidas do motor contra ele mesmo, sem tela, espalhadas por um pool de processos. Cada partida terminada vira uma
+linha JSON no arquivo de saída assim que acaba, sem guardar as outras na memória.
+
+    python autojogo.py -n 100 --brancas aleatorio --pretas profundidade:2 --saida partidas.jsonl
+
+Políticas: aleatorio, profundidade:N (busca até a profundidade N), tempo:MS (busca por MS milissegundos).
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+from collections import Counter
+from time import perf_counter
+
+from busca import Busca
+from finais import Finais
+from pecas import PROMOCOES, Supreme
+from perft import coordenadas
+from regras import Xadrez, MATE, AFOGADO
+from transposicao import Transposicao
+
+# Peças em que um peão pode promover, pelo nome (opção --promocao)
+PROMOVIDAS = {classe.__name__: classe for classe in PROMOCOES + (Supreme,)}
+
+POLITICAS = ('aleatorio', 'profundidade', 'tempo')
+
+
+def politica(descricao, semente=None, finais=None):
+    """
+    :param descricao: 'aleatorio', 'profundidade:N' ou 'tempo:MS'
+    :param finais: Tabelas de finais (finais.Finais) consultadas pelas buscas
+    :return: Função (jogo) -> lance (origem, destino, promocao)
+    """
+    nome, _, parametro = descricao.partition(':')
+    if nome == 'aleatorio':
+        gerador = random.Random(semente)
+        # Sem escolher a promoção: fica a peça configurada na partida
+        return lambda jogo: gerador.choice(list(jogo.legal_moves(jogo.vez)))
+    if nome not in POLITICAS:
+        raise ValueError(f'Política desconhecida: {descricao}')
+    busca = Busca(Transposicao(4), finais=finais)
+    if nome == 'profundidade':
+        return lambda jogo: busca.best_move(jogo.clonar(), None, int(parametro), historico=jogo.chaves)
+    return lambda jogo: busca.best_move(jogo.clonar(), int(parametro), historico=jogo.chaves)
+
+
+def jogar(brancas, pretas, semente=None, promocao='Supreme', limite=400, finais=None):
+    """
+    Joga uma partida até mate, afogamento, tripla repetição, `limite` meios-lances ou uma posição resolvida pelas
+    tabelas de finais.
+    :param promocao: Peça das promoções que a política não escolher (as buscas escolhem a sua)
+    :param finais: Pasta das tabelas de finais, usadas pelas buscas e para adjudicar a partida
+    :return: Registro da partida
+    :raise ValueError: Se `promocao` não é uma peça de PROMOVIDAS
+    """
+    classe = PROMOVIDAS.get(promocao)
+    if classe is None:
+        raise ValueError(f'Promoção inválida: {promocao} (use {", ".join(PROMOVIDAS)})')
+    tabelas = Finais(finais) if finais else None
+    jogo = Xadrez.inicial()
+    jogo.promocao = lambda cor: classe
+    jogo.finais = tabelas
+    jogadores = {'B': politica(brancas, semente, tabelas),
+                 'P': politica(pretas, None if semente is None else semente + 1, tabelas)}
+    estados = []  # O estado que mover() já calculou com __checker
+    teoricos = []  # O resultado das tabelas de finais que mover() já consultou
+
+    def ouvinte(evento, dados):
+        if evento == 'estado':
+            estados.append(dados['estado'])
+        elif evento == 'final':
+            teoricos.append(dados['resultado'])
+    jogo.ouvir(ouvinte)
+    lances = []
+    resultado, motivo = '1/2-1/2', 'limite'
+    inicio = perf_counter()
+    while len(lances) < limite:
+        origem, destino, promovida = jogadores[jogo.vez](jogo)
+        jogo.mover(origem, destino, promovida)
+        if promovida is None and '=' in jogo.moves[jogo.inv_cor(jogo.vez)][-1]:
+            promovida = classe
+        lances.append(coordenadas(origem, destino, promovida))
+        estado = estados.pop() if estados else None
+        if estado == MATE:
+            resultado, motivo = ('1-0' if jogo.vez == 'P' else '0-1'), 'mate'
+            break
+        if estado == AFOGADO:
+            motivo = 'afogado'
+            break
+        if jogo.chaves.count(jogo.chaves[-1]) >= 3:
+            motivo = 'repeticao'
+            break
+        if teoricos:
+            final = teoricos.pop()
+            if final:
+                resultado = '1-0' if (final > 0) == (jogo.vez == 'B') else '0-1'
+            motivo = 'tabela'
+            break
+    if tabelas is not None:
+        tabelas.fechar()
+    return {'brancas': brancas, 'pretas': pretas, 'resultado': resultado, 'motivo': motivo, 'semente': semente,
+            'lances': lances, 'notacao': [m for par in zip(jogo.moves['B'], jogo.moves['P'] + ['']) for m in par if m],
+            'segundos': round(perf_counter() - inicio, 4)}
+
+
+def _jogar(args):
+    return jogar(*args)
+
+
+def autojogo(n, brancas, pretas, saida, trabalhadores=None, promocao='Supreme', limite=400, semente=0,
+             alternar=False, finais=None):
+    """
+    Joga n partidas no pool e grava cada uma em `saida` (JSON por linha) assim que termina.
+    :param alternar: Troca as cores das políticas a cada partida
+    :param finais: Pasta das tabelas de finais (ver jogar)
+    :return: Resumo com partidas/s, lances/s e a distribuição dos resultados
+    """
+    def tarefas():
+        for i in range(n):
+            b, p = (pretas, brancas) if alternar and i % 2 else (brancas, pretas)
+            yield b, p, semente + 2 * i, promocao, limite, finais
+
+    resultados = Counter()
+    motivos = Counter()
+    total_lances = 0
+    inicio = perf_counter()
+    with multiprocessing.Pool(trabalhadores) as pool, open(saida, 'w') as arquivo:
+        for partida in pool.imap_unordered(_jogar, tarefas()):
+            arquivo.write(json.dumps(partida) + '\n')
+            resultados[partida['resultado']] += 1
+            motivos[partida['motivo']] += 1
+            total_lances += len(partida['lances'])
+    segundos = perf_counter() - inicio
+    return {
+        'partidas': n,
+        'lances': total_lances,
+        'segundos': round(segundos, 3),
+        'partidas_por_segundo': round(n / segundos, 3),
+        'lances_por_segundo': round(total_lances / segundos, 1),
+        'resultados': dict(resultados),
+        'motivos': dict(motivos),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Partidas do motor contra ele mesmo')
+    parser.add_argument('-n', '--partidas', type=int, default=10)
+    parser.add_argument('--brancas', default='aleatorio', help='aleatorio, profundidade:N ou tempo:MS')
+    parser.add_argument('--pretas', default='aleatorio', help='aleatorio, profundidade:N ou tempo:MS')
+    parser.add_argument('--trabalhadores', type=int, help='Processos (padrão: um por núcleo)')
+    parser.add_argument('--promocao', choices=list(PROMOVIDAS), default='Supreme')
+    parser.add_argument('--limite', type=int, default=400, help='Máximo de meios-lances por partida')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--alternar', action='store_true', help='Troca as cores a cada partida')
+    parser.add_argument('--saida', default='partidas.jsonl')
+    parser.add_argument('--finais', help='Pasta das tabelas de finais, para as buscas e para adjudicar')
+    args = parser.parse_args(argv)
+    for descricao in (args.brancas, args.pretas):
+        politica(descricao)  # Valida antes de subir o pool
+
+    resumo = autojogo(args.partidas, args.brancas, args.pretas, args.saida, args.trabalhadores, args.promocao,
+                      args.limite, args.semente, args.alternar, args.finais)
+    print(json.dumps(resumo, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
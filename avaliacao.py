@@ -0,0 +1,170 @@
+"""
+Avaliação por material e tabelas peça-casa, com meio-jogo e final interpolados pela fase.
+
+As posições mantêm a soma das tabelas (`pontos`) e a fase (`fase`) atualizadas a cada peça colocada, retirada
+ou movida, então avaliar uma folha custa O(1). Os pontos de meio-jogo e de final andam juntos num único inteiro
+(ver juntar/separar), e uma atualização é uma só soma.
+"""
+from pecas import *
+
+# Tabelas do ponto de vista das brancas, na numeração das casas (0 = a8, 63 = h1)
+_PEAO = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+)
+_PEAO_FINAL = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    15, 15, 15, 15, 15, 15, 15, 15,
+    5, 5, 5, 5, 5, 5, 5, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0,
+)
+_CAVALO = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+_BISPO = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+_TORRE = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+)
+_RAINHA = (
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+)
+_REI = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+)
+_REI_FINAL = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+)
+
+# classe: (material meio-jogo, material final, tabela meio-jogo, tabela final, peso na fase)
+_PECAS = {
+    Peao: (82, 94, _PEAO, _PEAO_FINAL, 0),
+    Cavalo: (337, 281, _CAVALO, _CAVALO, 1),
+    Bispo: (365, 297, _BISPO, _BISPO, 1),
+    Torre: (477, 512, _TORRE, _TORRE, 2),
+    Rainha: (1025, 936, _RAINHA, _RAINHA, 4),
+    Rei: (0, 0, _REI, _REI_FINAL, 0),
+    Supreme: (1360, 1220, _RAINHA, _CAVALO, 5),
+}
+FASE_TOTAL = 24
+
+
+def juntar(meio, final):
+    return (final << 32) + meio
+
+
+def separar(pontos):
+    final = (pontos + (1 << 31)) >> 32
+    return pontos - (final << 32), final
+
+
+def _tabela(classe, cor):
+    meio, final, tabela_meio, tabela_final, _ = _PECAS[classe]
+    sinal = 1 if cor == 'B' else -1
+    res = []
+    for x in range(8):
+        for y in range(8):
+            sq = (x if cor == 'B' else 7 - x) * 8 + y  # As pretas usam a tabela espelhada
+            res.append(sinal * juntar(meio + tabela_meio[sq], final + tabela_final[sq]))
+    return res
+
+
+# PST[classe][cor][casa]: pontos juntados, positivos para as brancas
+PST = {classe: {cor: _tabela(classe, cor) for cor in ('B', 'P')} for classe in _PECAS}
+FASE = {classe: dados[4] for classe, dados in _PECAS.items()}
+
+# Liga a conferência da soma incremental contra a avaliação completa a cada chamada (lento, só para depurar)
+CONFERIR = False
+
+
+def pontos_completos(pecas):
+    """
+    :return: (pontos, fase) somados do zero sobre uma lista de peças
+    """
+    pontos = fase = 0
+    for peca in pecas:
+        pontos += PST[type(peca)][peca.cor][peca.x * 8 + peca.y]
+        fase += FASE[type(peca)]
+    return pontos, fase
+
+
+def interpolar(pontos, fase):
+    """
+    :return: Valor do ponto de vista das brancas
+    """
+    meio, final = separar(pontos)
+    fase = min(fase, FASE_TOTAL)
+    return (meio * fase + final * (FASE_TOTAL - fase)) // FASE_TOTAL
+
+
+def avaliar(posicao):
+    """
+    Valor da posição do ponto de vista de quem joga, a partir dos contadores incrementais.
+    """
+    if CONFERIR:
+        conferir(posicao)
+    valor = interpolar(posicao.pontos, posicao.fase)
+    return valor if posicao.vez == 'B' else -valor
+
+
+def conferir(posicao):
+    """
+    Recalcula tudo a partir de `tabuleiro` e compara com os contadores incrementais.
+    """
+    esperado = pontos_completos(posicao.tabuleiro)
+    if (posicao.pontos, posicao.fase) != esperado:
+        raise AssertionError(f'Avaliação incremental {separar(posicao.pontos), posicao.fase} '
+                             f'difere da completa {separar(esperado[0]), esperado[1]}')
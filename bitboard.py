@@ -0,0 +1,395 @@
+import avaliacao
+import zobrist
+from pecas import *
+from posicao import Posicao, CORES, TIPOS
+
+# Casa x, y -> bit x * 8 + y (bit 0 = a8, bit 63 = h1), a mesma numeração de Xadrez
+COORDS = [(x, y) for x in range(8) for y in range(8)]
+PEAO, CAVALO, BISPO, TORRE, RAINHA, REI, SUPREME = range(7)
+TODAS = (1 << 64) - 1
+ZOBRIST = [zobrist.PECAS[TIPOS[codigo % 7]][CORES[codigo // 7]] for codigo in range(14)]  # [codigo][casa]
+PST = [avaliacao.PST[TIPOS[codigo % 7]][CORES[codigo // 7]] for codigo in range(14)]  # [codigo][casa]
+FASE = [avaliacao.FASE[TIPOS[codigo % 7]] for codigo in range(14)]
+
+# Direitos de roque: rei branco/preto, lado do rei (C) ou da rainha (L)
+ROQUE_BC, ROQUE_BL, ROQUE_PC, ROQUE_PL = 1, 2, 4, 8
+ROQUES = {  # cor: ((direito, casa da torre, casas vazias, casas não atacadas, destino do rei), ...)
+    0: ((ROQUE_BC, 63, (61, 62), (61, 62), 62), (ROQUE_BL, 56, (57, 58, 59), (59, 58), 58)),
+    1: ((ROQUE_PC, 7, (5, 6), (5, 6), 6), (ROQUE_PL, 0, (1, 2, 3), (3, 2), 2)),
+}
+MANTER_DIREITOS = [15] * 64
+for _sq, _perde in ((60, ROQUE_BC | ROQUE_BL), (63, ROQUE_BC), (56, ROQUE_BL),
+                    (4, ROQUE_PC | ROQUE_PL), (7, ROQUE_PC), (0, ROQUE_PL)):
+    MANTER_DIREITOS[_sq] = 15 ^ _perde
+
+
+def _bits(casas):
+    res = 0
+    for x, y in casas:
+        res |= 1 << (x * 8 + y)
+    return res
+
+
+CAVALO_BB = [_bits(casas) for casas in SALTOS_CAVALO]
+REI_BB = [_bits(casas) for casas in SALTOS_REI]
+PEAO_BB = [[_bits(casas) for casas in CAPTURAS_PEAO[cor]] for cor in CORES]
+
+
+def _deslizantes(raios):
+    """
+    Tabelas de ataque no estilo PEXT: a ocupação já mascarada pelas casas relevantes é a própria chave.
+    Em Python um dict indexado pela ocupação mascarada é mais rápido que a multiplicação mágica de 64 bits.
+    """
+    mascaras = []
+    tabelas = []
+    for sq in range(64):
+        mascara = 0
+        for raio in raios[sq]:
+            mascara |= _bits(raio[:-1])  # A última casa de cada raio nunca bloqueia nada
+        tabela = {}
+        ocupacao = 0
+        while True:
+            ataques = 0
+            for raio in raios[sq]:
+                for x, y in raio:
+                    bit = 1 << (x * 8 + y)
+                    ataques |= bit
+                    if ocupacao & bit:
+                        break
+            tabela[ocupacao] = ataques
+            ocupacao = (ocupacao - mascara) & mascara  # Próximo subconjunto da máscara (carry-rippler)
+            if not ocupacao:
+                break
+        mascaras.append(mascara)
+        tabelas.append(tabela)
+    return mascaras, tabelas
+
+
+MASCARA_TORRE, ATAQUES_TORRE = _deslizantes(RAIOS_ORTOGONAIS)
+MASCARA_BISPO, ATAQUES_BISPO = _deslizantes(RAIOS_DIAGONAIS)
+TORRE_VAZIO = [ATAQUES_TORRE[sq][0] for sq in range(64)]
+BISPO_VAZIO = [ATAQUES_BISPO[sq][0] for sq in range(64)]
+
+# ENTRE[a][b]: casas estritamente entre a e b quando alinhadas
+ENTRE = [[0] * 64 for _ in range(64)]
+for _sq in range(64):
+    for _raio in RAIOS[_sq]:
+        for _n, (_x, _y) in enumerate(_raio):
+            ENTRE[_sq][_x * 8 + _y] = _bits(_raio[:_n])
+
+
+def torre(sq, ocupadas):
+    return ATAQUES_TORRE[sq][ocupadas & MASCARA_TORRE[sq]]
+
+
+def bispo(sq, ocupadas):
+    return ATAQUES_BISPO[sq][ocupadas & MASCARA_BISPO[sq]]
+
+
+def casas(bb):
+    while bb:
+        bit = bb & -bb
+        yield bit.bit_length() - 1
+        bb ^= bit
+
+
+class Bitboard:
+    """
+    Posição em bitboards (um inteiro de 64 bits por tipo e cor) com a mesma API de regras de Xadrez:
+    casa, rei, brancas, pretas, atacada, legal_moves, make_move e unmake_move.
+    As peças devolvidas por casa/rei/brancas/pretas são cópias montadas na hora.
+    """
+
+    def __init__(self, configuracao_inicial=None, vez='B', passant=None):
+        self.bb = [0] * 14  # cor * 7 + tipo
+        self.ocupadas = [0, 0]
+        self.casas = [None] * 64  # cor * 7 + tipo ou None
+        self.vez = vez
+        self.passant = -1  # Casa do peão que acabou de andar duas casas
+        self.direitos = 0
+        self.__chave = 0  # Parte das peças da chave Zobrist
+        self.pontos = 0  # Tabelas peça-casa (ver avaliacao)
+        self.fase = 0
+
+        for peca in configuracao_inicial or []:
+            self.__colocar(CORES.index(peca.cor) * 7 + TIPOS.index(type(peca)), peca.x * 8 + peca.y)
+        for cor, roques in ROQUES.items():
+            for direito, sq_torre, _, _, _ in roques:
+                rei = self.casas[60 if cor == 0 else 4]
+                if rei == cor * 7 + REI and self.casas[sq_torre] == cor * 7 + TORRE:
+                    self.direitos |= direito
+        for peca in configuracao_inicial or []:
+            if peca.moved and type(peca) in (Rei, Torre):
+                self.direitos &= MANTER_DIREITOS[peca.x * 8 + peca.y]
+        if passant:
+            self.passant = passant[0].x * 8 + passant[0].y
+
+    @classmethod
+    def de_xadrez(cls, jogo):
+        return cls(jogo.tabuleiro, jogo.vez, jogo.passant)
+
+    @classmethod
+    def de_posicao(cls, posicao):
+        pecas = posicao.pecas()
+        passant = [peca for peca in pecas if peca.x * 8 + peca.y == posicao.passant]
+        return cls(pecas, posicao.vez, passant)
+
+    def posicao(self):
+        """
+        Retrato imutável da posição (ver posicao.Posicao); os códigos das casas são os de Bitboard mais 1.
+        """
+        return Posicao(bytes(0 if codigo is None else codigo + 1 for codigo in self.casas), self.vez, self.direitos,
+                       self.passant)
+
+    def __colocar(self, codigo, sq):
+        bit = 1 << sq
+        self.bb[codigo] |= bit
+        self.ocupadas[codigo // 7] |= bit
+        self.casas[sq] = codigo
+        self.__chave ^= ZOBRIST[codigo][sq]
+        self.pontos += PST[codigo][sq]
+        self.fase += FASE[codigo]
+
+    def __retirar(self, sq):
+        codigo = self.casas[sq]
+        bit = 1 << sq
+        self.bb[codigo] ^= bit
+        self.ocupadas[codigo // 7] ^= bit
+        self.casas[sq] = None
+        self.__chave ^= ZOBRIST[codigo][sq]
+        self.pontos -= PST[codigo][sq]
+        self.fase -= FASE[codigo]
+        return codigo
+
+    @property
+    def chave(self):
+        """
+        Chave Zobrist de 64 bits, igual à de Xadrez.chave para a mesma posição.
+        """
+        chave = self.__chave ^ zobrist.ROQUE[self.direitos]
+        if self.vez == 'P':
+            chave ^= zobrist.VEZ
+        sq = self.passant
+        if sq >= 0:
+            inimigo = (1 - self.casas[sq] // 7) * 7 + PEAO
+            if (sq % 8 > 0 and self.casas[sq - 1] == inimigo) or (sq % 8 < 7 and self.casas[sq + 1] == inimigo):
+                chave ^= zobrist.PASSANT[sq % 8]
+        return chave
+
+    # Peças (cópias) para a API de Xadrez
+
+    def __peca(self, sq):
+        codigo = self.casas[sq]
+        if codigo is None:
+            return
+        x, y = COORDS[sq]
+        cor = CORES[codigo // 7]
+        tipo = codigo % 7
+        roques = ROQUES[codigo // 7]
+        peca = TIPOS[tipo](x, y, cor)
+        if tipo == PEAO:
+            peca.moved = x != (6 if cor == 'B' else 1)
+        elif tipo == REI:
+            peca.moved = not any(self.direitos & direito for direito, *_ in roques)
+        elif tipo == TORRE:
+            peca.moved = not any(self.direitos & direito and sq == sq_torre for direito, sq_torre, *_ in roques)
+        else:
+            peca.moved = True
+        return peca
+
+    def casa(self, coords):
+        x, y = coords
+        if 0 <= x < 8 and 0 <= y < 8:
+            return self.__peca(x * 8 + y)
+
+    def cor(self, casa):
+        peca = self.casa(casa)
+        if peca:
+            return peca.cor
+
+    @property
+    def tabuleiro(self):
+        return [self.__peca(sq) for sq in casas(self.ocupadas[0] | self.ocupadas[1])]
+
+    @property
+    def casa_passant(self):
+        """
+        Casa (x, y) do peão que pode ser capturado en passant, ou None; a mesma de Xadrez.casa_passant.
+        """
+        return divmod(self.passant, 8) if self.passant >= 0 else None
+
+    @property
+    def quantidade(self):
+        return bin(self.ocupadas[0] | self.ocupadas[1]).count('1')
+
+    @property
+    def brancas(self):
+        return [self.__peca(sq) for sq in casas(self.ocupadas[0])]
+
+    @property
+    def pretas(self):
+        return [self.__peca(sq) for sq in casas(self.ocupadas[1])]
+
+    def rei(self, cor):
+        bb = self.bb[CORES.index(cor) * 7 + REI]
+        if bb:
+            return self.__peca(bb.bit_length() - 1)
+
+    @staticmethod
+    def inv_cor(cor):
+        return 'P' if cor == 'B' else 'B'
+
+    # Ataques
+
+    def atacantes(self, sq, por, ocupadas):
+        b = self.bb
+        base = por * 7
+        return (CAVALO_BB[sq] & (b[base + CAVALO] | b[base + SUPREME])
+                | REI_BB[sq] & b[base + REI]
+                | PEAO_BB[1 - por][sq] & b[base + PEAO]
+                | torre(sq, ocupadas) & (b[base + TORRE] | b[base + RAINHA] | b[base + SUPREME])
+                | bispo(sq, ocupadas) & (b[base + BISPO] | b[base + RAINHA] | b[base + SUPREME]))
+
+    def atacada(self, casa, por):
+        x, y = casa
+        return bool(self.atacantes(x * 8 + y, CORES.index(por), self.ocupadas[0] | self.ocupadas[1]))
+
+    def __ataques(self, codigo, sq, ocupadas):
+        tipo = codigo % 7
+        if tipo == CAVALO:
+            return CAVALO_BB[sq]
+        if tipo == BISPO:
+            return bispo(sq, ocupadas)
+        if tipo == TORRE:
+            return torre(sq, ocupadas)
+        if tipo == RAINHA:
+            return torre(sq, ocupadas) | bispo(sq, ocupadas)
+        if tipo == SUPREME:
+            return torre(sq, ocupadas) | bispo(sq, ocupadas) | CAVALO_BB[sq]
+        if tipo == REI:
+            return REI_BB[sq]
+        return PEAO_BB[codigo // 7][sq]
+
+    # Lances
+
+    def legal_moves(self, cor, origem=None, promocoes=(None,)):
+        """
+        Mesmo contrato de Xadrez.legal_moves: gera (origem, destino, promocao) já legais.
+        """
+        c = CORES.index(cor)
+        e = 1 - c
+        b = self.bb
+        proprias = self.ocupadas[c]
+        inimigas = self.ocupadas[e]
+        ocupadas = proprias | inimigas
+        rei = b[c * 7 + REI]
+        alvo = TODAS
+        cravadas = {}
+
+        if rei:
+            rsq = rei.bit_length() - 1
+            xeques = self.atacantes(rsq, e, ocupadas)
+            if xeques & (xeques - 1):
+                alvo = 0
+            elif xeques:
+                alvo = xeques | ENTRE[rsq][xeques.bit_length() - 1]
+            ortogonais = b[e * 7 + TORRE] | b[e * 7 + RAINHA] | b[e * 7 + SUPREME]
+            diagonais = b[e * 7 + BISPO] | b[e * 7 + RAINHA] | b[e * 7 + SUPREME]
+            for sq in casas(TORRE_VAZIO[rsq] & ortogonais | BISPO_VAZIO[rsq] & diagonais):
+                entre = ENTRE[rsq][sq] & ocupadas
+                if entre and not entre & (entre - 1) and entre & proprias:
+                    cravadas[entre.bit_length() - 1] = ENTRE[rsq][sq] | 1 << sq
+
+            if origem is None or origem == COORDS[rsq]:
+                sem_rei = ocupadas ^ rei
+                for sq in casas(REI_BB[rsq] & ~proprias):
+                    if not self.atacantes(sq, e, sem_rei):
+                        yield COORDS[rsq], COORDS[sq], None
+                if not xeques:
+                    for direito, sq_torre, vazias, livres, destino in ROQUES[c]:
+                        if self.direitos & direito and self.casas[sq_torre] == c * 7 + TORRE \
+                                and not any(ocupadas >> sq & 1 for sq in vazias) \
+                                and not any(self.atacantes(sq, e, ocupadas) for sq in livres):
+                            yield COORDS[rsq], COORDS[destino], None
+            rei_bb = rei
+        else:
+            rei_bb = 0
+
+        if not alvo:
+            return
+        pecas = proprias ^ rei_bb
+        if origem is not None:
+            pecas &= 1 << (origem[0] * 8 + origem[1])
+        frente = 8 if c else -8
+        inicio = 1 if c else 6
+        ultima = 7 if c else 0
+        for sq in casas(pecas):
+            codigo = self.casas[sq]
+            permitidas = alvo & cravadas.get(sq, TODAS)
+            if codigo % 7 == PEAO:
+                destinos = PEAO_BB[c][sq] & inimigas
+                um = sq + frente
+                if not ocupadas >> um & 1:
+                    destinos |= 1 << um
+                    if sq // 8 == inicio and not ocupadas >> (um + frente) & 1:
+                        destinos |= 1 << (um + frente)
+                destinos &= permitidas
+                if self.passant >= 0 and sq // 8 == self.passant // 8 and abs(sq - self.passant) == 1 \
+                        and inimigas >> self.passant & 1:  # Só o peão adversário pode ser tomado en passant
+                    # Passant tira duas peças da linha do rei: verificado aplicando o lance
+                    destino = COORDS[self.passant + frente]
+                    desfazer = self.make_move(COORDS[sq], destino)
+                    legal = not rei or not self.atacantes(rei.bit_length() - 1, e,
+                                                          self.ocupadas[0] | self.ocupadas[1])
+                    self.unmake_move(desfazer)
+                    if legal:
+                        yield COORDS[sq], destino, None
+                for destino in casas(destinos):
+                    if destino // 8 == ultima:
+                        for classe in promocoes:
+                            yield COORDS[sq], COORDS[destino], classe
+                    else:
+                        yield COORDS[sq], COORDS[destino], None
+            else:
+                for destino in casas(self.__ataques(codigo, sq, ocupadas) & ~proprias & permitidas):
+                    yield COORDS[sq], COORDS[destino], None
+
+    def make_move(self, origem, destino, promocao=None):
+        """
+        Aplica o lance e devolve o registro para unmake_move. Os arranjos planos originais ficam no registro
+        e o lance é aplicado em cópias: em Python isso é mais barato do que desfazer bit a bit.
+        """
+        desfazer = (self.bb, self.ocupadas, self.casas, self.vez, self.direitos, self.passant, self.__chave,
+                    self.pontos, self.fase)
+        self.bb = self.bb[:]
+        self.ocupadas = self.ocupadas[:]
+        self.casas = self.casas[:]
+        sq1 = origem[0] * 8 + origem[1]
+        sq2 = destino[0] * 8 + destino[1]
+        codigo = self.__retirar(sq1)
+        c = codigo // 7
+        tipo = codigo % 7
+        if self.casas[sq2] is not None:
+            self.__retirar(sq2)
+
+        self.passant = -1
+        if tipo == PEAO:
+            if sq2 % 8 != sq1 % 8 and desfazer[2][sq2] is None:  # Passant
+                self.__retirar(sq1 // 8 * 8 + sq2 % 8)
+            elif abs(sq2 - sq1) == 16:
+                self.passant = sq2
+            if sq2 // 8 in (0, 7):
+                codigo = c * 7 + TIPOS.index(promocao or Supreme)
+        elif tipo == REI and abs(sq2 - sq1) == 2:  # Roque
+            de, para = (sq1 + 3, sq1 + 1) if sq2 > sq1 else (sq1 - 4, sq1 - 1)
+            self.__colocar(self.__retirar(de), para)
+        self.__colocar(codigo, sq2)
+
+        self.direitos &= MANTER_DIREITOS[sq1] & MANTER_DIREITOS[sq2]
+        self.vez = CORES[1 - c]
+        return desfazer
+
+    def unmake_move(self, desfazer):
+        self.bb, self.ocupadas, self.casas, self.vez, self.direitos, self.passant, self.__chave, self.pontos, \
+            self.fase = desfazer
+
@@ -0,0 +1,343 @@
+"""
+Motor de busca: negamax alfa-beta com aprofundamento iterativo, busca de quiescência nas capturas,
+tabela de transposição e ordenação de lances (lance da tabela, MVV-LVA, killers e histórico).
+Posições cobertas pelas tabelas de finais (finais.py) são respondidas pela tabela, sem busca.
+
+    best_move(Xadrez.inicial(), 1000)  ->  ((6, 4), (4, 4), None)
+
+Funciona com qualquer posição que tenha a API de regras de Xadrez (Xadrez ou Bitboard).
+"""
+from time import perf_counter
+
+from avaliacao import avaliar
+from pecas import *
+from transposicao import Transposicao, codificar, decodificar, EXATO, INFERIOR, SUPERIOR
+
+# Valores só para ordenar capturas (MVV-LVA); a avaliação fica em avaliacao.py
+VALORES = {Peao: 100, Cavalo: 320, Bispo: 330, Torre: 500, Rainha: 900, Rei: 0, Supreme: 1220}
+MATE = 30000
+INFINITO = 32000
+MAX_PLY = 128
+VERIFICAR = 256  # Máximo de nós entre duas consultas ao relógio
+CONSULTA = 0.001  # Segundos desejados entre consultas; o intervalo em nós acompanha a velocidade medida
+
+
+class _Esgotado(Exception):
+    """Acabou o tempo ou o orçamento de nós."""
+
+
+def em_xeque(posicao, cor):
+    rei = posicao.rei(cor)
+    return rei is not None and posicao.atacada(rei.pos, 'P' if cor == 'B' else 'B')
+
+
+class Busca:
+    def __init__(self, tt=None, livro=None, finais=None, analises=None):
+        """
+        :param livro: Livro de aberturas (livro.Livro) consultado antes de buscar
+        :param finais: Tabelas de finais (finais.Finais) consultadas na raiz e em cada nó
+        :param analises: Cache persistente (analises.Analises): a busca retoma a análise guardada da raiz e grava
+            a sua ao terminar
+        """
+        self.tt = tt if tt is not None else Transposicao()
+        self.livro = livro
+        self.finais = finais
+        self.analises = analises
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.tabela_historico = {}  # (cor, lance codificado) -> bônus dos cortes beta
+        self.nos = 0
+        self.profundidade = 0  # Última iteração completa
+        self.valor = 0
+        self.parar = False  # Pode ser ligado de outra thread
+        self.parada = None  # Evento compartilhado (threading ou multiprocessing) que também interrompe a busca
+        self.informar = None  # Função (busca, posicao) chamada ao fim de cada iteração, por exemplo para o UCI
+        self.passo = 0.0  # Segundos entre consultas ao relógio (máximo recente): quanto a busca pode passar do limite
+        self.__limite = None
+        self.__suave = None  # Depois deste momento não começa outra iteração
+        self.__consulta = 0.0
+        self.__intervalo = 16  # Nós entre consultas ao relógio, ajustado pela velocidade medida
+        self.__proxima = 0  # Valor de `nos` da próxima consulta
+        self.__max_nos = None
+        self.__caminho = []
+
+    def best_move(self, posicao, time_ms=1000, profundidade=MAX_PLY, nos=None, historico=(), inicio=1):
+        """
+        :param posicao: Posição com a API de regras de Xadrez; é usada como rascunho e volta ao estado original
+        :param time_ms: Tempo para pensar, em milissegundos (None para sem limite)
+        :param profundidade: Profundidade máxima do aprofundamento iterativo
+        :param nos: Orçamento de nós (None para sem limite)
+        :param historico: Chaves das posições anteriores da partida, para reconhecer repetições
+        :param inicio: Primeira profundidade do aprofundamento iterativo
+        :return: Melhor lance (origem, destino, promocao) ou None se não houver lances
+        """
+        lances = list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES))
+        if not lances:
+            return None
+        if self.livro is not None:
+            lance = self.livro.escolher(posicao)
+            if lance is not None:
+                self.nos = self.profundidade = self.valor = 0
+                return lance
+        if self.finais is not None and posicao.quantidade <= self.finais.maximo:
+            resposta = self.finais.melhor_lance(posicao)
+            if resposta is not None:
+                lance, (resultado, plies) = resposta
+                self.nos = self.profundidade = 0
+                self.valor = self.__valor_final(resultado, plies, 0)
+                return lance
+        self.limitar(time_ms)
+        self.__max_nos = nos
+        self.__caminho = list(historico)
+        self.nos = 0
+        self.__proxima = self.__intervalo
+        self.profundidade = self.valor = 0
+        self.parar = False
+        self.tt.nova_busca()
+
+        melhor = lances[0]
+        guardada = self.analises.buscar(posicao.chave, 'lance') if self.analises is not None else None
+        if guardada is not None and guardada.profundidade and decodificar(guardada.lance) in lances:
+            # O lance guardado é a resposta até a busca passar da profundidade já analisada. As iterações até lá
+            # não são puladas: com a tabela de transposição vazia, ir direto à profundidade seguinte custaria uma
+            # busca inteira sem ordenação e poderia esgotar o tempo sem nada novo; refeitas do começo, elas saem
+            # baratas e preparam a tabela e a ordenação
+            melhor, self.valor, self.profundidade = decodificar(guardada.lance), guardada.valor, guardada.profundidade
+            if self.profundidade >= profundidade or abs(self.valor) >= MATE - MAX_PLY:
+                return melhor
+            lances.remove(melhor)
+            lances.insert(0, melhor)
+        for d in range(inicio, profundidade + 1):
+            try:
+                valor, lance = self.__raiz(posicao, lances, d)
+            except _Esgotado:
+                break
+            if d > self.profundidade:
+                melhor, self.valor, self.profundidade = lance, valor, d
+                if self.informar is not None:
+                    self.informar(self, posicao)
+            if len(lances) == 1 or abs(valor) >= MATE - MAX_PLY:
+                break
+            if self.__suave is not None and perf_counter() >= self.__suave:
+                break  # A próxima iteração custa mais que todas as anteriores juntas e não terminaria a tempo
+        if self.analises is not None and self.profundidade:
+            self.analises.gravar(posicao.chave, lance=codificar(*melhor), valor=self.valor,
+                                 profundidade=self.profundidade)
+        return melhor
+
+    def limitar(self, time_ms):
+        """
+        Troca o limite de tempo da busca em andamento, contado a partir de agora (None para sem limite). Pode ser
+        chamado de outra thread, como no ponderhit do UCI. Passada a metade do tempo, nenhuma iteração nova começa.
+        """
+        agora = perf_counter()
+        self.__consulta = agora
+        self.__limite = None if time_ms is None else agora + time_ms / 1000
+        self.__suave = None if time_ms is None else agora + time_ms / 2000
+
+    def variante(self, posicao, maximo=MAX_PLY):
+        """
+        Variante principal seguindo os lances da tabela de transposição; a posição volta ao estado original.
+        :return: Lista de lances (origem, destino, promocao), começando pelo melhor
+        """
+        lances, desfazer, vistas = [], [], set()
+        try:
+            while len(lances) < maximo and posicao.chave not in vistas:
+                vistas.add(posicao.chave)
+                lance = decodificar(self.__lance_tt(posicao))
+                if lance is None or lance not in posicao.legal_moves(posicao.vez, lance[0], PROMOCOES):
+                    break
+                lances.append(lance)
+                desfazer.append(posicao.make_move(*lance))
+        finally:
+            for registro in reversed(desfazer):
+                posicao.unmake_move(registro)
+        return lances
+
+    def __raiz(self, posicao, lances, profundidade):
+        alfa, beta = -INFINITO, INFINITO
+        lances.sort(key=self.__ordem(posicao, self.__lance_tt(posicao), 0), reverse=True)
+        melhor = lances[0]
+        for lance in lances:
+            desfazer = posicao.make_move(*lance)
+            self.__caminho.append(posicao.chave)
+            try:
+                valor = -self.__negamax(posicao, profundidade - 1, -beta, -alfa, 1)
+            finally:
+                self.__caminho.pop()
+                posicao.unmake_move(desfazer)
+            if valor > alfa:
+                alfa, melhor = valor, lance
+        # O melhor lance vai na frente da próxima iteração
+        lances.remove(melhor)
+        lances.insert(0, melhor)
+        self.tt.gravar(posicao.chave, alfa, codificar(*melhor), profundidade, EXATO)
+        return alfa, melhor
+
+    def __negamax(self, posicao, profundidade, alfa, beta, ply):
+        self.__contar()
+        chave = posicao.chave
+        if self.__caminho.count(chave) > 1:  # Repetição
+            return 0
+        if self.finais is not None and posicao.quantidade <= self.finais.maximo:
+            resposta = self.finais.sondar(posicao)
+            if resposta is not None:
+                return self.__valor_final(*resposta, ply)
+
+        alfa_original = alfa
+        entrada = self.tt.buscar(chave)
+        lance_tt = 0
+        if entrada is not None:
+            valor, lance_tt, prof_tt, tipo = entrada
+            if prof_tt >= profundidade:
+                valor = self.__de_tt(valor, ply)
+                if tipo == EXATO or (tipo == INFERIOR and valor >= beta) or (tipo == SUPERIOR and valor <= alfa):
+                    return valor
+
+        xeque = em_xeque(posicao, posicao.vez)
+        if profundidade <= 0 and not xeque:
+            return self.__quiescencia(posicao, alfa, beta, ply)
+
+        lances = list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES))
+        if not lances:
+            return -MATE + ply if xeque else 0
+        if ply >= MAX_PLY - 1:
+            return avaliar(posicao)
+
+        lances.sort(key=self.__ordem(posicao, lance_tt, ply), reverse=True)
+        melhor, melhor_valor = 0, -INFINITO
+        for lance in lances:
+            desfazer = posicao.make_move(*lance)
+            self.__caminho.append(posicao.chave)
+            try:
+                valor = -self.__negamax(posicao, profundidade - 1, -beta, -alfa, ply + 1)
+            finally:
+                self.__caminho.pop()
+                posicao.unmake_move(desfazer)
+            if valor > melhor_valor:
+                melhor_valor, melhor = valor, codificar(*lance)
+            if valor > alfa:
+                alfa = valor
+            if alfa >= beta:
+                if not self.__captura(posicao, lance):
+                    killers = self.killers[ply]
+                    if killers[0] != melhor:
+                        killers[0], killers[1] = melhor, killers[0]
+                    self.tabela_historico[posicao.vez, melhor] = \
+                        self.tabela_historico.get((posicao.vez, melhor), 0) + profundidade ** 2
+                break
+
+        tipo = SUPERIOR if melhor_valor <= alfa_original else INFERIOR if melhor_valor >= beta else EXATO
+        self.tt.gravar(chave, self.__para_tt(melhor_valor, ply), melhor, max(profundidade, 0), tipo)
+        return melhor_valor
+
+    def __quiescencia(self, posicao, alfa, beta, ply):
+        """
+        Só capturas e promoções, até a posição ficar quieta.
+        """
+        parado = avaliar(posicao)
+        if parado >= beta:
+            return parado
+        alfa = max(alfa, parado)
+        if ply >= MAX_PLY - 1:
+            return parado
+
+        lances = [lance for lance in posicao.legal_moves(posicao.vez, promocoes=(Rainha,))
+                  if self.__captura(posicao, lance) or lance[2] is not None]
+        lances.sort(key=self.__ordem(posicao, 0, ply), reverse=True)
+        for lance in lances:
+            self.__contar()
+            desfazer = posicao.make_move(*lance)
+            try:
+                valor = -self.__quiescencia(posicao, -beta, -alfa, ply + 1)
+            finally:
+                posicao.unmake_move(desfazer)
+            if valor >= beta:
+                return valor
+            alfa = max(alfa, valor)
+        return alfa
+
+    # Ordenação
+
+    def __ordem(self, posicao, lance_tt, ply):
+        killers = self.killers[ply]
+        vez = posicao.vez
+
+        def chave(lance):
+            codigo = codificar(*lance)
+            if codigo == lance_tt:
+                return 1 << 30
+            vitima = self.__vitima(posicao, lance)
+            if vitima is not None or lance[2] is not None:  # MVV-LVA
+                atacante = posicao.casa(lance[0])
+                return (1 << 20) + VALORES[vitima or Peao] * 16 - VALORES[type(atacante)] // 100 \
+                    + (VALORES[lance[2]] if lance[2] else 0)
+            if codigo in killers:
+                return (1 << 19) - killers.index(codigo)
+            return self.tabela_historico.get((vez, codigo), 0)
+        return chave
+
+    @staticmethod
+    def __vitima(posicao, lance):
+        (x1, y1), (x2, y2), _ = lance
+        alvo = posicao.casa((x2, y2))
+        if alvo is not None:
+            return type(alvo)
+        if y1 != y2 and isinstance(posicao.casa((x1, y1)), Peao):  # En passant
+            return Peao
+        return None
+
+    def __captura(self, posicao, lance):
+        return self.__vitima(posicao, lance) is not None
+
+    def __lance_tt(self, posicao):
+        entrada = self.tt.buscar(posicao.chave)
+        return entrada[1] if entrada else 0
+
+    # Limites
+
+    def __contar(self):
+        self.nos += 1
+        if self.nos >= self.__proxima or self.parar:
+            agora = perf_counter()
+            passo = agora - self.__consulta
+            self.passo = max(passo, self.passo * 0.9)
+            self.__consulta = agora
+            if passo > 0:
+                self.__intervalo = max(1, min(VERIFICAR, int(self.__intervalo * CONSULTA / passo)))
+            self.__proxima = self.nos + self.__intervalo
+            if self.parar or (self.__limite is not None and agora >= self.__limite) \
+                    or (self.parada is not None and self.parada.is_set()):
+                self.parar = True
+                raise _Esgotado
+        if self.__max_nos is not None and self.nos >= self.__max_nos:
+            raise _Esgotado
+
+    @staticmethod
+    def __valor_final(resultado, plies, ply):
+        # Mate das tabelas a `plies` meios-lances desta posição, contado a partir da raiz
+        return resultado * (MATE - ply - plies) if resultado else 0
+
+    @staticmethod
+    def __para_tt(valor, ply):
+        # Mates ficam guardados em relação à posição, não à raiz
+        if valor >= MATE - MAX_PLY:
+            return valor + ply
+        if valor <= -MATE + MAX_PLY:
+            return valor - ply
+        return valor
+
+    @staticmethod
+    def __de_tt(valor, ply):
+        if valor >= MATE - MAX_PLY:
+            return valor - ply
+        if valor <= -MATE + MAX_PLY:
+            return valor + ply
+        return valor
+
+
+def best_move(posicao, time_ms=1000, **opcoes):
+    """
+    Melhor lance para quem está na vez em `posicao`, pensando por até time_ms milissegundos.
+    Aceita as mesmas opções de Busca.best_move (profundidade, nos, historico).
+    """
+    return Busca().best_move(posicao, time_ms, **opcoes)
@@ -0,0 +1,536 @@
+"""
+Tabelas de finais geradas por análise retrógrada com as regras de Xadrez: para cada posição de um conjunto pequeno de
+peças, se quem está na vez ganha, empata ou perde e em quantos meios-lances sai o mate.
+
+Cada tabela é um arquivo <material>.tbx (KQK.tbx, KBNK.tbx, KQKR.tbx...) com um cabeçalho e um byte por posição,
+lido com mmap. O índice é (rei branco, demais peças, vez), com a simetria cortando o rei branco: sem peões ele fica
+no triângulo a8-a5-d5 (10 casas, 8 simetrias do tabuleiro), com peões nas colunas a-d (espelho). As posições com as
+cores trocadas (KKQ) usam a tabela de KQK. O byte guarda 0 para empate, 255 para posição ilegal ou repetida pela
+simetria e d + 1 para as decididas, onde d é a distância até o mate em meios-lances (ímpar: quem está na vez ganha).
+
+Direitos de roque, en passant e a regra dos 50 lances ficam de fora: posições com roque ou en passant não são
+consultadas, e um avanço duplo dentro da tabela não dá en passant ao adversário. As promoções incluem a Supreme.
+
+    python finais.py gerar KQK KRK KPK KBNK --pasta finais
+    python finais.py gerar --todas 4 --pasta finais --trabalhadores 4
+    python finais.py consultar --pasta finais --fen "8/8/8/4k3/8/8/8/3QK3 w - - 0 1"
+"""
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+from collections import defaultdict
+from itertools import combinations_with_replacement
+from time import perf_counter
+
+from pecas import *
+from regras import Xadrez
+
+CABECALHO = struct.Struct('>4sI')  # assinatura, número de posições
+ASSINATURA = b'TBX1'
+EXTENSAO = '.tbx'
+EMPATE, ILEGAL = 0, 255
+MAX_PECAS = 4
+
+LETRAS = {'K': Rei, 'S': Supreme, 'Q': Rainha, 'R': Torre, 'B': Bispo, 'N': Cavalo, 'P': Peao}
+ORDEM = 'SQRBNP'  # Da mais forte para a mais fraca: ordem das peças no nome e no índice
+LETRA = {classe: letra for letra, classe in LETRAS.items()}
+PROMOCOES_FINAIS = PROMOCOES + (Supreme,)
+
+GANHA, DECREMENTA = 0, 1  # Eventos da análise retrógrada
+
+
+# Simetrias: cada uma é uma permutação das 64 casas (índice x * 8 + y)
+
+def _simetria(f):
+    return tuple(f(sq // 8, sq % 8)[0] * 8 + f(sq // 8, sq % 8)[1] for sq in range(64))
+
+
+SIMETRIAS = [_simetria(f) for f in (
+    lambda x, y: (x, y), lambda x, y: (x, 7 - y), lambda x, y: (7 - x, y), lambda x, y: (7 - x, 7 - y),
+    lambda x, y: (y, x), lambda x, y: (y, 7 - x), lambda x, y: (7 - y, x), lambda x, y: (7 - y, 7 - x))]
+ESPELHO = SIMETRIAS[1]
+TRIANGULO = [x * 8 + y for x in range(4) for y in range(x + 1)]
+COLUNAS_AD = [x * 8 + y for x in range(8) for y in range(4)]
+
+
+def _forca(letras):
+    return sorted((len(ORDEM) - ORDEM.index(letra) for letra in letras), reverse=True)
+
+
+def normalizar(brancas, pretas):
+    """
+    :param brancas: Letras das peças brancas além do rei (em qualquer ordem)
+    :return: (nome da tabela, trocar as cores) — a tabela sempre tem o lado mais forte de brancas
+    """
+    brancas = ''.join(sorted(brancas, key=ORDEM.index))
+    pretas = ''.join(sorted(pretas, key=ORDEM.index))
+    if _forca(pretas) > _forca(brancas):
+        return f'K{pretas}K{brancas}', True
+    return f'K{brancas}K{pretas}', False
+
+
+def material(posicao):
+    """
+    :return: (nome da tabela, trocar as cores) da posição
+    """
+    letras = {'B': '', 'P': ''}
+    for peca in posicao.tabuleiro:
+        if not isinstance(peca, Rei):
+            letras[peca.cor] += LETRA[type(peca)]
+    return normalizar(letras['B'], letras['P'])
+
+
+class Esquema:
+    """
+    Indexação de um material: casas das peças na ordem [rei branco, brancas, rei preto, pretas] <-> índice.
+    """
+
+    def __init__(self, nome):
+        if not nome.startswith('K') or nome.count('K') != 2 or any(letra not in LETRAS for letra in nome):
+            raise ValueError(f'Material inválido: {nome}')
+        brancas, pretas = nome[1:].split('K')
+        if normalizar(brancas, pretas) != (nome, False):
+            raise ValueError(f'Material fora da forma normal: {nome} (use {normalizar(brancas, pretas)[0]})')
+        if len(nome) > MAX_PECAS:
+            raise ValueError(f'No máximo {MAX_PECAS} peças: {nome}')
+        self.nome = nome
+        self.brancas = brancas
+        self.pretas = pretas
+        self.classes = [Rei] + [LETRAS[c] for c in brancas] + [Rei] + [LETRAS[c] for c in pretas]
+        self.cores = ['B'] * (len(brancas) + 1) + ['P'] * (len(pretas) + 1)
+        self.peoes = 'P' in nome
+        self.regiao = COLUNAS_AD if self.peoes else TRIANGULO
+        self.tamanho = len(self.regiao) * 64 ** (len(self.classes) - 1) * 2
+        posicao_regiao = {sq: i for i, sq in enumerate(self.regiao)}
+        self.__regiao = [posicao_regiao.get(sq) for sq in range(64)]
+        # Simetrias que levam o rei branco de cada casa para dentro da região
+        simetrias = (SIMETRIAS[0], ESPELHO) if self.peoes else SIMETRIAS
+        self.__simetrias = [[s for s in simetrias if s[sq] in posicao_regiao] for sq in range(64)]
+
+    def indice(self, casas, vez):
+        """
+        :param casas: Casas (x * 8 + y) das peças na ordem do esquema
+        :param vez: 'B' ou 'P'
+        :return: Índice da forma canônica (o menor entre as simetrias que põem o rei branco na região)
+        """
+        melhor = None
+        for simetria in self.__simetrias[casas[0]]:
+            i = self.__regiao[simetria[casas[0]]]
+            for sq in casas[1:]:
+                i = i * 64 + simetria[sq]
+            if melhor is None or i < melhor:
+                melhor = i
+        return melhor * 2 + (vez == 'P')
+
+    def casas(self, indice):
+        """
+        :return: (casas das peças na ordem do esquema, vez)
+        """
+        indice, vez = divmod(indice, 2)
+        casas = []
+        for _ in range(len(self.classes) - 1):
+            indice, sq = divmod(indice, 64)
+            casas.append(sq)
+        casas.append(self.regiao[indice])
+        return casas[::-1], 'P' if vez else 'B'
+
+    def posicao(self, casas, vez):
+        """
+        Xadrez com as peças nas casas, ou None se duas peças dividem uma casa ou um peão está na primeira/última
+        linha. Reis e peças contam como já movidos (sem roque); peões na casa inicial podem andar duas.
+        """
+        if len(set(casas)) < len(casas):
+            return None
+        pecas = []
+        for classe, cor, sq in zip(self.classes, self.cores, casas):
+            x, y = sq // 8, sq % 8
+            peca = classe(x, y, cor)
+            if classe is Peao:
+                if x in (0, 7):
+                    return None
+                peca.moved = x != (6 if cor == 'B' else 1)
+            else:
+                peca.moved = True
+            pecas.append(peca)
+        jogo = Xadrez(pecas)
+        jogo.vez = vez
+        return jogo
+
+    def pecas(self, posicao, trocar=False):
+        """
+        :return: (casas na ordem do esquema, vez) de uma posição com este material
+        """
+        ordem = lambda p: (p.cor != 'B', not isinstance(p, Rei), ORDEM.find(LETRA[type(p)]))
+        pecas = posicao.tabuleiro
+        vez = posicao.vez
+        if trocar:
+            pecas = [type(p)(7 - p.x, p.y, 'P' if p.cor == 'B' else 'B') for p in pecas]
+            vez = 'P' if vez == 'B' else 'B'
+        return [p.x * 8 + p.y for p in sorted(pecas, key=ordem)], vez
+
+
+class Tabela:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.nome = os.path.basename(caminho)[:-len(EXTENSAO)]
+        self.esquema = Esquema(self.nome)
+        self.__arquivo = open(caminho, 'rb')
+        self.__mapa = mmap.mmap(self.__arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        assinatura, tamanho = CABECALHO.unpack_from(self.__mapa)
+        if assinatura != ASSINATURA or tamanho != self.esquema.tamanho \
+                or len(self.__mapa) != CABECALHO.size + tamanho:
+            self.fechar()
+            raise ValueError(f'Tabela corrompida: {caminho}')
+
+    def __getitem__(self, indice):
+        return self.__mapa[CABECALHO.size + indice]
+
+    def fechar(self):
+        self.__mapa.close()
+        self.__arquivo.close()
+
+
+def decodificar(byte):
+    """
+    :return: (resultado, plies): resultado 1, 0 ou -1 para quem está na vez; plies até o mate (0 no empate)
+    """
+    if byte == EMPATE:
+        return 0, 0
+    plies = byte - 1
+    return (1 if plies % 2 else -1), plies
+
+
+def _en_passant(posicao):
+    """
+    Se quem está na vez pode capturar en passant.
+    """
+    casa = posicao.casa_passant
+    if casa is None:
+        return False
+    x, y = casa
+    for vizinho in (posicao.casa((x, y - 1)), posicao.casa((x, y + 1))):
+        if isinstance(vizinho, Peao) and vizinho.cor == posicao.vez:
+            return True
+    return False
+
+
+class Finais:
+    def __init__(self, pasta):
+        """
+        :param pasta: Pasta com as tabelas .tbx; as que faltam simplesmente não são consultadas
+        """
+        self.pasta = pasta
+        self.__tabelas = {}
+        nomes = [nome[:-len(EXTENSAO)] for nome in os.listdir(pasta) if nome.endswith(EXTENSAO)] \
+            if os.path.isdir(pasta) else []
+        self.maximo = max([len(nome) for nome in nomes] + [2])  # Maior número de peças com tabela
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def fechar(self):
+        for tabela in self.__tabelas.values():
+            if tabela is not None:
+                tabela.fechar()
+        self.__tabelas.clear()
+
+    def tabela(self, nome):
+        """
+        :return: Tabela do material ou None se o arquivo não existe
+        """
+        if nome not in self.__tabelas:
+            caminho = os.path.join(self.pasta, nome + EXTENSAO)
+            self.__tabelas[nome] = Tabela(caminho) if os.path.exists(caminho) else None
+        return self.__tabelas[nome]
+
+    def sondar(self, posicao):
+        """
+        :param posicao: Posição com a API de regras de Xadrez (Xadrez ou Bitboard)
+        :return: (resultado, plies) para quem está na vez (ver decodificar) ou None se a posição não está nas tabelas
+        """
+        if posicao.direitos or _en_passant(posicao):
+            return None
+        nome, trocar = material(posicao)
+        if nome == 'KK':
+            return 0, 0
+        tabela = self.tabela(nome)
+        if tabela is None:
+            return None
+        byte = tabela[tabela.esquema.indice(*tabela.esquema.pecas(posicao, trocar))]
+        return None if byte == ILEGAL else decodificar(byte)
+
+    def melhor_lance(self, posicao):
+        """
+        Lance que ganha mais rápido, ou empata, ou perde mais devagar.
+        :return: ((origem, destino, promocao), (resultado, plies)) ou None se alguma resposta não está nas tabelas
+        """
+        if self.sondar(posicao) is None:
+            return None
+        melhor = valor = None
+        for lance in list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES_FINAIS)):
+            desfazer = posicao.make_move(*lance)
+            try:
+                resposta = self.sondar(posicao)
+            finally:
+                posicao.unmake_move(desfazer)
+            if resposta is None:
+                return None
+            resultado, plies = -resposta[0], resposta[1] + 1
+            # Ganhar: menos plies é melhor; perder: mais plies é melhor
+            ordem = (resultado, -plies if resultado > 0 else plies if resultado < 0 else 0)
+            if melhor is None or ordem > valor[0]:
+                melhor, valor = lance, (ordem, (resultado, plies if resultado else 0))
+        return melhor and (melhor, valor[1])
+
+
+# Geração
+
+def dependencias(nome):
+    """
+    Materiais alcançáveis por uma captura ou promoção, que precisam estar gerados antes.
+    """
+    brancas, pretas = nome[1:].split('K')
+    res = set()
+    for letras, outras, cor in ((brancas, pretas, 'B'), (pretas, brancas, 'P')):
+        for i, letra in enumerate(letras):
+            resto = letras[:i] + letras[i + 1:]
+            trocas = [resto] + ([resto + LETRA[classe] for classe in PROMOCOES_FINAIS] if letra == 'P' else [])
+            for novas in trocas:
+                lados = (novas, outras) if cor == 'B' else (outras, novas)
+                res.add(normalizar(*lados)[0])
+                if letra == 'P':  # O peão também some quando é capturado, e promove capturando
+                    for j in range(len(outras)):
+                        menos = outras[:j] + outras[j + 1:]
+                        res.add(normalizar(*((novas, menos) if cor == 'B' else (menos, novas)))[0])
+    res.discard('KK')
+    res.discard(nome)
+    return res
+
+
+def todos(pecas):
+    """
+    :return: Todos os materiais com até `pecas` peças (reis inclusive), na forma normal
+    """
+    res = set()
+    for n in range(1, pecas - 1):
+        for n_brancas in range(n + 1):
+            for brancas in combinations_with_replacement(ORDEM, n_brancas):
+                for pretas in combinations_with_replacement(ORDEM, n - n_brancas):
+                    res.add(normalizar(brancas, pretas)[0])
+    return sorted(res, key=lambda nome: (len(nome), nome))
+
+
+_esquema = None  # Esquema e tabelas menores de cada processo trabalhador
+_finais = None
+
+
+def _iniciar(nome, pasta):
+    global _esquema, _finais
+    _esquema = Esquema(nome)
+    _finais = Finais(pasta)
+
+
+def _analisar(faixa):
+    """
+    Passo para frente de uma faixa de índices com as regras de Xadrez: marca posições ilegais e mates e conta,
+    para cada posição, os sucessores dentro da tabela. Capturas e promoções são resolvidas nas tabelas menores.
+    :return: (início, bytes, contagens, empata, eventos [(nível, tipo, índice)])
+    """
+    inicio, fim = faixa
+    esquema = _esquema
+    bytes_ = bytearray(fim - inicio)
+    contagens = bytearray(fim - inicio)
+    empata = bytearray(fim - inicio)
+    eventos = []
+    for i in range(inicio, fim):
+        casas, vez = esquema.casas(i)
+        jogo = esquema.posicao(casas, vez)
+        if jogo is None or esquema.indice(casas, vez) != i or jogo.atacada(jogo.rei(jogo.inv_cor(vez)).pos, vez):
+            bytes_[i - inicio] = ILEGAL
+            continue
+        lances = list(jogo.legal_moves(vez, promocoes=PROMOCOES_FINAIS))
+        if not lances:
+            if jogo.atacada(jogo.rei(vez).pos, jogo.inv_cor(vez)):
+                bytes_[i - inicio] = 1  # Mate: perde em 0 plies
+            continue
+        sucessores = set()
+        for lance in lances:
+            n = len(jogo.tabuleiro)
+            desfazer = jogo.make_move(*lance)
+            if len(jogo.tabuleiro) < n or lance[2] is not None:
+                resultado, plies = _finais.sondar(jogo)
+                if resultado < 0:
+                    eventos.append((plies + 1, GANHA, i))
+                elif resultado > 0:
+                    eventos.append((plies + 1, DECREMENTA, i))
+                    contagens[i - inicio] += 1
+                else:
+                    empata[i - inicio] = 1
+            else:
+                sucessores.add(esquema.indice(esquema.pecas(jogo)[0], jogo.vez))
+            jogo.unmake_move(desfazer)
+        contagens[i - inicio] += len(sucessores)
+    return inicio, bytes_, contagens, empata, eventos
+
+
+def _antecessores(indices):
+    """
+    Posições que chegam a cada índice por um lance sem captura nem promoção de quem acabou de jogar: o passo para
+    trás da análise, com os mesmos saltos e raios de pecas.py.
+    :return: [conjunto de índices antecessores, ...] na ordem de `indices`
+    """
+    esquema = _esquema
+    res = []
+    for i in indices:
+        casas, vez = esquema.casas(i)
+        jogou = 'P' if vez == 'B' else 'B'
+        ocupadas = set(casas)
+        antes = set()
+        for n, (classe, cor, sq) in enumerate(zip(esquema.classes, esquema.cores, casas)):
+            if cor != jogou:
+                continue
+            if classe is Peao:
+                atras = -8 if cor == 'P' else 8
+                origens = []
+                if sq + atras not in ocupadas:
+                    origens.append(sq + atras)
+                    if sq // 8 == (4 if cor == 'B' else 3) and sq + 2 * atras not in ocupadas:
+                        origens.append(sq + 2 * atras)
+            else:
+                origens = [x * 8 + y for x, y in (SALTOS_REI if classe is Rei else SALTOS_CAVALO)[sq]
+                           if x * 8 + y not in ocupadas] if classe in (Rei, Cavalo, Supreme) else []
+                if classe in DESLIZANTES_ORTOGONAIS or classe in DESLIZANTES_DIAGONAIS:
+                    raios = RAIOS_ORTOGONAIS[sq] if classe is Torre else RAIOS_DIAGONAIS[sq] if classe is Bispo \
+                        else RAIOS[sq]
+                    for raio in raios:
+                        for x, y in raio:
+                            if x * 8 + y in ocupadas:
+                                break
+                            origens.append(x * 8 + y)
+            for origem in origens:
+                if classe is Peao and origem // 8 in (0, 7):
+                    continue
+                antes.add(esquema.indice(casas[:n] + [origem] + casas[n + 1:], jogou))
+        res.append(antes)
+    return res
+
+
+def _gravar(caminho, dados):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(CABECALHO.pack(ASSINATURA, len(dados)))
+        arquivo.write(dados)
+    os.replace(temporario, caminho)
+
+
+def gerar(nome, pasta, trabalhadores=None, bloco=4096, mostrar=print):
+    """
+    Gera a tabela de um material (e as menores que faltarem) em `pasta`.
+    :param trabalhadores: Processos do pool (padrão: um por núcleo)
+    :param mostrar: Função para as mensagens de progresso (None para ficar quieto)
+    :return: Caminho da tabela
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, nome + EXTENSAO)
+    for dependencia in sorted(dependencias(nome), key=len):
+        if not os.path.exists(os.path.join(pasta, dependencia + EXTENSAO)):
+            gerar(dependencia, pasta, trabalhadores, bloco, mostrar)
+
+    esquema = Esquema(nome)
+    inicio_geracao = perf_counter()
+    tabela = bytearray(esquema.tamanho)
+    contagens = bytearray(esquema.tamanho)
+    empata = bytearray(esquema.tamanho)
+    niveis = defaultdict(list)  # nível -> [índice * 2 + evento]
+    with multiprocessing.Pool(trabalhadores, initializer=_iniciar, initargs=(nome, pasta)) as pool:
+        faixas = [(i, min(i + bloco, esquema.tamanho)) for i in range(0, esquema.tamanho, bloco)]
+        for inicio, bytes_, contagem, empate, eventos in pool.imap_unordered(_analisar, faixas):
+            fim = inicio + len(bytes_)
+            tabela[inicio:fim] = bytes_
+            contagens[inicio:fim] = contagem
+            empata[inicio:fim] = empate
+            for nivel, evento, i in eventos:
+                niveis[nivel].append(i * 2 + evento)
+
+        # Mates são o nível 0; cada nível só agenda eventos nos seguintes
+        novos = [(i, GANHA) for i, byte in enumerate(tabela) if byte == 1]
+        nivel = 0
+        while novos or any(n > nivel for n in niveis):
+            indices = [i for i, _ in novos]
+            partes = pool.map(_antecessores, [indices[i:i + bloco] for i in range(0, len(indices), bloco)])
+            for (_, evento), antes in zip(novos, (a for parte in partes for a in parte)):
+                niveis[nivel + 1].extend(j * 2 + evento for j in antes)
+
+            nivel += 1
+            if nivel >= ILEGAL - 1:
+                raise ValueError(f'{nome}: distância até o mate passa de {ILEGAL - 2} meios-lances')
+            novos = []
+            for codigo in niveis.pop(nivel, ()):
+                i, evento = divmod(codigo, 2)
+                if tabela[i]:
+                    continue
+                if evento == GANHA:
+                    tabela[i] = nivel + 1
+                    novos.append((i, DECREMENTA))
+                else:
+                    contagens[i] -= 1
+                    if not contagens[i] and not empata[i]:
+                        tabela[i] = nivel + 1
+                        novos.append((i, GANHA))
+
+    _gravar(caminho, tabela)
+    if mostrar:
+        validas = esquema.tamanho - tabela.count(ILEGAL)
+        decididas = validas - tabela.count(EMPATE)
+        maior = max((byte for byte in range(1, ILEGAL) if byte in tabela), default=1) - 1
+        mostrar(f'{nome}: {validas} posições, {decididas} decididas, mate mais longo em {maior} plies, '
+                f'{perf_counter() - inicio_geracao:.1f}s')
+    return caminho
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tabelas de finais')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    criar = comandos.add_parser('gerar', help='Gera tabelas por análise retrógrada')
+    criar.add_argument('materiais', nargs='*', help='Ex.: KQK KRK KPK KBNK')
+    criar.add_argument('--todas', type=int, metavar='PECAS', help='Todos os materiais com até PECAS peças')
+    criar.add_argument('--pasta', default='finais')
+    criar.add_argument('--trabalhadores', type=int, help='Processos (padrão: um por núcleo)')
+    consultar = comandos.add_parser('consultar', help='Resultado e melhor lance de uma posição')
+    consultar.add_argument('--pasta', default='finais')
+    consultar.add_argument('--fen', required=True)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'gerar':
+        materiais = list(args.materiais) + (todos(args.todas) if args.todas else [])
+        if not materiais:
+            parser.error('informe os materiais ou --todas')
+        for nome in materiais:
+            nome = normalizar(*nome.upper()[1:].split('K'))[0]
+            if not os.path.exists(os.path.join(args.pasta, nome + EXTENSAO)):
+                gerar(nome, args.pasta, args.trabalhadores)
+        return 0
+
+    from notacao import san
+    jogo = Xadrez.de_fen(args.fen)
+    with Finais(args.pasta) as finais:
+        resposta = finais.sondar(jogo)
+        if resposta is None:
+            print('Fora das tabelas')
+            return 1
+        resultado, plies = resposta
+        print({1: f'Ganha em {plies} plies', 0: 'Empate', -1: f'Perde em {plies} plies'}[resultado])
+        melhor = finais.melhor_lance(jogo)
+        if melhor:
+            print(f'Melhor lance: {san(jogo, melhor[0])}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,532 @@
+from threading import Thread
+
+import pygame as pg
+
+from analises import Analises
+from busca import Busca
+from finais import Finais
+from livro import Livro
+from pecas import *
+from perfil import Perfil
+from recursos import Recursos
+from regras import Xadrez, XEQUE, MATE, AFOGADO
+
+PENSOU = pg.USEREVENT + 1  # Postado pela thread da busca quando ela termina
+ESPERA_MS = 1000  # Teto da espera por eventos: a tela acorda pelo menos uma vez por segundo
+EVENTOS = (pg.QUIT, pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION, pg.MOUSEWHEEL, pg.KEYDOWN, pg.WINDOWEXPOSED, PENSOU)
+TECLA_PERFIL = pg.K_F2  # Liga/desliga o perfil dos quadros
+TECLA_GRAVAR = pg.K_F3  # Grava o resumo do perfil
+TECLA_VOLTAR = pg.K_LEFT  # Volta um lance (até a vez de quem joga na tela)
+TECLA_AVANCAR = pg.K_RIGHT  # Refaz um lance voltado
+TECLA_INICIO = pg.K_HOME
+TECLA_FIM = pg.K_END
+
+
+class Interface:
+    def __init__(self, jogo=None):
+        self.jogo = jogo or Xadrez()
+
+        # Pygame
+        self.running = True
+        self.game = True
+        self.__marked = None
+
+        self.screen_height = 800
+        self.screen_width = int(self.screen_height * 1.5)
+        self.screen = None
+        self.mouse_pos = (-1, -1)
+        self.scroll = 0
+        self.move_show_count = 10
+        self.imgs = None
+        self.recursos = None  # Fontes, textos e sprites em cache (ver recursos.py)
+        self.perfil = Perfil()
+        self.arquivo_perfil = 'perfil.json'
+
+        # Desenho por retângulos sujos: só o que mudou é redesenhado e enviado à tela
+        self.__fundo = None  # Camada estática: casas do tabuleiro e fundo do painel
+        self.__destaques = {}  # (x, y) -> cor das casas marcadas
+        self.__desenhadas = [None] * 64  # (cor, classe) da peça desenhada em cada casa
+        self.__casas_sujas = set()
+        self.__painel_sujo = False
+        self.__tabuleiro_mudou = False  # Comparar as peças com as desenhadas no próximo quadro
+        self.__tudo = False  # A tela inteira foi coberta (promoção, tela inicial)
+
+        # Computador
+        self.computador = ()
+        self.tempo = 1000
+        self.livro = None
+        self.finais = None
+        self.analises = None
+        self.__final = None  # Último resultado das tabelas de finais mostrado, do ponto de vista das brancas
+        self.__busca = Busca()
+        self.__pensando = None  # (thread, resultado, chave da posição buscada)
+        self.__celulas = []  # (meio-lance, notação) das casas do quadro de lances desenhado
+
+    def scrolled_moves(self, quantity):
+        """
+        Janela de `quantity` linhas do quadro de lances, self.scroll linhas acima do fim. Só os meio-lances
+        mostrados são lidos do registro, então rolar custa o mesmo em qualquer ponto da partida.
+        :return: [(meio-lance, notação)] na ordem do quadro (ver Registro.janela)
+        """
+        registro = self.jogo.registro
+        return registro.janela(max(0, registro.linhas() - quantity + self.scroll), quantity)
+
+    def __moves_box(self, width, height):
+        rows = self.move_show_count + 1
+        surface = self.recursos.superficie('lances', (width, height))
+        pg.draw.rect(surface, (0, 0, 0), ((0, 0), (width, height)))  # Black Outline
+        pg.draw.rect(surface, (127, 127, 127), ((2, 2), (width // 2 - 3, height // rows - 3)))  # Top Left
+        pg.draw.rect(surface, (127, 127, 127), ((width // 2 + 1, 2), (width // 2 - 3, height // rows - 3)))  # Top Right
+        pg.draw.rect(surface, (127, 127, 127),
+                     ((2, height // rows + 1), (width // 2 - 3, height * (rows - 1) // rows - 3)))  # Bottom Left
+        pg.draw.rect(surface, (127, 127, 127),
+                     ((width // 2 + 1, height // rows + 1),
+                      (width // 2 - 3, height * (rows - 1) // rows - 3)))  # Bottom Right
+
+        txt_brancas = self.recursos.texto("Brancas", 30, (255, 255, 255))
+        txt_pretas = self.recursos.texto("Pretas", 30, (0, 0, 0))
+        surface.blit(txt_brancas,
+                     ((width / 2 - txt_brancas.get_width()) // 2, (height / rows - txt_brancas.get_height()) // 2))
+        surface.blit(txt_pretas,
+                     ((width * 3 / 2 - txt_brancas.get_width()) // 2, (height / rows - txt_brancas.get_height()) // 2))
+
+        self.__celulas = self.scrolled_moves(rows - 1)
+        atual = self.jogo.registro.atual
+        for i, (ply, move) in enumerate(self.__celulas):
+            #  Terminar Design;
+            w = 2 if i % 2 == 0 else width // 2 + 1
+            h = 2 + height * (i // 2 + 1) // rows
+            if ply is not None and ply == atual - 1:  # Lance da posição no tabuleiro
+                pg.draw.rect(surface, (250, 200, 0), ((w, h), (width // 2 - 3, height // rows - 3)))
+            if ply is not None and ply >= atual:  # Lances voltados, que ainda podem ser refeitos
+                cor = (200, 200, 200) if i % 2 == 0 else (70, 70, 70)
+            else:
+                cor = (255 * (1 - i % 2),) * 3
+            img = self.recursos.texto(move, 35, cor)
+            surface.blit(img, (w, h))
+
+        return surface
+
+    def __eaten_box(self, size, grid_size=4):
+        surface = self.recursos.superficie('comidas', (size, size))
+        surface.fill((0, 0, 0))
+        pg.draw.rect(surface, (0, 0, 0), ((0, 0), (size - 4, size - 4)))  # Black Outline
+        pg.draw.rect(surface, (127, 127, 127), ((2, 2), (size // 2 - 3, size - 4)))  # Left
+        pg.draw.rect(surface, (127, 127, 127), ((size // 2 + 1, 2), (size // 2 - 3, size - 4)))  # Right
+        classes = ['Rei', 'Rainha', 'Torre', 'Cavalo', 'Bispo', 'Peao']
+        img_size = size // (grid_size * 2)
+        sprites = self.recursos.sprites((img_size, img_size))
+        for i, peca in enumerate(sorted(self.jogo.comidas['P'], key=lambda p: classes.index(p.__class__.__name__))):
+            rel_w = i % grid_size
+            rel_h = i // grid_size
+            img = sprites['B'][peca.__class__.__name__]
+            surface.blit(img, (img_size * rel_w + 2, img_size * rel_h + 1))
+        for i, peca in enumerate(sorted(self.jogo.comidas['B'], key=lambda p: classes.index(p.__class__.__name__))):
+            rel_w = i % 3
+            rel_h = i // 3
+            img = sprites['P'][peca.__class__.__name__]
+            surface.blit(img, (size // 2 + img_size * rel_w + 3, img_size * rel_h + 1))
+        return surface
+
+    def __criar_fundo(self):
+        fundo = pg.Surface((self.screen_width, self.screen_height))
+        cor = 255
+        for x in range(8):
+            for y in range(8):
+                self.__draw_rect(fundo, y, x, (cor, cor, cor))
+                cor = 400 - cor
+            cor = 400 - cor
+        pg.draw.rect(fundo, (200, 200, 200),
+                     ((self.screen_height, 0), (self.screen_width - self.screen_height, self.screen_height)))
+        return fundo
+
+    def blit(self):
+        """
+        Redesenha a tela inteira no próximo quadro.
+        """
+        self.__tudo = True
+
+    def __sujar(self, retangulo):
+        """
+        Marca para o próximo quadro as casas e o painel que cruzam um retângulo da tela.
+        """
+        retangulo = pg.Rect(retangulo)
+        for x in range(max(retangulo.top // 100, 0), min((retangulo.bottom - 1) // 100, 7) + 1):
+            for y in range(max(retangulo.left // 100, 0), min((retangulo.right - 1) // 100, 7) + 1):
+                self.__casas_sujas.add((x, y))
+        if retangulo.right > self.screen_height:
+            self.__painel_sujo = True
+
+    def __desenhar_casa(self, x, y):
+        area = pg.Rect(y * 100, x * 100, 100, 100)
+        self.screen.blit(self.__fundo, area, area)
+        if (x, y) in self.__destaques:
+            self.__draw_rect(self.screen, y, x, self.__destaques[x, y])
+        peca = self.jogo.casa([x, y])
+        if peca is not None:
+            self.screen.blit(self.imgs[peca.cor][peca.__class__.__name__], area)
+        self.__desenhadas[x * 8 + y] = peca and (peca.cor, type(peca))
+        return area
+
+    def __desenhar_painel(self):
+        area = pg.Rect(self.screen_height, 0, self.screen_width - self.screen_height, self.screen_height)
+        self.screen.blit(self.__fundo, area, area)
+        self.screen.blit(self.__moves_box(self.screen_height // 3, self.screen_height // 2),
+                         (self.screen_height * 8.1 // 8, self.screen_height // 16))
+        self.screen.blit(self.__eaten_box(self.screen_height // 3, 3),
+                         (self.screen_height * 8.1 // 8, self.screen_height * 10 // 16))
+        return area
+
+    def __desenhar(self):
+        """
+        Desenha o que ficou sujo desde o último quadro. Num quadro sem mudanças não faz nada.
+        :return: Retângulos da tela que mudaram
+        """
+        if self.__tudo:
+            self.__tudo = False
+            self.__tabuleiro_mudou = False
+            self.__casas_sujas.clear()
+            self.__painel_sujo = False
+            for x in range(8):
+                for y in range(8):
+                    self.__desenhar_casa(x, y)
+            self.__desenhar_painel()
+            return [self.screen.get_rect()]
+        if self.__tabuleiro_mudou:  # Roque, en passant e promoção mudam mais casas que origem e destino
+            self.__tabuleiro_mudou = False
+            for x in range(8):
+                for y in range(8):
+                    peca = self.jogo.casa([x, y])
+                    if self.__desenhadas[x * 8 + y] != (peca and (peca.cor, type(peca))):
+                        self.__casas_sujas.add((x, y))
+        if not self.__casas_sujas and not self.__painel_sujo:
+            return []
+        retangulos = [self.__desenhar_casa(x, y) for x, y in self.__casas_sujas]
+        self.__casas_sujas.clear()
+        if self.__painel_sujo:
+            self.__painel_sujo = False
+            retangulos.append(self.__desenhar_painel())
+        return retangulos
+
+    def __atualizar_tela(self):
+        retangulos = self.__desenhar()
+        if retangulos:
+            pg.display.update(retangulos)
+
+    def __text(self, text, color=(0, 0, 0)):
+        img = self.recursos.texto(text, 95, color)
+        img_w, img_h = img.get_size()
+        area = self.screen.blit(img, ((self.screen_width - img_w) // 2, (self.screen_height - img_h) // 2))
+        pg.display.update(area)
+        pos = self.__wait_for_click()
+        self.__sujar(area)
+        return pos
+
+    def __desmarcar(self):
+        self.__casas_sujas.update(self.__destaques)
+        self.__destaques.clear()
+        self.__marked = None
+
+    def __mark(self, x, y):
+        self.__desmarcar()
+        peca = self.jogo.casa([x, y])
+        if peca is None:
+            return
+        self.__marked = [[x, y], []]
+        self.__destaques[x, y] = (100, 150, 250)
+        livro = set()
+        if self.livro is not None and peca.cor == self.jogo.vez:
+            livro = {destino for (origem, destino, _), _ in self.livro.lances(self.jogo) if origem == (x, y)}
+
+        if peca.cor == self.jogo.vez:
+            destinos = self.jogo.destinos((x, y))  # Cache da posição: só uma consulta ao dicionário
+        else:
+            destinos = [destino for _, destino, _ in self.jogo.legal_moves(peca.cor, (x, y))]
+        for x1, y1 in destinos:
+            comer = self.jogo.casa([x1, y1]) is not None or (isinstance(peca, Peao) and y1 != y)
+            roque = isinstance(peca, Rei) and abs(y1 - y) == 2
+            if peca.cor != self.jogo.vez:
+                cor = (250, 250, 100)  # Amarelo
+            elif (x1, y1) in livro:
+                cor = (100, 220, 250)  # Azul claro: lance do livro de aberturas
+            elif roque:
+                cor = (200, 100, 250)  # Roxo
+            elif comer:
+                cor = (250, 100, 150)  # Vermelho
+            else:
+                cor = (100, 250, 150)  # Verde
+            self.__destaques[x1, y1] = cor
+            self.__marked[1].append((x1, y1))
+        self.__casas_sujas.update(self.__destaques)
+
+    @staticmethod
+    def __draw_rect(screen, x, y, color):
+        pg.draw.rect(screen, (0, 0, 0), ((x * 100, y * 100), (100, 100)))
+        pg.draw.rect(screen, color, ((x * 100 + 1, y * 100 + 1), (98, 98)))
+
+    def __wait_for_click(self):
+        """
+        Espera um clique. Um PENSOU que chegue enquanto isso volta para a fila, senão o lance do computador só
+        apareceria depois de ESPERA_MS.
+        """
+        pensou = False
+        try:
+            while self.running:
+                eventos = self.__esperar()
+                pensou = pensou or any(evt.type == PENSOU for evt in eventos)
+                for evt in eventos:
+                    if evt.type == pg.QUIT:
+                        self.running = False
+                        self.game = False
+                        return -1, -1
+                    elif evt.type == pg.MOUSEBUTTONDOWN:
+                        return evt.pos
+        finally:
+            if pensou:
+                pg.event.post(pg.event.Event(PENSOU))
+
+    def __promote(self, color):
+        self.screen.fill((255, 255, 255))
+        pg.draw.rect(self.screen, (0, 0, 0), ((self.screen_width // 2 - 1, 0), (2, self.screen_height)))
+        pg.draw.rect(self.screen, (0, 0, 0), ((0, self.screen_height // 2 - 1), (self.screen_width, 2)))
+        possibs = ['Rainha', 'Cavalo', 'Bispo', 'Torre']
+        sprites = self.recursos.sprites((self.screen_width // 8, self.screen_height // 8))
+        for i, peca in enumerate(possibs):
+            img = sprites[color][peca]
+            self.screen.blit(img, (
+                (i // 2) * (self.screen_width // 2) + 3 * self.screen_width // 16,
+                (i % 2) * (self.screen_height // 2) + 3 * self.screen_height // 16))
+        pg.display.update()
+        self.__tudo = True
+        try:
+            x, y = self.__wait_for_click()
+        except TypeError:
+            return
+        return CLASSES[possibs[(x * 2) // self.screen_width * 2 + (y * 2) // self.screen_height]]
+
+    def __start_screen(self):
+        self.screen.fill((255, 255, 255))
+        while self.running:
+            w = self.screen_width * 1 // 3
+            h = self.screen_height * 1 // 3
+            pg.draw.rect(self.screen, (100, 100, 100), ((w, h), (self.screen_width // 3, self.screen_height // 3)))
+            w, h = self.__text("Iniciar")
+            if abs(w - self.screen_width / 2) < 100 and abs(h - self.screen_height / 2) < 100:
+                self.__busca.parar = True  # Uma busca em andamento termina sem jogar
+                self.__busca = Busca(livro=self.livro, finais=self.finais, analises=self.analises)
+                self.__pensando = None
+                self.__final = None
+                self.jogo = Xadrez.inicial()
+                self.jogo.promocao = self.__promote
+                self.jogo.finais = self.finais
+                self.jogo.analises = self.analises
+                self.jogo.ouvir(self.__evento)
+                return
+
+    def __esperar(self):
+        """
+        Dorme até chegar entrada, o resultado de uma busca ou o fim de ESPERA_MS.
+        :return: Eventos que chegaram
+        """
+        evento = pg.event.wait(ESPERA_MS)
+        if evento.type == pg.NOEVENT:
+            return []
+        return [evento] + pg.event.get()
+
+    def event_listener(self, eventos=None):
+        """
+        :param eventos: Eventos já tirados da fila (padrão: os que estiverem nela agora)
+        """
+        scrolled = False
+        for evt in pg.event.get() if eventos is None else eventos:
+            if evt.type == pg.QUIT:
+                self.running = False
+                self.game = False
+            elif evt.type == pg.WINDOWEXPOSED:
+                self.blit()
+            elif evt.type == pg.KEYDOWN and evt.key == TECLA_PERFIL:
+                ligado = self.perfil.alternar()
+                pg.display.set_caption("Chess Game" + (" (perfil ligado)" if ligado else ""))
+            elif evt.type == pg.KEYDOWN and evt.key == TECLA_GRAVAR:
+                self.perfil.gravar(self.arquivo_perfil)
+            elif evt.type == pg.KEYDOWN and evt.key in (TECLA_VOLTAR, TECLA_AVANCAR, TECLA_INICIO, TECLA_FIM):
+                self.__navegar(evt.key)
+            elif evt.type == pg.MOUSEBUTTONDOWN and self.mouse_pos[0] >= self.screen_height:
+                self.__clique_lances(self.mouse_pos)
+            elif evt.type == pg.MOUSEBUTTONDOWN:
+                w = self.mouse_pos[0] // 100
+                h = self.mouse_pos[1] // 100
+                if self.__marked:
+                    if (h, w) in self.__marked[1] and self.jogo.vez not in self.computador:
+                        origem = self.__marked[0]
+                        self.__desmarcar()
+                        self.jogo.mover(origem, [h, w])
+                    elif self.jogo.casa([h, w]) is not None:
+                        self.__mark(h, w)
+                    else:
+                        self.__desmarcar()
+                else:
+                    self.__mark(h, w)
+            elif evt.type == pg.MOUSEMOTION:
+                self.mouse_pos = evt.pos
+            elif evt.type == pg.MOUSEWHEEL and not scrolled:
+                scroll = max(min(self.scroll - evt.y, 0), min(-self.jogo.registro.linhas() + self.move_show_count, 0))
+                self.__painel_sujo |= scroll != self.scroll
+                self.scroll = scroll
+                scrolled = True
+
+    def __navegar(self, tecla):
+        """
+        Anda pelo registro da partida. Voltando ou avançando, pula o lance do computador para parar na vez de
+        quem joga na tela.
+        """
+        registro = self.jogo.registro
+        if tecla == TECLA_INICIO:
+            alvo = 0
+        elif tecla == TECLA_FIM:
+            alvo = len(registro)
+        else:
+            passo = -1 if tecla == TECLA_VOLTAR else 1
+            alvo = registro.atual + passo
+            if len(self.computador) == 1 and registro.cor(alvo) in self.computador and 0 < alvo < len(registro):
+                alvo += passo
+        self.__desmarcar()
+        self.jogo.ir_para(alvo)
+
+    def __clique_lances(self, pos):
+        """
+        Clique no quadro de lances: leva o tabuleiro para depois do meio-lance clicado.
+        """
+        largura, altura = self.screen_height // 3, self.screen_height // 2
+        x = pos[0] - self.screen_height * 8.1 // 8
+        y = pos[1] - self.screen_height // 16
+        if not (0 <= x < largura and 0 <= y < altura):
+            return
+        linha = int(y * (self.move_show_count + 1) // altura) - 1
+        i = linha * 2 + int(x * 2 // largura)
+        if linha >= 0 and i < len(self.__celulas) and self.__celulas[i][0] is not None:
+            self.__desmarcar()
+            self.jogo.ir_para(self.__celulas[i][0] + 1)
+
+    def __mostrar_atual(self):
+        """
+        Rola o quadro de lances até a linha do lance atual, se ela estiver fora da janela.
+        """
+        registro = self.jogo.registro
+        linhas = registro.linhas()
+        linha = (registro.atual - 1 + (registro.primeira == 'P')) // 2
+        primeira = max(0, linhas - self.move_show_count + self.scroll)
+        if linha < primeira:
+            self.scroll -= primeira - linha
+        elif linha >= primeira + self.move_show_count:
+            self.scroll += linha - primeira - self.move_show_count + 1
+        self.scroll = max(min(self.scroll, 0), min(self.move_show_count - linhas, 0))
+
+    def __evento(self, evento, dados):
+        if evento in ('lance', 'registro'):
+            self.__tabuleiro_mudou = True
+            self.__painel_sujo = True
+            if evento == 'registro':
+                self.__mostrar_atual()
+            return
+        self.__atualizar_tela()  # As mensagens vão por cima do lance já desenhado
+        if evento == 'recusado':
+            if dados['motivo'] == 'vez':
+                self.__text("Não é sua vez")
+            elif dados['motivo'] == 'propria':
+                self.__text("Nao pode comer sua peça!", (255, 0, 0))
+        elif evento == 'estado':
+            if dados['estado'] == MATE:
+                self.__text("Cheque Mate", (255, 0, 0))
+                self.game = False
+            elif dados['estado'] == XEQUE:
+                self.__text('Cheque', (250, 200, 0))
+            elif dados['estado'] == AFOGADO:
+                self.__text("Rei Afogado")
+        elif evento == 'final':
+            final = dados['resultado'] if dados['cor'] == 'B' else -dados['resultado']
+            if final != self.__final:  # Só quando o resultado teórico muda
+                self.__final = final
+                self.__text({1: 'Brancas ganham', 0: 'Empate', -1: 'Pretas ganham'}[final], (0, 120, 200))
+
+    def __computador(self):
+        """
+        Na vez do computador, dispara a busca numa thread e joga o lance quando ela termina,
+        sem travar o laço da tela. A thread avisa o fim com um evento PENSOU, que acorda o laço.
+        """
+        if self.__pensando is not None:
+            thread, resultado, chave = self.__pensando
+            if thread.is_alive():
+                return
+            self.__pensando = None
+            # Se a posição mudou enquanto a busca pensava (lance voltado ou refeito), o resultado não vale mais
+            if resultado and resultado[0] is not None and self.jogo.chave == chave:
+                self.__desmarcar()
+                self.jogo.mover(*resultado[0])
+        if self.game and self.__pensando is None and self.jogo.vez in self.computador:
+            resultado = []
+            thread = Thread(target=self.__pensar, args=(self.jogo.clonar(), list(self.jogo.chaves), resultado),
+                            daemon=True)
+            self.__pensando = thread, resultado, self.jogo.chave
+            thread.start()
+
+    def __pensar(self, posicao, historico, resultado):
+        try:
+            resultado.append(self.__busca.best_move(posicao, self.tempo, historico=historico))
+        finally:
+            pg.event.post(pg.event.Event(PENSOU))
+
+    def loop(self, computador=(), tempo=1000, livro=None, finais=None, perfil=None, analises=None):
+        """
+        Laço por eventos: dorme em pg.event.wait até chegar entrada ou o fim de uma busca, e cada quadro só
+        desenha o que mudou. F2 liga/desliga o perfil dos quadros e F3 grava o resumo dele.
+        :param computador: Cores jogadas pelo computador ('B', 'P' ou as duas)
+        :param tempo: Tempo de cada lance do computador, em milissegundos
+        :param livro: Caminho de um livro de aberturas Polyglot, usado pelo computador e nas dicas
+        :param finais: Pasta das tabelas de finais, usadas pelo computador e para anunciar o resultado teórico
+        :param perfil: Arquivo do resumo do perfil; com ele o perfil começa ligado e é gravado ao sair
+        :param analises: Banco do cache persistente de análises (lances legais, estados e buscas)
+        """
+        self.computador = tuple(computador)
+        self.tempo = tempo
+        self.livro = Livro(livro) if livro else None
+        self.finais = Finais(finais) if finais else None
+        self.analises = Analises(analises) if analises else None
+        self.__busca = Busca(livro=self.livro, finais=self.finais, analises=self.analises)
+        if perfil:
+            self.arquivo_perfil = perfil
+            self.perfil = Perfil(ligado=True)
+        pg.init()
+        pg.event.set_blocked(None)
+        pg.event.set_allowed(EVENTOS)
+        self.screen: pg.Surface = pg.display.set_mode((self.screen_width, self.screen_height))
+        self.recursos = Recursos()
+        # Tabuleiro, peças comidas e tela de promoção
+        self.recursos.preparar((100, 100), ((self.screen_height // 3) // 6,) * 2,
+                               (self.screen_width // 8, self.screen_height // 8))
+        self.imgs = self.recursos.sprites((100, 100))
+        self.__fundo = self.__criar_fundo()
+        pg.display.set_caption("Chess Game")
+        pg.display.set_icon(self.imgs['P']['Rei'])
+        while self.running:
+            self.__start_screen()
+            self.__desmarcar()
+            self.blit()
+            self.__computador()
+            self.__atualizar_tela()
+            while self.game:
+                eventos = self.__esperar()
+                self.perfil.comecar(len(eventos))
+                with self.perfil.etapa('atualizar'):
+                    self.event_listener(eventos)
+                    self.__computador()
+                with self.perfil.etapa('desenhar'):
+                    retangulos = self.__desenhar()
+                with self.perfil.etapa('enviar'):
+                    if retangulos:
+                        pg.display.update(retangulos)
+                self.perfil.terminar()
+        if perfil:
+            self.perfil.gravar(perfil)
+        if self.analises is not None:
+            self.analises.fechar()
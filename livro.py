@@ -0,0 +1,174 @@
+"""
+Livro de aberturas no formato Polyglot (.bin): entradas de 16 bytes big-endian (chave, lance, peso, aprendizado)
+ordenadas pela chave. O arquivo é aberto com mmap e consultado por busca binária, então abrir um livro não lê o
+arquivo e a memória residente não cresce com o tamanho dele.
+
+As chaves são as chaves Zobrist deste projeto (zobrist.py), com a mesma regra de en passant do Polyglot, e não a
+tabela Random64 do Polyglot: o formato é o mesmo, mas livros de outros programas não casam com as nossas chaves.
+A promoção a Supreme usa o código 5, que o Polyglot não tem.
+
+    python livro.py construir livro.bin partidas.pgn --lances 16
+    python livro.py consultar livro.bin --fen "<FEN>"
+"""
+import argparse
+import mmap
+import random
+import struct
+import sys
+from collections import defaultdict
+
+from notacao import ler_san, san
+from pecas import *
+from pgn import ler_pgn
+from regras import Xadrez
+
+ENTRADA = struct.Struct('>QHHI')  # chave, lance, peso, aprendizado
+_CHAVE = struct.Struct('>Q')
+_PROMOCOES = (None, Cavalo, Bispo, Torre, Rainha, Supreme)
+
+
+def codificar(lance, roque=False):
+    """
+    Lance no formato Polyglot: colunas e linhas de 3 bits (linha 0 = 1ª fileira), roque como rei captura a torre.
+    """
+    (x1, y1), (x2, y2), promocao = lance
+    if roque:
+        y2 = 7 if y2 > y1 else 0
+    return y2 | (7 - x2) << 3 | y1 << 6 | (7 - x1) << 9 | _PROMOCOES.index(promocao) << 12
+
+
+def decodificar(codigo):
+    """
+    :return: (origem, destino, promocao) com o roque ainda como rei captura a torre
+    """
+    destino = 7 - (codigo >> 3 & 7), codigo & 7
+    origem = 7 - (codigo >> 9 & 7), codigo >> 6 & 7
+    return origem, destino, _PROMOCOES[codigo >> 12 & 7]
+
+
+class Livro:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.__arquivo = open(caminho, 'rb')
+        try:
+            self.__mapa = mmap.mmap(self.__arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Arquivo vazio
+            self.__mapa = b''
+        self.entradas = len(self.__mapa) // ENTRADA.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def __len__(self):
+        return self.entradas
+
+    def fechar(self):
+        if isinstance(self.__mapa, mmap.mmap):
+            self.__mapa.close()
+        self.__arquivo.close()
+
+    def buscar(self, chave):
+        """
+        :return: [(lance Polyglot, peso), ...] da posição, na ordem do arquivo
+        """
+        mapa = self.__mapa
+        inicio, fim = 0, self.entradas
+        while inicio < fim:  # Primeira entrada com a chave
+            meio = (inicio + fim) // 2
+            if _CHAVE.unpack_from(mapa, meio * ENTRADA.size)[0] < chave:
+                inicio = meio + 1
+            else:
+                fim = meio
+        res = []
+        for i in range(inicio, self.entradas):
+            guardada, lance, peso, _ = ENTRADA.unpack_from(mapa, i * ENTRADA.size)
+            if guardada != chave:
+                break
+            res.append((lance, peso))
+        return res
+
+    def lances(self, posicao):
+        """
+        :return: [((origem, destino, promocao), peso), ...] só com os lances do livro legais na posição
+        """
+        legais = {}
+        for lance in posicao.legal_moves(posicao.vez, promocoes=_PROMOCOES[1:]):
+            roque = isinstance(posicao.casa(lance[0]), Rei) and abs(lance[1][1] - lance[0][1]) == 2
+            legais[codificar(lance, roque)] = lance
+        return [(legais[codigo], peso) for codigo, peso in self.buscar(posicao.chave) if codigo in legais]
+
+    def escolher(self, posicao, modo='peso', gerador=random):
+        """
+        :param modo: 'peso' sorteia proporcionalmente ao peso, 'melhor' fica com o de maior peso
+        :return: Lance (origem, destino, promocao) ou None fora do livro
+        """
+        opcoes = [(lance, peso) for lance, peso in self.lances(posicao) if peso]
+        if not opcoes:
+            return None
+        if modo == 'melhor':
+            return max(opcoes, key=lambda op: op[1])[0]
+        return gerador.choices([lance for lance, _ in opcoes], [peso for _, peso in opcoes])[0]
+
+
+def construir(pgns, saida, lances=16, minimo=1):
+    """
+    Monta um livro a partir de coleções PGN. Cada lance dos primeiros `lances` meios-lances de cada partida soma
+    2 pontos por vitória e 1 por empate de quem o jogou; os pesos são escalados para caber em 16 bits.
+    :param minimo: Número mínimo de partidas com o lance para ele entrar no livro
+    :return: Número de entradas gravadas
+    """
+    pontos = defaultdict(int)
+    vezes = defaultdict(int)
+    for caminho in pgns:
+        with open(caminho, encoding='utf-8', errors='replace') as arquivo:
+            for partida in ler_pgn(arquivo):
+                fen = partida['tags'].get('FEN')
+                jogo = Xadrez.de_fen(fen) if fen else Xadrez.inicial()
+                for texto in partida['lances'][:lances]:
+                    try:
+                        lance = ler_san(jogo, texto)
+                    except ValueError:
+                        break
+                    roque = isinstance(jogo.casa(lance[0]), Rei) and abs(lance[1][1] - lance[0][1]) == 2
+                    chave = jogo.chave, codificar(lance, roque)
+                    vencedor = {'1-0': 'B', '0-1': 'P'}.get(partida['resultado'])
+                    pontos[chave] += 2 if vencedor == jogo.vez else 1 if partida['resultado'] == '1/2-1/2' else 0
+                    vezes[chave] += 1
+                    jogo.make_move(*lance)
+
+    entradas = [(chave, lance, pontos[chave, lance]) for chave, lance in pontos if vezes[chave, lance] >= minimo]
+    escala = max([p for _, _, p in entradas] + [1]) / 0xFFFF
+    with open(saida, 'wb') as arquivo:
+        for chave, lance, peso in sorted(entradas):
+            arquivo.write(ENTRADA.pack(chave, lance, round(peso / escala) if escala > 1 else peso, 0))
+    return len(entradas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Livro de aberturas Polyglot')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    montar = comandos.add_parser('construir', help='Monta um livro a partir de arquivos PGN')
+    montar.add_argument('saida')
+    montar.add_argument('pgns', nargs='+')
+    montar.add_argument('--lances', type=int, default=16, help='Meios-lances de cada partida que entram no livro')
+    montar.add_argument('--minimo', type=int, default=1, help='Partidas mínimas por lance')
+    consultar = comandos.add_parser('consultar', help='Lances do livro numa posição')
+    consultar.add_argument('livro')
+    consultar.add_argument('--fen')
+    args = parser.parse_args(argv)
+
+    if args.comando == 'construir':
+        print(f'{construir(args.pgns, args.saida, args.lances, args.minimo)} entradas')
+        return 0
+    jogo = Xadrez.de_fen(args.fen) if args.fen else Xadrez.inicial()
+    with Livro(args.livro) as livro:
+        for lance, peso in sorted(livro.lances(jogo), key=lambda op: -op[1]):
+            print(f'{san(jogo, lance):>8} {peso}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Posições em lote com NumPy, para montar conjuntos de treino e analisar muitas posições de uma vez sem andar peça por
+peça no `tabuleiro`. Tudo parte do retrato de 67 bytes (posicao.Posicao): o lote inteiro vira uma única matriz de
+bytes e a codificação e a avaliação são operações sobre ela.
+
+    planos, atributos = codificar(jogos)    N x 14 x 8 x 8 e N x 13 (ver codificar)
+    avaliar(jogos)                          N valores, os mesmos de avaliacao.avaliar
+
+    python lote.py -n 20000                 Posições/s de cada etapa, contra o laço sobre as peças
+"""
+import argparse
+import json
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from avaliacao import PST, FASE, FASE_TOTAL, separar, pontos_completos, interpolar
+from posicao import Posicao, CORES, TIPOS, CODIGOS, _partidas
+
+PLANOS = len(CORES) * len(TIPOS)  # Plano = código da Posicao - 1: brancas 0-6, pretas 7-13, na ordem de TIPOS
+ATRIBUTOS = 1 + 4 + 8  # Vez (1 = pretas), 4 direitos de roque (zobrist.DIREITOS), coluna do en passant
+
+
+def _tabelas():
+    """
+    Tabelas peça-casa separadas em meio-jogo e final, indexadas pelo código da Posicao (0 = casa vazia).
+    """
+    meio = np.zeros((PLANOS + 1, 64), np.int32)
+    final = np.zeros((PLANOS + 1, 64), np.int32)
+    fase = np.zeros(PLANOS + 1, np.int32)
+    for (cor, classe), codigo in CODIGOS.items():
+        meio[codigo], final[codigo] = zip(*map(separar, PST[classe][cor]))
+        fase[codigo] = FASE[classe]
+    return meio, final, fase
+
+
+_MEIO, _FINAL, _FASE = _tabelas()
+_CASAS = np.arange(64)
+_TAMANHO = len(Posicao(bytes(64)))
+
+
+def matriz(posicoes):
+    """
+    :param posicoes: Posicao, Xadrez ou Bitboard (as duas últimas viram Posicao)
+    :return: Matriz N x 67 de bytes, uma linha por posição (vista sobre um único buffer)
+    """
+    retratos = [p if isinstance(p, Posicao) else p.posicao() for p in posicoes]
+    return np.frombuffer(b''.join(retratos), np.uint8).reshape(len(retratos), _TAMANHO)
+
+
+def codificar(posicoes):
+    """
+    :return: (planos, atributos)
+        planos: uint8 N x 14 x 8 x 8, um plano por cor e tipo (ver PLANOS), linha 0 = oitava fileira
+        atributos: uint8 N x 13, vez, direitos de roque e coluna do peão que pode ser capturado en passant
+    """
+    dados = posicoes if isinstance(posicoes, np.ndarray) else matriz(posicoes)
+    n = len(dados)
+    casas = dados[:, :64]
+    planos = np.zeros((n, PLANOS + 1, 64), np.uint8)
+    planos[np.arange(n)[:, None], casas, _CASAS] = 1  # O plano 0 recebe as casas vazias e é descartado
+    atributos = np.zeros((n, ATRIBUTOS), np.uint8)
+    atributos[:, 0] = dados[:, 64]
+    atributos[:, 1:5] = dados[:, 65, None] >> np.arange(4) & 1
+    passant = dados[:, 66].astype(np.int16) - 1
+    com_passant = passant >= 0
+    atributos[com_passant, 5 + passant[com_passant] % 8] = 1
+    return planos[:, 1:].reshape(n, PLANOS, 8, 8), atributos
+
+
+def avaliar(posicoes):
+    """
+    Avaliação estática do lote (material e tabelas peça-casa interpolados pela fase), igual à de avaliacao.avaliar.
+    :return: int32 N, do ponto de vista de quem está na vez
+    """
+    dados = posicoes if isinstance(posicoes, np.ndarray) else matriz(posicoes)
+    casas = dados[:, :64]
+    meio = _MEIO[casas, _CASAS].sum(axis=1)
+    final = _FINAL[casas, _CASAS].sum(axis=1)
+    fase = np.minimum(_FASE[casas].sum(axis=1), FASE_TOTAL)
+    valor = (meio * fase + final * (FASE_TOTAL - fase)) // FASE_TOTAL
+    return np.where(dados[:, 64] == 1, -valor, valor).astype(np.int32)
+
+
+# Benchmark
+
+def _por_pecas(jogos):
+    """
+    Referência sem NumPy: planos e avaliação andando pelas peças de cada posição.
+    """
+    planos, valores = [], []
+    for jogo in jogos:
+        plano = [[0] * 64 for _ in range(PLANOS)]
+        for peca in jogo.tabuleiro:
+            plano[CODIGOS[peca.cor, type(peca)] - 1][peca.x * 8 + peca.y] = 1
+        planos.append(plano)
+        pontos, fase = pontos_completos(jogo.tabuleiro)
+        valor = interpolar(pontos, fase)
+        valores.append(valor if jogo.vez == 'B' else -valor)
+    return planos, valores
+
+
+def medir(n=20000, semente=0):
+    """
+    :return: {etapa: posições por segundo}, com os valores do lote já conferidos contra avaliacao
+    """
+    jogos = [jogo.clonar() for jogo in _partidas(n, semente)]
+    res = {}
+
+    inicio = perf_counter()
+    retratos = [jogo.posicao() for jogo in jogos]
+    res['retratos'] = n / (perf_counter() - inicio)
+
+    inicio = perf_counter()
+    dados = matriz(retratos)
+    res['matriz'] = n / (perf_counter() - inicio)
+
+    inicio = perf_counter()
+    codificar(dados)
+    res['codificar'] = n / (perf_counter() - inicio)
+
+    inicio = perf_counter()
+    valores = avaliar(dados)
+    res['avaliar'] = n / (perf_counter() - inicio)
+
+    inicio = perf_counter()
+    _, esperados = _por_pecas(jogos)
+    res['por_pecas'] = n / (perf_counter() - inicio)
+
+    if valores.tolist() != esperados:
+        raise AssertionError('A avaliação em lote difere de avaliacao.interpolar')
+    return {etapa: round(taxa) for etapa, taxa in res.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Codificação e avaliação de posições em lote')
+    parser.add_argument('-n', '--posicoes', type=int, default=20000)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args(argv)
+    res = medir(args.posicoes, args.semente)
+    for etapa, taxa in res.items():
+        print(f'{etapa:>10} {taxa:>14,} posições/s')
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(res, arquivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
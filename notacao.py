@@ -0,0 +1,120 @@
+"""
+Notação algébrica (SAN) nos dois sentidos: gera a notação de um lance com desambiguação, capturas, promoção,
+roque e sufixos de xeque/mate, e lê uma notação de volta para o lance legal (origem, destino, promocao).
+
+Funciona com qualquer posição que tenha a API de regras de Xadrez (Xadrez ou Bitboard).
+"""
+import re
+
+from pecas import *
+
+LETRAS = {Peao: '', Cavalo: 'N', Bispo: 'B', Torre: 'R', Rainha: 'Q', Rei: 'K', Supreme: 'S'}
+CLASSES_SAN = {letra: classe for classe, letra in LETRAS.items() if letra}
+PROMOCOES_SAN = (*PROMOCOES, Supreme)
+
+_SAN = re.compile(r'([KQRBNS])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([QRBNS]))?')
+_COORDENADAS = re.compile(r'[a-h][1-8][a-h][1-8][qrbns]?')
+
+
+def nome_casa(casa):
+    x, y = casa
+    return f"{'abcdefgh'[y]}{8 - x}"
+
+
+def casa_de_nome(nome):
+    return 8 - int(nome[1]), 'abcdefgh'.index(nome[0])
+
+
+def ler_coordenadas(texto):
+    """
+    Lê um lance em coordenadas (e2e4, e7e8q; o inverso de perft.coordenadas), sem verificar se é legal.
+    :return: (origem, destino, promocao); promocao None quando o texto não tem a letra
+    """
+    texto = texto.strip()
+    if not _COORDENADAS.fullmatch(texto):
+        raise ValueError(f'Lance inválido: {texto}')
+    promocao = CLASSES_SAN[texto[4].upper()] if len(texto) > 4 else None
+    return casa_de_nome(texto[:2]), casa_de_nome(texto[2:4]), promocao
+
+
+def san(posicao, lance, sufixo=True, mate='#'):
+    """
+    :param lance: (origem, destino, promocao) legal na posição, com a vez de quem joga
+    :param sufixo: Acrescenta '+' ou o sufixo de mate; custa aplicar o lance e gerar as respostas
+    :param mate: Sufixo de mate ('#' na SAN padrão)
+    """
+    (x1, y1), (x2, y2), promocao = lance
+    peca = posicao.casa((x1, y1))
+    tipo = type(peca)
+    if tipo is Rei and abs(y2 - y1) == 2:
+        texto = 'O-O' if y2 > y1 else 'O-O-O'
+    else:
+        captura = posicao.casa((x2, y2)) is not None or (tipo is Peao and y1 != y2)
+        if tipo is Peao:
+            texto = 'abcdefgh'[y1] + 'x' if captura else ''
+        else:
+            texto = LETRAS[tipo] + _desambiguar(posicao, peca, (x1, y1), (x2, y2))
+            if captura:
+                texto += 'x'
+        texto += nome_casa((x2, y2))
+        if tipo is Peao and x2 in (0, 7):
+            texto += '=' + LETRAS[promocao or Supreme]
+    if sufixo:
+        texto += _sufixo(posicao, lance, mate)
+    return texto
+
+
+def _desambiguar(posicao, peca, origem, destino):
+    outras = {o for o, d, _ in posicao.legal_moves(peca.cor) if d == destino and o != origem
+              and type(posicao.casa(o)) is type(peca)}
+    if not outras:
+        return ''
+    if all(o[1] != origem[1] for o in outras):
+        return 'abcdefgh'[origem[1]]
+    if all(o[0] != origem[0] for o in outras):
+        return str(8 - origem[0])
+    return nome_casa(origem)
+
+
+def _sufixo(posicao, lance, mate):
+    desfazer = posicao.make_move(*lance)
+    try:
+        rei = posicao.rei(posicao.vez)
+        if rei is None or not posicao.atacada(rei.pos, 'P' if posicao.vez == 'B' else 'B'):
+            return ''
+        return mate if next(posicao.legal_moves(posicao.vez), None) is None else '+'
+    finally:
+        posicao.unmake_move(desfazer)
+
+
+def ler_san(posicao, texto):
+    """
+    Lance legal descrito pela notação, para quem está na vez. Aceita sufixos (+, #, ++, !, ?), roque com O ou 0
+    e promoção com ou sem '='.
+    :raise ValueError: Se a notação é inválida, ilegal ou ambígua
+    """
+    limpo = texto.rstrip('+#!?')
+    lances = list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES_SAN))
+    if limpo in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        longo = len(limpo) == 5
+        candidatos = [lance for lance in lances if isinstance(posicao.casa(lance[0]), Rei)
+                      and lance[1][1] - lance[0][1] == (-2 if longo else 2)]
+    else:
+        m = _SAN.fullmatch(limpo)
+        if m is None:
+            raise ValueError(f'Notação inválida: {texto}')
+        letra, coluna, linha, _, destino, promocao = m.groups()
+        tipo = CLASSES_SAN[letra] if letra else Peao
+        destino = casa_de_nome(destino)
+        promocao = CLASSES_SAN[promocao] if promocao else None
+        candidatos = [
+            lance for lance in lances
+            if lance[1] == destino and type(posicao.casa(lance[0])) is tipo and lance[2] is promocao
+            and (coluna is None or lance[0][1] == 'abcdefgh'.index(coluna))
+            and (linha is None or lance[0][0] == 8 - int(linha))
+        ]
+    if not candidatos:
+        raise ValueError(f'Lance ilegal: {texto}')
+    if len(candidatos) > 1:
+        raise ValueError(f'Lance ambíguo: {texto}')
+    return candidatos[0]
@@ -0,0 +1,164 @@
+"""
+Busca paralela Lazy SMP: vários processos buscam a mesma posição ao mesmo tempo, compartilhando uma única tabela de
+transposição em memória compartilhada. Os ajudantes começam o aprofundamento uma profundidade à frente e
+preenchem a tabela com cortes que o trabalhador principal aproveita.
+
+    with BuscaParalela(4) as busca:
+        lance = busca.best_move(Xadrez.inicial(), 2000)
+
+    python paralelo.py -d 5 --trabalhadores 1 2 4 8    Tempo até a profundidade e nós/s por número de processos
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from time import perf_counter, sleep
+
+from bitboard import Bitboard
+from busca import Busca, MATE, MAX_PLY
+from finais import Finais
+from perft import POSICOES, coordenadas, _commit
+from regras import Xadrez
+from transposicao import Transposicao, ENTRADA, BALDE
+
+_busca = None  # Busca de cada processo trabalhador
+
+
+def _iniciar(buffer, parada, finais):
+    global _busca
+    _busca = Busca(Transposicao(buffer=buffer), finais=finais and Finais(finais))
+    _busca.parada = parada
+
+
+def _aquecer():
+    sleep(0.1)
+
+
+def _pensar(retrato, time_ms, profundidade, nos, historico, inicio):
+    lance = _busca.best_move(Bitboard.de_posicao(retrato), time_ms, profundidade, nos, historico, inicio)
+    return lance, _busca.profundidade, _busca.valor, _busca.nos
+
+
+class BuscaParalela:
+    def __init__(self, trabalhadores=None, megabytes=16, livro=None, finais=None):
+        """
+        :param trabalhadores: Número de processos (padrão: um por núcleo)
+        :param megabytes: Tamanho da tabela de transposição compartilhada
+        :param livro: Livro de aberturas consultado no processo principal antes de distribuir a busca
+        :param finais: Tabelas de finais (finais.Finais); cada processo abre as suas sobre os mesmos arquivos
+        """
+        self.livro = livro
+        self.finais = finais
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        baldes = 1 << max(0, (megabytes * 2 ** 20 // (ENTRADA.size * BALDE)).bit_length() - 1)
+        self.buffer = multiprocessing.RawArray('B', baldes * BALDE * ENTRADA.size)
+        self.tt = Transposicao(buffer=self.buffer)  # Vista do processo principal, para estatísticas
+        self.__parada = multiprocessing.Event()
+        self.__pool = ProcessPoolExecutor(self.trabalhadores, initializer=_iniciar,
+                                          initargs=(self.buffer, self.__parada, finais and finais.pasta))
+        # Sobe todos os processos agora, para que a primeira busca não pague a criação deles
+        wait([self.__pool.submit(_aquecer) for _ in range(self.trabalhadores)])
+
+        self.nos = 0
+        self.profundidade = 0
+        self.valor = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def fechar(self):
+        self.__parada.set()
+        self.__pool.shutdown()
+
+    def best_move(self, posicao, time_ms=1000, profundidade=MAX_PLY, nos=None, historico=()):
+        """
+        Mesmo contrato de Busca.best_move. Os processos buscam em Bitboard; a resposta é a do trabalhador que
+        completou a maior profundidade (o principal em caso de empate).
+        :param nos: Orçamento de nós de todos os processos juntos, dividido igualmente entre eles
+        """
+        if self.livro is not None:
+            lance = self.livro.escolher(posicao)
+            if lance is not None:
+                self.nos = self.profundidade = self.valor = 0
+                return lance
+        if self.finais is not None and posicao.quantidade <= self.finais.maximo:
+            resposta = self.finais.melhor_lance(posicao)
+            if resposta is not None:
+                lance, (resultado, plies) = resposta
+                self.nos = self.profundidade = 0
+                self.valor = resultado * (MATE - plies) if resultado else 0
+                return lance
+        retrato = posicao.posicao()  # Cada processo recebe os 67 bytes e monta o seu Bitboard
+        self.__parada.clear()
+        por_processo = None if nos is None else max(1, nos // self.trabalhadores)
+        tarefas = [self.__pool.submit(_pensar, retrato, time_ms, profundidade, por_processo, list(historico),
+                                      1 + i % 2)
+                   for i in range(self.trabalhadores)]
+        # Quando o principal termina, os ajudantes param
+        wait([tarefas[0]], return_when=FIRST_COMPLETED)
+        self.__parada.set()
+        resultados = [tarefa.result() for tarefa in tarefas]
+        self.__parada.clear()
+
+        melhor = max(resultados, key=lambda r: r[1] if r[0] else -1)
+        if resultados[0][1] >= melhor[1]:
+            melhor = resultados[0]
+        lance, self.profundidade, self.valor, _ = melhor
+        self.nos = sum(r[3] for r in resultados)
+        return lance
+
+
+# Benchmark
+
+BENCH = ('inicial', 'kiwipete', 'posicao3', 'posicao4', 'posicao6')
+
+
+def medir(trabalhadores, profundidade, posicoes=BENCH, megabytes=16):
+    """
+    Tempo até a profundidade e nós/s com um número de processos, uma tabela nova por posição.
+    """
+    resultados = []
+    for nome in posicoes:
+        with BuscaParalela(trabalhadores, megabytes) as busca:
+            inicio = perf_counter()
+            lance = busca.best_move(Xadrez.de_fen(POSICOES[nome][0]), None, profundidade)
+            segundos = perf_counter() - inicio
+        resultados.append({'posicao': nome, 'trabalhadores': trabalhadores, 'profundidade': busca.profundidade,
+                           'lance': lance and coordenadas(*lance), 'nos': busca.nos, 'segundos': round(segundos, 4),
+                           'nos_por_segundo': round(busca.nos / segundos) if segundos else None})
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Speedup da busca paralela')
+    parser.add_argument('-d', '--profundidade', type=int, default=4)
+    parser.add_argument('--trabalhadores', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--posicoes', nargs='+', choices=list(POSICOES), default=list(BENCH))
+    parser.add_argument('--megabytes', type=int, default=16)
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args(argv)
+
+    base = {}
+    resultados = []
+    print(f'{os.cpu_count()} núcleos')
+    for n in args.trabalhadores:
+        for res in medir(n, args.profundidade, args.posicoes, args.megabytes):
+            base.setdefault(res['posicao'], res)
+            res['speedup_tempo'] = round(base[res['posicao']]['segundos'] / res['segundos'], 2)
+            res['speedup_nos'] = round(res['nos_por_segundo'] / base[res['posicao']]['nos_por_segundo'], 2)
+            resultados.append(res)
+            print(f"{res['posicao']:>10} n={n} d={res['profundidade']} {res['lance']} {res['segundos']:>8.3f}s "
+                  f"{res['nos_por_segundo']:>9,} nós/s  tempo x{res['speedup_tempo']}  nós/s x{res['speedup_nos']}")
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump({'commit': _commit(), 'nucleos': os.cpu_count(), 'resultados': resultados}, arquivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,74 @@
+ORTOGONAIS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+DIAGONAIS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+# Tabelas por casa (índice x * 8 + y), construídas uma única vez na importação
+
+def _dentro(x, y):
+    return 0 <= x < 8 and 0 <= y < 8
+
+
+def _saltos(deltas):
+    return [tuple((x + dx, y + dy) for dx, dy in deltas if _dentro(x + dx, y + dy))
+            for x in range(8) for y in range(8)]
+
+
+def _raios(direcoes):
+    tabela = []
+    for x in range(8):
+        for y in range(8):
+            raios = []
+            for dx, dy in direcoes:
+                raio = []
+                x1, y1 = x + dx, y + dy
+                while _dentro(x1, y1):
+                    raio.append((x1, y1))
+                    x1, y1 = x1 + dx, y1 + dy
+                raios.append(tuple(raio))
+            tabela.append(tuple(raios))
+    return tabela
+
+
+def _achatar(tabela):
+    return [tuple(casa for raio in raios for casa in raio) for raios in tabela]
+
+
+def _peao(orien, moved, comer):
+    tabela = []
+    for x in range(8):
+        for y in range(8):
+            res = [(x + orien, y + 1), (x + orien, y - 1)] if comer else []
+            if not moved:
+                res += [(x + orien * 2, y), (x + orien, y)]
+            else:
+                res += [(x + orien, y)]
+            tabela.append(tuple(coord for coord in res if _dentro(*coord)))
+    return tabela
+
+
+SALTOS_CAVALO = _saltos([(d1, d2) for d1 in (-2, -1, 1, 2) for d2 in (-2, -1, 1, 2) if abs(d1) + abs(d2) == 3])
+SALTOS_REI = _saltos([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)])
+SALTOS_ROQUE = [saltos + roque for saltos, roque in zip(SALTOS_REI, _saltos([(0, -2), (0, 2)]))]
+
+RAIOS_ORTOGONAIS = _raios(ORTOGONAIS)
+RAIOS_DIAGONAIS = _raios(DIAGONAIS)
+RAIOS = [orto + diag for orto, diag in zip(RAIOS_ORTOGONAIS, RAIOS_DIAGONAIS)]
+
+LINHAS_TORRE = _achatar(RAIOS_ORTOGONAIS)
+LINHAS_BISPO = _achatar(RAIOS_DIAGONAIS)
+LINHAS_RAINHA = _achatar(RAIOS)
+LINHAS_SUPREME = [rainha + cavalo for rainha, cavalo in zip(LINHAS_RAINHA, SALTOS_CAVALO)]
+
+# PEAO[cor][moved][comer][casa]
+PEAO = {cor: {moved: {comer: _peao(orien, moved, comer) for comer in (False, True)} for moved in (False, True)}
+        for cor, orien in (('P', 1), ('B', -1))}
+CAPTURAS_PEAO = {cor: _saltos([(orien, 1), (orien, -1)]) for cor, orien in (('P', 1), ('B', -1))}
+SEM_RAIOS = ()
+
+
 class Peca:
+    __slots__ = ('x', 'y', 'cor', 'moved')
+
     def __init__(self, x, y, cor):
         self.x = x
         self.y = y
@@ -15,62 +85,104 @@ class Peca:
     def possiveis(self, comer=False):
         raise NotImplementedError
 
+    def raios(self):
+        """Raios de deslizamento a partir da casa atual, cada um ordenado da peça para fora."""
+        return SEM_RAIOS
+
+    def saltos(self):
+        """Destinos que não dependem de caminho livre."""
+        return self.possiveis(True)
+
     def move(self, x, y):
         self.x = x
         self.y = y
         self.moved = True
 
     def __copy__(self):
-        new = self.__class__(0, 0, '')
-        new.__dict__.update(self.__dict__)
+        new = self.__class__(self.x, self.y, self.cor)
+        new.moved = self.moved
         return new
 
 
 class Peao(Peca):
+    __slots__ = ('orien',)
+
     def __init__(self, x, y, cor):
         super().__init__(x, y, cor)
         self.orien = 1 if cor == 'P' else -1
 
     def possiveis(self, comer=False):
-        res = [(self.x + self.orien, self.y + 1), (self.x + self.orien, self.y - 1)] if comer else []
-        if not self.moved:
-            res += [(self.x + self.orien*2, self.y), (self.x + self.orien, self.y)]
-        else:
-            res += [(self.x + self.orien, self.y)]
-        return [coord for coord in res if 0 <= coord[0] < 8 and 0 <= coord[1] < 8]
+        return PEAO[self.cor][self.moved][comer][self.x * 8 + self.y]
 
 
 class Torre(Peca):
+    __slots__ = ()
+
     def possiveis(self, comer=False):
-        return [(self.x, y) for y in range(8) if y != self.y] + [(x, self.y) for x in range(8) if x != self.x]
+        return LINHAS_TORRE[self.x * 8 + self.y]
+
+    def raios(self):
+        return RAIOS_ORTOGONAIS[self.x * 8 + self.y]
+
+    def saltos(self):
+        return SEM_RAIOS
 
 
 class Bispo(Peca):
+    __slots__ = ()
+
     def possiveis(self, comer=False):
-        res = [(self.x + delta, self.y + delta) for delta in range(-8, 8)] + \
-              [(self.x + delta, self.y - delta) for delta in range(-8, 8)]
-        return [(x, y) for x, y in res if 0 <= x < 8 and 0 <= y < 8 and x != self.x and y != self.y]
+        return LINHAS_BISPO[self.x * 8 + self.y]
+
+    def raios(self):
+        return RAIOS_DIAGONAIS[self.x * 8 + self.y]
+
+    def saltos(self):
+        return SEM_RAIOS
 
 
 class Cavalo(Peca):
+    __slots__ = ()
+
     def possiveis(self, comer=False):
-        res = [(self.x + d1, self.y + d2) for d1 in (-2, -1, 1, 2) for d2 in (-2, -1, 1, 2) if abs(d1) + abs(d2) == 3]
-        return [(x, y) for x, y in res if 0 <= x < 8 and 0 <= y < 8]
+        return SALTOS_CAVALO[self.x * 8 + self.y]
 
 
 class Rei(Peca):
+    __slots__ = ()
+
     def possiveis(self, comer=False):
-        res = [(self.x + x, self.y + y) for x in (-1, 0, 1) for y in (-1, 0, 1) if (x, y) != (0, 0)]
-        if not self.moved:
-            res += [(self.x, self.y - 2), (self.x, self.y + 2)]
-        return [(x, y) for x, y in res if 0 <= x < 8 and 0 <= y < 8]
+        return (SALTOS_REI if self.moved else SALTOS_ROQUE)[self.x * 8 + self.y]
 
 
 class Rainha(Peca):
+    __slots__ = ()
+
     def possiveis(self, comer=False):
-        return Torre(self.x, self.y, self.cor).possiveis() + Bispo(self.x, self.y, self.cor).possiveis()
+        return LINHAS_RAINHA[self.x * 8 + self.y]
+
+    def raios(self):
+        return RAIOS[self.x * 8 + self.y]
+
+    def saltos(self):
+        return SEM_RAIOS
 
 
 class Supreme(Peca):
+    __slots__ = ()
+
     def possiveis(self, comer=False):
-        return Rainha(self.x, self.y, self.cor).possiveis() + Cavalo(self.x, self.y, self.cor).possiveis()
+        return LINHAS_SUPREME[self.x * 8 + self.y]
+
+    def raios(self):
+        return RAIOS[self.x * 8 + self.y]
+
+    def saltos(self):
+        return SALTOS_CAVALO[self.x * 8 + self.y]
+
+
+SALTADORES = (Cavalo, Supreme)
+DESLIZANTES_ORTOGONAIS = (Torre, Rainha, Supreme)
+DESLIZANTES_DIAGONAIS = (Bispo, Rainha, Supreme)
+PROMOCOES = (Rainha, Torre, Bispo, Cavalo)
+CLASSES = {classe.__name__: classe for classe in (Peao, Torre, Bispo, Cavalo, Rei, Rainha, Supreme)}
@@ -0,0 +1,91 @@
+"""
+Perfil dos quadros da interface: histograma do tempo de cada quadro, quanto dele foi em cada etapa (atualizar,
+desenhar, enviar para a tela) e eventos por segundo. Liga e desliga com a tela aberta e grava um resumo em JSON:
+
+    perfil = Perfil(ligado=True)
+    perfil.comecar(eventos=3)
+    with perfil.etapa('desenhar'):
+        ...
+    perfil.terminar()
+    perfil.gravar('perfil.json')
+"""
+import json
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+LIMITES_MS = (1, 2, 4, 8, 16, 33, 50, 100)  # Faixas do histograma; a última pega o resto
+
+
+class Perfil:
+    def __init__(self, ligado=False):
+        self.ligado = ligado
+        self.zerar()
+
+    def zerar(self):
+        self.quadros = 0
+        self.eventos = 0
+        self.histograma = [0] * (len(LIMITES_MS) + 1)
+        self.etapas = defaultdict(float)  # etapa -> segundos somados
+        self.total_ms = 0.0
+        self.maximo_ms = 0.0
+        self.__inicio = perf_counter()
+        self.__quadro = None
+
+    def alternar(self):
+        """
+        Liga ou desliga a medição; ao ligar, começa do zero.
+        :return: Se ficou ligado
+        """
+        self.ligado = not self.ligado
+        if self.ligado:
+            self.zerar()
+        return self.ligado
+
+    def comecar(self, eventos=0):
+        """
+        Início de um quadro, com os eventos que o acordaram.
+        """
+        if self.ligado:
+            self.__quadro = perf_counter()
+            self.eventos += eventos
+
+    @contextmanager
+    def etapa(self, nome):
+        if not self.ligado:
+            yield
+            return
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nome] += perf_counter() - inicio
+
+    def terminar(self):
+        if not self.ligado or self.__quadro is None:
+            return
+        ms = (perf_counter() - self.__quadro) * 1000
+        self.__quadro = None
+        self.quadros += 1
+        self.total_ms += ms
+        self.maximo_ms = max(self.maximo_ms, ms)
+        self.histograma[bisect_left(LIMITES_MS, ms)] += 1
+
+    def resumo(self):
+        segundos = perf_counter() - self.__inicio
+        faixas = [f'<={limite}ms' for limite in LIMITES_MS] + [f'>{LIMITES_MS[-1]}ms']
+        return {
+            'segundos': round(segundos, 3),
+            'quadros': self.quadros,
+            'quadros_por_segundo': round(self.quadros / segundos, 2) if segundos else None,
+            'eventos_por_segundo': round(self.eventos / segundos, 2) if segundos else None,
+            'ms_medio': round(self.total_ms / self.quadros, 3) if self.quadros else None,
+            'ms_maximo': round(self.maximo_ms, 3),
+            'histograma': dict(zip(faixas, self.histograma)),
+            'etapas_ms': {nome: round(total * 1000, 3) for nome, total in self.etapas.items()},
+        }
+
+    def gravar(self, caminho):
+        with open(caminho, 'w') as arquivo:
+            json.dump(self.resumo(), arquivo, indent=2)
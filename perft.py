@@ -0,0 +1,195 @@
+"""
+Perft: conta as folhas da árvore de lances legais até uma profundidade, para medir a velocidade
+do gerador de lances e provar que ele está correto contra contagens de referência.
+
+    python perft.py -d 4                          Perft 1..4 da posição inicial
+    python perft.py -d 3 --divide --fen "<FEN>"   Folhas por lance da raiz
+    python perft.py --verificar -d 3              Compara todas as posições de referência
+    python perft.py --bench --saida atual.json --comparar anterior.json
+    python perft.py --bench --pgn partidas.pgn    Inclui partidas/s da leitura e validação de um PGN grande
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from time import perf_counter
+
+import pgn
+from bitboard import Bitboard
+from regras import Xadrez
+from pecas import PROMOCOES
+
+INICIAL = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Nome: (FEN, folhas por profundidade a partir de 1)
+POSICOES = {
+    'inicial': (INICIAL, [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039, 97862, 4085603]),
+    'posicao3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238, 674624]),
+    'posicao4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467, 422333]),
+    'posicao5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379, 2103487]),
+    'posicao6': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                 [46, 2079, 89890, 3894594]),
+    # Casos de borda: passant, roque e promoção
+    'passant_ilegal_1': ('3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1', [18, 92, 1670, 10138, 185429, 1134888]),
+    'passant_ilegal_2': ('8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1', [13, 102, 1266, 10276, 135655, 1015133]),
+    'passant_da_xeque': ('8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1', [15, 126, 1928, 13931, 206379, 1440467]),
+    'roque_curto_da_xeque': ('5k2/8/8/8/8/8/8/4K2R w K - 0 1', [15, 66, 1198, 6399, 120330, 661072]),
+    'roque_longo_da_xeque': ('3k4/8/8/8/8/8/8/R3K3 w Q - 0 1', [16, 71, 1286, 7418, 141077, 803711]),
+    'direitos_de_roque': ('r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1', [26, 1141, 27826, 1274206]),
+    'roque_impedido': ('r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1', [44, 1494, 50509, 1720476]),
+    'promove_fora_do_xeque': ('2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1', [11, 133, 1442, 19174, 266199, 3821001]),
+    'xeque_descoberto': ('8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1', [29, 165, 5160, 31961, 1004658]),
+    'promove_com_xeque': ('4k3/1P6/8/8/8/8/K7/8 w - - 0 1', [9, 40, 472, 2661, 38983, 217342]),
+    'subpromove_com_xeque': ('8/P1k5/K7/8/8/8/8/8 w - - 0 1', [6, 27, 273, 1329, 18135, 92683]),
+    'auto_afogamento': ('K1k5/8/P7/8/8/8/8/8 w - - 0 1', [2, 6, 13, 63, 382, 2217]),
+    'afogado_e_mate': ('8/k1P5/8/1K6/8/8/8/8 w - - 0 1', [10, 25, 268, 926, 10857, 43261, 567584]),
+    'afogado_e_mate_2': ('8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1', [37, 183, 6559, 23527]),
+}
+
+BACKENDS = {
+    'tabuleiro': Xadrez.de_fen,
+    'bitboard': lambda fen: Bitboard.de_xadrez(Xadrez.de_fen(fen)),
+}
+
+
+def perft(posicao, profundidade):
+    """
+    :return: Número de folhas da árvore de lances legais (promoções contam uma vez por peça)
+    """
+    lances = list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES))
+    if profundidade <= 1:
+        return len(lances) if profundidade == 1 else 1
+    total = 0
+    for lance in lances:
+        desfazer = posicao.make_move(*lance)
+        total += perft(posicao, profundidade - 1)
+        posicao.unmake_move(desfazer)
+    return total
+
+
+def divide(posicao, profundidade):
+    """
+    :return: {lance em notação de coordenadas (e2e4, e7e8q): folhas abaixo dele}
+    """
+    res = {}
+    for lance in list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES)):
+        desfazer = posicao.make_move(*lance)
+        res[coordenadas(*lance)] = perft(posicao, profundidade - 1)
+        posicao.unmake_move(desfazer)
+    return res
+
+
+def coordenadas(origem, destino, promocao=None):
+    casas = [f"{'abcdefgh'[y]}{8 - x}" for x, y in (origem, destino)]
+    letra = {'Rainha': 'q', 'Torre': 'r', 'Bispo': 'b', 'Cavalo': 'n', 'Supreme': 's'}
+    return ''.join(casas) + (letra[promocao.__name__] if promocao else '')
+
+
+def medir(backend, fen, profundidade, memoria=True):
+    """
+    Perft cronometrado. O pico de memória vem de uma segunda passada com tracemalloc,
+    para que o rastreamento não distorça o tempo.
+    """
+    posicao = BACKENDS[backend](fen)
+    inicio = perf_counter()
+    nos = perft(posicao, profundidade)
+    segundos = perf_counter() - inicio
+    res = {'backend': backend, 'profundidade': profundidade, 'nos': nos, 'segundos': round(segundos, 4),
+           'nos_por_segundo': round(nos / segundos) if segundos else None}
+    if memoria:
+        tracemalloc.start()
+        perft(BACKENDS[backend](fen), profundidade)
+        res['pico_memoria'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return res
+
+
+def benchmark(profundidade, backends, posicoes=None, memoria=True):
+    resultados = []
+    for nome in posicoes or POSICOES:
+        fen, esperado = POSICOES[nome]
+        for backend in backends:
+            for d in range(1, min(profundidade, len(esperado)) + 1):
+                res = medir(backend, fen, d, memoria)
+                res.update(posicao=nome, correto=res['nos'] == esperado[d - 1])
+                resultados.append(res)
+                print(f"{nome:>22} {backend:>9} d={d} {res['nos']:>9} nós {res['segundos']:>8.3f}s "
+                      f"{res['nos_por_segundo'] or 0:>9,} nós/s" + ('' if res['correto'] else '  ERRADO'))
+    return {
+        'commit': _commit(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'resultados': resultados,
+    }
+
+
+def comparar(atual, anterior):
+    antes = {(r['posicao'], r['backend'], r['profundidade']): r for r in anterior['resultados']}
+    for r in atual['resultados']:
+        velho = antes.get((r['posicao'], r['backend'], r['profundidade']))
+        if velho and velho['nos_por_segundo'] and r['nos_por_segundo']:
+            delta = r['nos_por_segundo'] / velho['nos_por_segundo'] - 1
+            print(f"{r['posicao']:>22} {r['backend']:>9} d={r['profundidade']} {delta:+.1%}")
+    if atual.get('pgn') and anterior.get('pgn'):
+        for chave in ('leitura_partidas_por_segundo', 'validacao_partidas_por_segundo'):
+            delta = atual['pgn'][chave] / anterior['pgn'][chave] - 1
+            print(f'{chave:>40} {delta:+.1%}')
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft e benchmark do gerador de lances')
+    parser.add_argument('-d', '--profundidade', type=int, default=4)
+    parser.add_argument('--fen', default=INICIAL)
+    parser.add_argument('--backend', choices=[*BACKENDS, 'ambos'], default='tabuleiro')
+    parser.add_argument('--divide', action='store_true')
+    parser.add_argument('--verificar', action='store_true', help='Compara as posições de referência')
+    parser.add_argument('--bench', action='store_true', help='Benchmark das posições de referência')
+    parser.add_argument('--sem-memoria', action='store_true', help='Não mede o pico de memória')
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados do benchmark')
+    parser.add_argument('--comparar', help='JSON de um benchmark anterior')
+    parser.add_argument('--pgn', help='Arquivo PGN para medir partidas/s de leitura e validação no benchmark')
+    args = parser.parse_args(argv)
+    backends = list(BACKENDS) if args.backend == 'ambos' else [args.backend]
+
+    if args.verificar or args.bench:
+        res = benchmark(args.profundidade, backends, memoria=args.bench and not args.sem_memoria)
+        if args.bench and args.pgn:
+            res['pgn'] = pgn.bench(args.pgn)
+            print(f"{'pgn':>22} {res['pgn']['leitura_partidas_por_segundo']:,} partidas/s lidas, "
+                  f"{res['pgn']['validacao_partidas_por_segundo']:,} partidas/s validadas")
+        if args.saida:
+            with open(args.saida, 'w') as arquivo:
+                json.dump(res, arquivo, indent=2)
+        if args.comparar:
+            with open(args.comparar) as arquivo:
+                comparar(res, json.load(arquivo))
+        return 0 if all(r['correto'] for r in res['resultados']) else 1
+
+    for backend in backends:
+        if args.divide:
+            total = 0
+            for lance, nos in sorted(divide(BACKENDS[backend](args.fen), args.profundidade).items()):
+                print(f'{lance}: {nos}')
+                total += nos
+            print(f'\n{backend}: {total} nós')
+            continue
+        for d in range(1, args.profundidade + 1):
+            res = medir(backend, args.fen, d, memoria=not args.sem_memoria)
+            print(f"{backend:>9} d={d} {res['nos']:>10} nós {res['segundos']:>8.3f}s "
+                  f"{res['nos_por_segundo'] or 0:>9,} nós/s  pico {res.get('pico_memoria', 0) / 1024:,.0f} KiB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
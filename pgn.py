@@ -0,0 +1,249 @@
+"""
+Leitura e escrita de PGN em fluxo: os arquivos são lidos partida a partida, em memória constante, e podem ser
+reproduzidos e validados em massa num pool de processos.
+
+    python pgn.py validar partidas.pgn --trabalhadores 4    Reproduz cada partida e aponta o primeiro lance inválido
+    python pgn.py bench partidas.pgn                        Partidas/s da leitura e da validação
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+from time import perf_counter
+
+from notacao import ler_san, san
+from regras import Xadrez
+
+RESULTADOS = ('1-0', '0-1', '1/2-1/2', '*')
+ORDEM_TAGS = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+
+
+def ler_pgn(arquivo):
+    """
+    Gera as partidas de um arquivo PGN aberto (ou de qualquer iterável de linhas), uma de cada vez.
+    :return: Gerador de {'tags': {...}, 'lances': [SAN, ...], 'resultado': str}
+    """
+    tags = {}
+    texto = []
+    comentario = 0  # Chaves abertas: um comentário pode atravessar linhas em branco e colchetes
+    for linha in arquivo:
+        linha = linha.strip()
+        if linha.startswith('[') and not comentario:
+            if texto:  # Começou a próxima partida sem linha em branco
+                yield _partida(tags, texto)
+                tags, texto = {}, []
+            nome, _, valor = linha[1:-1].partition(' ')
+            valor = valor.strip()
+            if valor[:1] == '"' and valor[-1:] == '"':
+                valor = valor[1:-1]
+            tags[nome] = valor.replace('\\"', '"').replace('\\\\', '\\')
+        elif linha.startswith('%'):  # Linha de escape
+            continue
+        elif linha or comentario:
+            texto.append(linha)
+            comentario += linha.count('{') - linha.count('}')
+        elif texto:
+            yield _partida(tags, texto)
+            tags, texto = {}, []
+    if tags or texto:
+        yield _partida(tags, texto)
+
+
+def _partida(tags, texto):
+    lances, resultado = _lances('\n'.join(texto))
+    return {'tags': tags, 'lances': lances, 'resultado': resultado or tags.get('Result', '*')}
+
+
+def _lances(texto):
+    """
+    Separa os lances do texto, ignorando números, comentários, variantes e NAGs.
+    """
+    lances = []
+    resultado = None
+    profundidade = 0  # Variantes entre parênteses
+    i = 0
+    while i < len(texto):
+        c = texto[i]
+        if c == '{':
+            fim = texto.find('}', i)
+            i = len(texto) if fim < 0 else fim + 1
+            continue
+        if c == ';':
+            fim = texto.find('\n', i)
+            i = len(texto) if fim < 0 else fim + 1
+            continue
+        if c == '(':
+            profundidade += 1
+        elif c == ')':
+            profundidade -= 1
+        if c in '() \n':
+            i += 1
+            continue
+        fim = i
+        while fim < len(texto) and texto[fim] not in ' (){;\n':
+            fim += 1
+        palavra = texto[i:fim]
+        i = fim
+        if profundidade or palavra.startswith('$'):
+            continue
+        if palavra in RESULTADOS:
+            resultado = palavra
+            continue
+        if not palavra.startswith('0-0'):
+            palavra = palavra.lstrip('0123456789').lstrip('.')  # 12. e 12... e 12.e4
+        if palavra:
+            lances.append(palavra)
+    return lances, resultado
+
+
+def reproduzir(partida):
+    """
+    Reproduz os lances de uma partida lida a partir da posição inicial (ou da tag FEN).
+    :return: (jogo, None) ou (jogo, (meio-lance, SAN, motivo)) no primeiro lance inválido
+    """
+    fen = partida['tags'].get('FEN')
+    jogo = Xadrez.de_fen(fen) if fen else Xadrez.inicial()
+    for i, texto in enumerate(partida['lances']):
+        try:
+            lance = ler_san(jogo, texto)
+        except ValueError as erro:
+            return jogo, (i, texto, str(erro))
+        jogo.make_move(*lance)
+    return jogo, None
+
+
+def escrever_pgn(arquivo, lances, tags=None, resultado='*', fen=None, largura=80):
+    """
+    Escreve uma partida em PGN.
+    :param lances: Lances em SAN, a partir da posição inicial ou de `fen`
+    """
+    tags = dict(tags or {})
+    tags['Result'] = resultado
+    if fen:
+        tags.update(SetUp='1', FEN=fen)
+    for nome in ORDEM_TAGS:
+        tags.setdefault(nome, '?')
+    for nome in (*ORDEM_TAGS, *(t for t in tags if t not in ORDEM_TAGS)):
+        valor = str(tags[nome]).replace('\\', '\\\\').replace('"', '\\"')
+        arquivo.write(f'[{nome} "{valor}"]\n')
+    arquivo.write('\n')
+
+    numero, pretas = 1, False
+    if fen:
+        campos = fen.split()
+        pretas = len(campos) > 1 and campos[1] == 'b'
+        numero = int(campos[5]) if len(campos) > 5 else 1
+    palavras = []
+    if pretas and lances:
+        palavras.append(f'{numero}...')
+    for texto in lances:
+        if not pretas:
+            palavras.append(f'{numero}.')
+        palavras.append(texto)
+        if pretas:
+            numero += 1
+        pretas = not pretas
+    palavras.append(resultado)
+
+    linha = ''
+    for palavra in palavras:
+        if linha and len(linha) + 1 + len(palavra) > largura:
+            arquivo.write(linha + '\n')
+            linha = palavra
+        else:
+            linha = f'{linha} {palavra}' if linha else palavra
+    arquivo.write(linha + '\n\n')
+
+
+def exportar(jogo, arquivo, tags=None, resultado='*', fen=None):
+    """
+    Escreve em PGN os lances registrados por mover() num jogo que começou na posição inicial (ou em `fen`).
+    """
+    brancas, pretas = jogo.moves['B'], jogo.moves['P']
+    if fen and fen.split()[1] == 'b':
+        lances = [m for par in zip(pretas, brancas + ['']) for m in par if m]
+    else:
+        lances = [m for par in zip(brancas, pretas + ['']) for m in par if m]
+    escrever_pgn(arquivo, [m.replace('++', '#') for m in lances], tags, resultado, fen)
+
+
+def lances_san(fen, lances):
+    """
+    Converte lances (origem, destino, promocao) jogados a partir de `fen` (ou da inicial) para SAN.
+    """
+    jogo = Xadrez.de_fen(fen) if fen else Xadrez.inicial()
+    res = []
+    for lance in lances:
+        res.append(san(jogo, lance))
+        jogo.make_move(*lance)
+    return res
+
+
+# Validação em massa
+
+def _validar(partida):
+    _, erro = reproduzir(partida)
+    return len(partida['lances']), erro, partida['tags'].get('White'), partida['tags'].get('Black')
+
+
+def validar(caminho, trabalhadores=None, lote=16):
+    """
+    Lê o arquivo em fluxo e reproduz cada partida num pool de processos.
+    :return: Resumo com partidas/s, lances/s e as partidas inválidas
+    """
+    partidas = lances = 0
+    invalidas = []
+    inicio = perf_counter()
+    with open(caminho, encoding='utf-8', errors='replace') as arquivo, multiprocessing.Pool(trabalhadores) as pool:
+        for i, (n, erro, brancas, pretas) in enumerate(pool.imap(_validar, ler_pgn(arquivo), lote)):
+            partidas += 1
+            lances += n
+            if erro is not None:
+                invalidas.append({'partida': i, 'brancas': brancas, 'pretas': pretas,
+                                  'meio_lance': erro[0], 'lance': erro[1], 'motivo': erro[2]})
+    segundos = perf_counter() - inicio
+    return {
+        'partidas': partidas,
+        'lances': lances,
+        'invalidas': invalidas,
+        'segundos': round(segundos, 3),
+        'partidas_por_segundo': round(partidas / segundos, 2) if segundos else None,
+        'lances_por_segundo': round(lances / segundos, 1) if segundos else None,
+    }
+
+
+def bench(caminho, trabalhadores=None):
+    """
+    Partidas/s só da leitura em fluxo e da leitura com validação.
+    """
+    inicio = perf_counter()
+    with open(caminho, encoding='utf-8', errors='replace') as arquivo:
+        lidas = sum(1 for _ in ler_pgn(arquivo))
+    leitura = perf_counter() - inicio
+    res = validar(caminho, trabalhadores)
+    return {
+        'arquivo': caminho,
+        'partidas': lidas,
+        'leitura_partidas_por_segundo': round(lidas / leitura, 1) if leitura else None,
+        'validacao_partidas_por_segundo': res['partidas_por_segundo'],
+        'validacao_lances_por_segundo': res['lances_por_segundo'],
+        'invalidas': len(res['invalidas']),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Leitura, validação e benchmark de PGN')
+    parser.add_argument('comando', choices=['validar', 'bench'])
+    parser.add_argument('arquivo')
+    parser.add_argument('--trabalhadores', type=int, help='Processos (padrão: um por núcleo)')
+    args = parser.parse_args(argv)
+    if args.comando == 'validar':
+        res = validar(args.arquivo, args.trabalhadores)
+        print(json.dumps(res, indent=2, ensure_ascii=False))
+        return 1 if res['invalidas'] else 0
+    print(json.dumps(bench(args.arquivo, args.trabalhadores), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Retrato imutável de uma posição, para guardar e compartilhar sem copiar peças: a GUI, a busca e o histórico podem
+passar o mesmo objeto adiante, usá-lo como chave de dicionário e mandá-lo para outro processo em 67 bytes.
+
+    p = jogo.posicao()            Xadrez ou Bitboard -> Posicao
+    Xadrez.de_posicao(p)          e de volta, em qualquer uma das duas
+    Bitboard.de_posicao(p)
+
+    python posicao.py -n 2000     Bytes por posição guardada: peças copiadas, clone de Xadrez, FEN e Posicao
+"""
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+
+import zobrist
+from pecas import *
+
+CORES = ('B', 'P')
+TIPOS = (Peao, Cavalo, Bispo, Torre, Rainha, Rei, Supreme)
+CODIGOS = {(cor, classe): 1 + c * 7 + t for c, cor in enumerate(CORES) for t, classe in enumerate(TIPOS)}
+
+
+def codigo(peca):
+    """
+    :return: Byte da peça numa Posicao (0 é casa vazia); o mesmo código de Bitboard mais 1
+    """
+    return CODIGOS[peca.cor, type(peca)]
+
+
+class Posicao(bytes):
+    """
+    Posição em 67 bytes: as 64 casas (0 vazia, 1 + cor * 7 + tipo), a vez, os direitos de roque (zobrist.DIREITOS)
+    e a casa + 1 do peão que acabou de andar duas (0 sem). Relógio e número do lance ficam de fora, então duas
+    posições iguais para as regras são iguais aqui.
+    """
+    __slots__ = ()
+
+    def __new__(cls, casas, vez='B', direitos=0, passant=-1):
+        """
+        :param casas: 64 códigos (ver codigo), na ordem x * 8 + y
+        :param passant: Casa do peão que pode ser capturado en passant, ou -1
+        """
+        return super().__new__(cls, bytes(casas) + bytes((vez == 'P', direitos, passant + 1)))
+
+    def __getnewargs__(self):
+        return bytes(self[:64]), self.vez, self.direitos, self.passant
+
+    def __repr__(self):
+        return f'Posicao({self.vez!r}, direitos={self.direitos}, passant={self.passant}, {len(self.pecas())} peças)'
+
+    __str__ = __repr__
+
+    @property
+    def casas(self):
+        return self[:64]
+
+    @property
+    def vez(self):
+        return 'P' if self[64] else 'B'
+
+    @property
+    def direitos(self):
+        return self[65]
+
+    @property
+    def passant(self):
+        return self[66] - 1
+
+    def pecas(self):
+        """
+        Peças novas da posição. Peões fora da casa inicial, e reis e torres sem direito de roque, contam como movidos.
+        """
+        pecas = []
+        for sq in range(64):
+            byte = self[sq]
+            if not byte:
+                continue
+            cor = CORES[(byte - 1) // 7]
+            peca = TIPOS[(byte - 1) % 7](sq // 8, sq % 8, cor)
+            peca.moved = not isinstance(peca, Peao) or sq // 8 != (6 if cor == 'B' else 1)
+            pecas.append(peca)
+        for bit, cor, x, y in zobrist.DIREITOS:
+            if self.direitos & bit:
+                for peca in pecas:
+                    if peca.cor == cor and peca.x == x and peca.y in (4, y) and isinstance(peca, (Rei, Torre)):
+                        peca.moved = False
+        return pecas
+
+
+# Benchmark de memória
+
+def _partidas(n, semente=0, limite=80):
+    """
+    n posições de partidas aleatórias a partir da inicial (gerador de Xadrez).
+    """
+    from regras import Xadrez
+    gerador = random.Random(semente)
+    jogo = Xadrez.inicial()
+    for _ in range(n):
+        lances = list(jogo.legal_moves(jogo.vez))
+        if not lances or len(jogo.moves['B']) >= limite:
+            jogo = Xadrez.inicial()
+            lances = list(jogo.legal_moves(jogo.vez))
+        jogo.mover(*gerador.choice(lances))
+        yield jogo
+
+
+def memoria(n=2000, semente=0):
+    """
+    Bytes por posição guardada em cada representação, medidos com tracemalloc.
+    :return: {representação: bytes por posição}
+    """
+    formas = {
+        'pecas_copiadas': lambda jogo: jogo.copy(),
+        'xadrez_clonado': lambda jogo: jogo.clonar(),
+        'fen': lambda jogo: jogo.fen(),
+        'posicao': lambda jogo: jogo.posicao(),
+    }
+    res = {}
+    for nome, guardar in formas.items():
+        guardadas = []
+        total = 0
+        tracemalloc.start()
+        for jogo in _partidas(n, semente):
+            antes = tracemalloc.get_traced_memory()[0]  # Só o que fica guardado conta, não a partida em andamento
+            guardadas.append(guardar(jogo))
+            total += tracemalloc.get_traced_memory()[0] - antes
+        tracemalloc.stop()
+        res[nome] = round(total / n, 1)
+    return res
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Memória por posição guardada')
+    parser.add_argument('-n', '--posicoes', type=int, default=2000)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args(argv)
+    res = memoria(args.posicoes, args.semente)
+    for nome, tamanho in res.items():
+        print(f'{nome:>16} {tamanho:>10,.1f} bytes/posição')
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(res, arquivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Caches de desenho da interface: fontes por tamanho, textos já renderizados (LRU por texto, tamanho e cor), atlas das
+peças escaladas para cada tamanho usado e superfícies de trabalho reaproveitadas entre quadros.
+
+Os contadores separam o que foi criado do que veio do cache; num quadro estável os de criação não sobem:
+
+    recursos.contadores  ->  {'fontes': 2, 'textos': 14, 'textos_cache': 380, 'atlas': 3, 'superficies': 2, ...}
+"""
+from collections import Counter, OrderedDict
+
+import pygame as pg
+
+NOMES = ('Peao', 'Bispo', 'Torre', 'Cavalo', 'Rei', 'Rainha')
+PASTAS = {'B': 'Branco', 'P': 'Preto'}
+
+
+class Recursos:
+    def __init__(self, pasta='./assets', fonte='Calibri', max_textos=512):
+        """
+        :param pasta: Pasta com as imagens das peças (Branco/ e Preto/)
+        :param max_textos: Textos renderizados guardados; os menos usados saem primeiro
+        """
+        self.fonte = fonte
+        self.max_textos = max_textos
+        self.contadores = Counter()
+        self.__originais = {cor: {nome: pg.image.load(f'{pasta}/{nome_pasta}/{nome}.png') for nome in NOMES}
+                            for cor, nome_pasta in PASTAS.items()}
+        self.__fontes = {}
+        self.__textos = OrderedDict()
+        self.__atlas = {}
+        self.__superficies = {}
+
+    def fonte_do_tamanho(self, tamanho):
+        fonte = self.__fontes.get(tamanho)
+        if fonte is None:
+            fonte = self.__fontes[tamanho] = pg.font.SysFont(self.fonte, tamanho)
+            self.contadores['fontes'] += 1
+        return fonte
+
+    def texto(self, texto, tamanho, cor=(0, 0, 0)):
+        """
+        :return: Superfície com o texto renderizado (compartilhada: não desenhe nela)
+        """
+        chave = texto, tamanho, tuple(cor)
+        superficie = self.__textos.get(chave)
+        if superficie is not None:
+            self.__textos.move_to_end(chave)
+            self.contadores['textos_cache'] += 1
+            return superficie
+        superficie = self.__textos[chave] = self.fonte_do_tamanho(tamanho).render(texto, True, cor)
+        self.contadores['textos'] += 1
+        if len(self.__textos) > self.max_textos:
+            self.__textos.popitem(last=False)
+            self.contadores['textos_descartados'] += 1
+        return superficie
+
+    def sprites(self, tamanho):
+        """
+        Peças escaladas para um tamanho (largura, altura), montadas uma vez num único atlas por tamanho.
+        :return: {cor: {nome da classe: subsuperfície do atlas}}
+        """
+        sprites = self.__atlas.get(tamanho)
+        if sprites is not None:
+            self.contadores['atlas_cache'] += 1
+            return sprites
+        largura, altura = tamanho
+        atlas = pg.Surface((largura * len(NOMES), altura * len(PASTAS)), pg.SRCALPHA)
+        sprites = {}
+        for linha, cor in enumerate(PASTAS):
+            sprites[cor] = {}
+            for coluna, nome in enumerate(NOMES):
+                area = pg.Rect(coluna * largura, linha * altura, largura, altura)
+                atlas.blit(pg.transform.scale(self.__originais[cor][nome], tamanho), area)
+                sprites[cor][nome] = atlas.subsurface(area)
+        self.__atlas[tamanho] = sprites
+        self.contadores['atlas'] += 1
+        return sprites
+
+    def preparar(self, *tamanhos):
+        """
+        Monta de antemão os atlas dos tamanhos que a tela vai usar.
+        """
+        for tamanho in tamanhos:
+            self.sprites(tamanho)
+
+    def superficie(self, nome, tamanho):
+        """
+        Superfície de trabalho reaproveitada: a mesma a cada chamada com o mesmo nome e tamanho.
+        """
+        chave = nome, tamanho
+        superficie = self.__superficies.get(chave)
+        if superficie is None:
+            superficie = self.__superficies[chave] = pg.Surface(tamanho)
+            self.contadores['superficies'] += 1
+        return superficie
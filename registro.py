@@ -0,0 +1,108 @@
+"""
+Registro compacto da partida: cada meio-lance é um inteiro de 32 bits num array (origem, destino, peça, capturada,
+promoção e flags), ao lado da notação e do registro de make_move dos lances aplicados. Voltar, refazer e pular para
+um meio-lance usam make_move/unmake_move a partir da posição atual, sem remontar a partida desde o começo.
+
+    jogo.desfazer()     Volta um meio-lance; ele continua no registro até outro lance ser jogado
+    jogo.refazer()
+    jogo.ir_para(10)    Posição depois do 10º meio-lance
+"""
+from array import array
+
+from posicao import TIPOS
+
+# Lance em 32 bits: origem (6) | destino (6) << 6 | peça (3) << 12 | capturada + 1 (3) << 15 | promoção + 1 (3) << 18
+# | flags, com os tipos na ordem de posicao.TIPOS
+ROQUE = 1 << 21
+PASSANT = 1 << 22
+COM_XEQUE = 1 << 23
+COM_MATE = 1 << 24
+
+
+def empacotar(origem, destino, desfazer, estado=0):
+    """
+    :param desfazer: Registro devolvido por make_move para este lance
+    :param estado: regras.XEQUE ou regras.MATE depois do lance (outro valor não marca nada)
+    """
+    peca, _, _, capturada, torre, promovida, _, _ = desfazer
+    codigo = origem[0] * 8 + origem[1] | (destino[0] * 8 + destino[1]) << 6 | TIPOS.index(type(peca)) << 12
+    if capturada is not None:
+        codigo |= (TIPOS.index(type(capturada)) + 1) << 15
+        if capturada.pos != list(destino):
+            codigo |= PASSANT
+    if promovida is not None:
+        codigo |= (TIPOS.index(type(promovida)) + 1) << 18
+    if torre is not None:
+        codigo |= ROQUE
+    return codigo | {1: COM_XEQUE, 2: COM_MATE}.get(estado, 0)
+
+
+def desempacotar(codigo):
+    """
+    :return: (origem, destino, promocao) como em legal_moves
+    """
+    origem, destino = codigo & 63, codigo >> 6 & 63
+    promocao = codigo >> 18 & 7
+    return (origem // 8, origem % 8), (destino // 8, destino % 8), TIPOS[promocao - 1] if promocao else None
+
+
+def tipo_peca(codigo):
+    return TIPOS[codigo >> 12 & 7]
+
+
+def tipo_capturada(codigo):
+    tipo = codigo >> 15 & 7
+    return TIPOS[tipo - 1] if tipo else None
+
+
+class Registro:
+    def __init__(self):
+        self.lances = array('I')  # Lance empacotado de cada meio-lance
+        self.notacoes = []  # Notação de cada meio-lance, como em Xadrez.moves
+        self.relogios = array('H')  # Relógio dos 50 lances antes de cada meio-lance
+        self.desfazer = []  # Registros de make_move dos meio-lances aplicados (os `atual` primeiros)
+        self.atual = 0  # Meio-lances aplicados na posição; os seguintes podem ser refeitos
+        self.primeira = 'B'  # Cor do primeiro meio-lance
+
+    def __len__(self):
+        return len(self.lances)
+
+    def acrescentar(self, cor, codigo, notacao, relogio, desfazer):
+        """
+        Registra um lance jogado na posição atual, descartando os meio-lances que ainda podiam ser refeitos.
+        """
+        if self.atual < len(self.lances):
+            del self.lances[self.atual:]
+            del self.notacoes[self.atual:]
+            del self.relogios[self.atual:]
+        if not self.lances:
+            self.primeira = cor
+        self.lances.append(codigo)
+        self.notacoes.append(notacao)
+        self.relogios.append(min(relogio, 0xFFFF))
+        self.desfazer.append(desfazer)
+        self.atual += 1
+
+    def cor(self, ply):
+        """
+        :return: Cor que jogou o meio-lance `ply` (contado de 0)
+        """
+        return self.primeira if ply % 2 == 0 else ('P' if self.primeira == 'B' else 'B')
+
+    def linhas(self):
+        """
+        Linhas do quadro de lances (brancas, pretas); uma partida começada pelas pretas deixa a primeira casa vazia.
+        """
+        return (len(self.lances) + (self.primeira == 'P') + 1) // 2
+
+    def janela(self, linha, quantidade):
+        """
+        Meio-lances de `quantidade` linhas do quadro a partir de `linha`, lendo só esses do registro.
+        :return: Lista de (meio-lance, notação) na ordem do quadro; casas vazias têm meio-lance None
+        """
+        desvio = self.primeira == 'P'
+        inicio = linha * 2 - desvio
+        casas = []
+        for ply in range(inicio, min(inicio + quantidade * 2, len(self.lances))):
+            casas.append((ply, self.notacoes[ply]) if ply >= 0 else (None, ''))
+        return casas
@@ -0,0 +1,848 @@
+import avaliacao
+import notacao
+import zobrist
+from pecas import *
+from posicao import Posicao, codigo
+from registro import Registro, empacotar, desempacotar, tipo_peca, tipo_capturada
+from transposicao import codificar, decodificar
+
+NADA, XEQUE, MATE, AFOGADO = range(4)
+LETRAS_FEN = {Peao: 'p', Cavalo: 'n', Bispo: 'b', Torre: 'r', Rainha: 'q', Rei: 'k', Supreme: 's'}
+
+
+class Xadrez:
+    def __init__(self, configuracao_inicial=None, promocao=None):
+        """
+        :param configuracao_inicial: Lista de peças
+        :param promocao: Função (cor) -> classe da peça escolhida quando um peão chega à última linha.
+            Sem ela, ou se ela devolver None, o peão vira Supreme.
+        """
+        # Game Flow
+        self.tabuleiro = configuracao_inicial or []
+        self.vez = 'B'
+        self.__passant = []
+        self.relogio = 0  # Meios-lances desde a última captura ou lance de peão
+        self.numero = 1  # Número do lance, sobe depois de cada lance das pretas
+
+        # Game Record
+        self.__comidas = {'B': [], 'P': []}
+        self.__moves = {'B': [], 'P': []}
+        self.__chaves = [self.chave]
+        self.registro = Registro()  # Lances empacotados e registros de desfazer, para voltar e refazer
+
+        # Events
+        self.promocao = promocao
+        self.finais = None  # Tabelas de finais (finais.Finais) consultadas a cada lance de mover()
+        self.analises = None  # Cache persistente (analises.Analises) de lances legais e estado por posição
+        self.__ouvintes = []
+
+    def __repr__(self):
+        return repr([(p.__class__.__name__, p.pos) for p in self.tabuleiro])
+
+    def __str__(self):
+        return '\n'.join(' '.join('.' if p is None else self.__letra(p) for p in self.linha(x)) for x in range(8))
+
+    @staticmethod
+    def __letra(peca):
+        letra = LETRAS_FEN[type(peca)]
+        return letra.upper() if peca.cor == 'B' else letra
+
+    @staticmethod
+    def __criar():
+        return [Torre(0, 0, 'P'), Cavalo(0, 1, 'P'), Bispo(0, 2, 'P'), Rainha(0, 3, 'P'),
+                Rei(0, 4, 'P'), Bispo(0, 5, 'P'), Cavalo(0, 6, 'P'), Torre(0, 7, 'P'),
+                Peao(1, 0, 'P'), Peao(1, 1, 'P'), Peao(1, 2, 'P'), Peao(1, 3, 'P'),
+                Peao(1, 4, 'P'), Peao(1, 5, 'P'), Peao(1, 6, 'P'), Peao(1, 7, 'P'),
+
+                Peao(6, 0, 'B'), Peao(6, 1, 'B'), Peao(6, 2, 'B'), Peao(6, 3, 'B'),
+                Peao(6, 4, 'B'), Peao(6, 5, 'B'), Peao(6, 6, 'B'), Peao(6, 7, 'B'),
+                Torre(7, 0, 'B'), Cavalo(7, 1, 'B'), Bispo(7, 2, 'B'), Rainha(7, 3, 'B'),
+                Rei(7, 4, 'B'), Bispo(7, 5, 'B'), Cavalo(7, 6, 'B'), Torre(7, 7, 'B')
+                ]
+
+    @classmethod
+    def inicial(cls):
+        return cls(cls.__criar())
+
+    @classmethod
+    def de_fen(cls, fen):
+        """
+        Monta uma partida a partir de uma FEN. Os direitos de roque viram os flags `moved` do rei e das torres,
+        e um peão fora da casa inicial conta como já movido.
+        """
+        campos = fen.split()
+        letras = {letra: classe for classe, letra in LETRAS_FEN.items()}
+        pecas = []
+        for x, linha in enumerate(campos[0].split('/')):
+            y = 0
+            for letra in linha:
+                if letra.isdigit():
+                    y += int(letra)
+                    continue
+                cor = 'B' if letra.isupper() else 'P'
+                peca = letras[letra.lower()](x, y, cor)
+                peca.moved = not isinstance(peca, Peao) or x != (6 if cor == 'B' else 1)
+                pecas.append(peca)
+                y += 1
+        jogo = cls(pecas)
+        jogo.vez = 'B' if len(campos) < 2 or campos[1] == 'w' else 'P'
+
+        roques = campos[2] if len(campos) > 2 else '-'
+        for cor, x, curto, longo in (('B', 7, 'K', 'Q'), ('P', 0, 'k', 'q')):
+            rei = jogo.casa([x, 4])
+            for letra, y in ((curto, 7), (longo, 0)):
+                torre = jogo.casa([x, y])
+                if letra in roques and isinstance(rei, Rei) and isinstance(torre, Torre) and rei.cor == torre.cor == cor:
+                    rei.moved = torre.moved = False
+
+        if len(campos) > 3 and campos[3] != '-':
+            y = 'abcdefgh'.index(campos[3][0])
+            x = 8 - int(campos[3][1])
+            peao = jogo.casa([x + (1 if jogo.vez == 'B' else -1), y])
+            if isinstance(peao, Peao):
+                jogo.__passant = [peao]
+        if len(campos) > 5:
+            jogo.relogio = int(campos[4])
+            jogo.numero = int(campos[5])
+        jogo.__chaves = [jogo.chave]
+        return jogo
+
+    def fen(self):
+        """
+        FEN da posição. A casa de en passant aparece depois de todo avanço duplo, como na FEN original.
+        """
+        linhas = []
+        for x in range(8):
+            linha = ''
+            vazias = 0
+            for peca in self.linha(x):
+                if peca is None:
+                    vazias += 1
+                    continue
+                if vazias:
+                    linha += str(vazias)
+                    vazias = 0
+                linha += self.__letra(peca)
+            linhas.append(linha + (str(vazias) if vazias else ''))
+        roques = ''.join(letra for bit, letra in ((1, 'K'), (2, 'Q'), (4, 'k'), (8, 'q')) if self.direitos & bit)
+        passant = '-'
+        if self.__passant:
+            peao = self.__passant[0]
+            passant = notacao.nome_casa((peao.x - peao.orien, peao.y))
+        return f"{'/'.join(linhas)} {'w' if self.vez == 'B' else 'b'} {roques or '-'} {passant} " \
+               f"{self.relogio} {self.numero}"
+
+    @classmethod
+    def de_posicao(cls, posicao):
+        """
+        Partida nova a partir de um retrato (posicao.Posicao), sem registro de lances.
+        """
+        jogo = cls(posicao.pecas())
+        jogo.vez = posicao.vez
+        if posicao.passant >= 0:
+            jogo.__passant = [jogo.__casas[posicao.passant]]
+        jogo.__chaves = [jogo.chave]
+        return jogo
+
+    def posicao(self):
+        """
+        Retrato imutável da posição atual (ver posicao.Posicao).
+        """
+        casas = bytes(0 if peca is None else codigo(peca) for peca in self.__casas)
+        passant = self.__passant[0].x * 8 + self.__passant[0].y if self.__passant else -1
+        return Posicao(casas, self.vez, self.direitos, passant)
+
+    def copy(self):
+        return [peca.__copy__() for peca in self.tabuleiro]
+
+    def clonar(self):
+        """
+        Posição independente com as mesmas peças, vez e en passant, sem registro da partida nem ouvintes.
+        """
+        jogo = self.__class__(self.copy())
+        jogo.vez = self.vez
+        jogo.relogio = self.relogio
+        jogo.numero = self.numero
+        if self.__passant:
+            jogo.__passant = [jogo.casa(self.__passant[0].pos)]
+        jogo.__chaves = [jogo.chave]
+        return jogo
+
+    @property
+    def tabuleiro(self):
+        return self.__tabuleiro
+
+    @tabuleiro.setter
+    def tabuleiro(self, pecas):
+        self.__tabuleiro = pecas
+        self.__casas = [None] * 64
+        for peca in pecas:
+            self.__casas[peca.x * 8 + peca.y] = peca
+        self.__chave = zobrist.chave_pecas(pecas)
+        self.__pontos, self.__fase = avaliacao.pontos_completos(pecas)
+        self.__lances = None
+
+    # Board Index (casa x, y -> self.__casas[x * 8 + y]), mantém a parte das peças da chave Zobrist
+    # e os contadores da avaliação
+
+    def __colocar(self, peca):
+        self.__tabuleiro.append(peca)
+        sq = peca.x * 8 + peca.y
+        self.__casas[sq] = peca
+        self.__chave ^= zobrist.PECAS[type(peca)][peca.cor][sq]
+        self.__pontos += avaliacao.PST[type(peca)][peca.cor][sq]
+        self.__fase += avaliacao.FASE[type(peca)]
+
+    def __retirar(self, peca):
+        self.__tabuleiro.remove(peca)
+        sq = peca.x * 8 + peca.y
+        self.__casas[sq] = None
+        self.__chave ^= zobrist.PECAS[type(peca)][peca.cor][sq]
+        self.__pontos -= avaliacao.PST[type(peca)][peca.cor][sq]
+        self.__fase -= avaliacao.FASE[type(peca)]
+
+    def __mover(self, peca, x, y):
+        chaves = zobrist.PECAS[type(peca)][peca.cor]
+        pst = avaliacao.PST[type(peca)][peca.cor]
+        self.__chave ^= chaves[peca.x * 8 + peca.y] ^ chaves[x * 8 + y]
+        self.__pontos += pst[x * 8 + y] - pst[peca.x * 8 + peca.y]
+        self.__casas[peca.x * 8 + peca.y] = None
+        peca.move(x, y)
+        self.__casas[x * 8 + y] = peca
+
+    @property
+    def chave(self):
+        """
+        Chave Zobrist de 64 bits da posição. A parte das peças é atualizada a cada colocar/retirar/mover;
+        vez, direitos de roque (flags `moved`) e en passant são somados aqui, a partir do estado atual.
+        """
+        chave = self.__chave ^ zobrist.ROQUE[self.direitos]
+        if self.vez == 'P':
+            chave ^= zobrist.VEZ
+        if self.__passant:
+            peao = self.__passant[0]
+            for vizinho in (self.casa([peao.x, peao.y - 1]), self.casa([peao.x, peao.y + 1])):
+                # Só conta se alguém pode de fato capturar en passant
+                if isinstance(vizinho, Peao) and vizinho.cor != peao.cor:
+                    chave ^= zobrist.PASSANT[peao.y]
+                    break
+        return chave
+
+    @property
+    def pontos(self):
+        """
+        Soma das tabelas peça-casa, meio-jogo e final juntados (ver avaliacao.separar), positiva para as brancas.
+        """
+        return self.__pontos
+
+    @property
+    def fase(self):
+        return self.__fase
+
+    @property
+    def direitos(self):
+        """
+        Direitos de roque em bits (ver zobrist.DIREITOS): rei e torre da cor nas casas iniciais e sem ter movido.
+        """
+        direitos = 0
+        for bit, cor, x, y in zobrist.DIREITOS:
+            rei = self.__casas[x * 8 + 4]
+            torre = self.__casas[x * 8 + y]
+            if isinstance(rei, Rei) and isinstance(torre, Torre) and rei.cor == torre.cor == cor \
+                    and not rei.moved and not torre.moved:
+                direitos |= bit
+        return direitos
+
+    # Helper Functions
+
+    def cor(self, casa):
+        peca = self.casa(casa)
+        if peca:
+            return peca.cor
+
+    def casa(self, coords):
+        x, y = coords
+        if 0 <= x < 8 and 0 <= y < 8:
+            return self.__casas[x * 8 + y]
+
+    def coluna(self, n):
+        return self.__casas[n::8]
+
+    def linha(self, n):
+        return self.__casas[n * 8:n * 8 + 8]
+
+    def diag(self, offset=0, axis=1):
+        tamanho = 8 - abs(offset)
+        if axis == 1:
+            inicio = max(0, -offset) * 8 + max(0, offset)
+            return self.__casas[inicio:inicio + 9 * tamanho - 8:9]
+        inicio = max(0, offset) * 8 + min(7, 7 + offset)
+        return self.__casas[inicio:inicio + 7 * tamanho - 6:7]
+
+    def caminho(self, origem, destino):
+        """
+        Casas entre origem e destino (exclusivas) quando estão na mesma linha, coluna ou diagonal.
+        Saltos (cavalo) não têm caminho.
+        """
+        x1, y1 = origem
+        x2, y2 = destino
+        dx = x2 - x1
+        dy = y2 - y1
+        if dx == 0:
+            passo = 1
+        elif dy == 0:
+            passo = 8
+        elif dx == dy:
+            passo = 9
+        elif dx == -dy:
+            passo = 7
+        else:
+            return []
+        i1 = x1 * 8 + y1
+        i2 = x2 * 8 + y2
+        if i1 > i2:
+            i1, i2 = i2, i1
+        return self.__casas[i1 + passo:i2:passo]
+
+    def alcance(self, peca):
+        """
+        Destinos pseudo-legais de uma peça: cada raio é percorrido até a primeira peça que o bloqueia (inclusive).
+        """
+        casas = self.__casas
+        for raio in peca.raios():
+            for x, y in raio:
+                yield x, y
+                if casas[x * 8 + y] is not None:
+                    break
+        yield from peca.saltos()
+
+    @property
+    def passant(self):
+        return self.__passant
+
+    @property
+    def casa_passant(self):
+        """
+        Casa (x, y) do peão que pode ser capturado en passant, ou None. Igual em Bitboard, que guarda o
+        `passant` como o índice da casa em vez da lista de peças.
+        """
+        return tuple(self.__passant[0].pos) if self.__passant else None
+
+    @property
+    def quantidade(self):
+        return len(self.__tabuleiro)
+
+    @property
+    def brancas(self):
+        return [peca for peca in self.tabuleiro if peca.cor == 'B']
+
+    @property
+    def pretas(self):
+        return [peca for peca in self.tabuleiro if peca.cor == 'P']
+
+    def rei(self, cor) -> Rei:
+        try:
+            r1, r2 = list(filter(Rei.__instancecheck__, self.tabuleiro))
+        except ValueError:
+            rei = list(filter(Rei.__instancecheck__, self.tabuleiro))[0]
+            return rei if rei.cor == cor else None
+        else:
+            return r1 if r1.cor == cor else r2
+
+    @staticmethod
+    def inv_cor(cor):
+        return 'P' if cor == 'B' else 'B'
+
+    @property
+    def comidas(self):
+        return self.__comidas
+
+    @property
+    def moves(self):
+        return self.__moves
+
+    @property
+    def chaves(self):
+        """
+        Chaves Zobrist das posições da partida, da inicial até a atual, para reconhecer repetições.
+        """
+        return self.__chaves
+
+    # Events
+
+    def ouvir(self, ouvinte):
+        """
+        Registra uma função (evento, dados) chamada a cada lance jogado com mover():
+            'recusado': {'motivo': 'vez' | 'propria' | 'ilegal'}
+            'lance': {'origem', 'destino', 'notacao', 'capturada'}
+            'estado': {'estado': XEQUE | MATE | AFOGADO, 'cor': cor que está na vez}
+            'final': {'resultado': 1 | 0 | -1, 'plies', 'cor'}, quando a posição está nas tabelas de finais
+                (resultado e meios-lances até o mate para a cor que está na vez, ver finais.decodificar)
+        e a cada desfazer(), refazer() ou ir_para():
+            'registro': {'atual': meio-lances aplicados}
+        """
+        self.__ouvintes.append(ouvinte)
+
+    def __emitir(self, evento, **dados):
+        for ouvinte in self.__ouvintes:
+            ouvinte(evento, dados)
+
+    def __is_check(self, _for):
+        king = self.rei(self.inv_cor(_for))
+        return king is not None and self.atacada(king.pos, _for)
+
+    def estado(self):
+        """
+        Estado da cor que está na vez (ver __checker)
+        """
+        return self.__checker(self.inv_cor(self.vez))
+
+    def __checker(self, _for):
+        """
+        :param _for: Turn to check for
+        :return:
+            0: None (NADA)
+            1: Check (XEQUE)
+            2: Mate (MATE)
+            3: Drowned King (AFOGADO)
+        """
+        da_vez = self.inv_cor(_for) == self.vez
+        if da_vez and self.analises is not None:
+            guardada = self.analises.buscar(self.chave, 'estado')
+            if guardada is not None and guardada.estado is not None:
+                return guardada.estado
+        check = self.__is_check(_for)
+        if da_vez:
+            drowned = not self.lances_da_vez()
+        else:
+            drowned = next(self.legal_moves(self.inv_cor(_for)), None) is None
+        if check:
+            estado = MATE if drowned else XEQUE
+        else:
+            estado = AFOGADO if drowned else NADA
+        if da_vez and self.analises is not None:
+            self.analises.gravar(self.chave, estado=estado)
+        return estado
+
+    def teorico(self):
+        """
+        Resultado da posição nas tabelas de finais, sem busca: (resultado, plies) para a cor que está na vez,
+        ou None sem tabelas ou fora delas.
+        """
+        if self.finais is None or len(self.__tabuleiro) > self.finais.maximo:
+            return None
+        return self.finais.sondar(self)
+
+    # Legal Moves
+
+    def lances_da_vez(self):
+        """
+        Lances legais de quem está na vez, pela casa de origem: {(x, y): ((x, y), ...)}. Calculados uma única vez
+        por posição e descartados pelo próximo make_move/unmake_move; com `analises`, vêm do cache persistente.
+        """
+        if self.__lances is None or self.__lances[0] != self.vez:
+            guardada = self.analises.buscar(self.chave, 'lances') if self.analises is not None else None
+            if guardada is not None and guardada.lances is not None:
+                legais = [decodificar(lance) for lance in guardada.lances]
+            else:
+                legais = list(self.legal_moves(self.vez))
+                if self.analises is not None:
+                    self.analises.gravar(self.chave, lances=[codificar(origem, destino) for origem, destino, _ in legais])
+            lances = {}
+            for origem, destino, _ in legais:
+                lances.setdefault(origem, []).append(destino)
+            self.__lances = self.vez, {origem: tuple(destinos) for origem, destinos in lances.items()}
+        return self.__lances[1]
+
+    def destinos(self, origem):
+        """
+        Destinos legais da peça em `origem` se ela é da cor que está na vez (ver lances_da_vez).
+        """
+        return self.lances_da_vez().get(tuple(origem), ())
+
+    def atacada(self, casa, por):
+        """
+        Se a casa (x, y) é atacada por alguma peça da cor `por`.
+        """
+        x, y = casa
+        sq = x * 8 + y
+        casas = self.__casas
+        for x1, y1 in SALTOS_CAVALO[sq]:
+            p = casas[x1 * 8 + y1]
+            if p is not None and p.cor == por and isinstance(p, SALTADORES):
+                return True
+        for x1, y1 in SALTOS_REI[sq]:
+            p = casas[x1 * 8 + y1]
+            if p is not None and p.cor == por and isinstance(p, Rei):
+                return True
+        for x1, y1 in CAPTURAS_PEAO[self.inv_cor(por)][sq]:
+            p = casas[x1 * 8 + y1]
+            if p is not None and p.cor == por and isinstance(p, Peao):
+                return True
+        for i, raio in enumerate(RAIOS[sq]):
+            deslizantes = DESLIZANTES_ORTOGONAIS if i < 4 else DESLIZANTES_DIAGONAIS
+            for x1, y1 in raio:
+                p = casas[x1 * 8 + y1]
+                if p is not None:
+                    if p.cor == por and isinstance(p, deslizantes):
+                        return True
+                    break
+        return False
+
+    def __atacadas(self, por):
+        res = set()
+        for peca in self.__tabuleiro:
+            if peca.cor != por:
+                continue
+            if isinstance(peca, Peao):
+                res.update(CAPTURAS_PEAO[por][peca.x * 8 + peca.y])
+            elif isinstance(peca, Rei):
+                res.update(SALTOS_REI[peca.x * 8 + peca.y])
+            else:
+                res.update(self.alcance(peca))
+        return res
+
+    def __xeques(self, rei):
+        """
+        :return: (peças que dão xeque, casas que resolvem um xeque único, {peça cravada: casas permitidas})
+        """
+        casas = self.__casas
+        cor = rei.cor
+        sq = rei.x * 8 + rei.y
+        xeques = []
+        resolve = set()
+        cravadas = {}
+        for i, raio in enumerate(RAIOS[sq]):
+            deslizantes = DESLIZANTES_ORTOGONAIS if i < 4 else DESLIZANTES_DIAGONAIS
+            amiga = None
+            for n, (x, y) in enumerate(raio):
+                p = casas[x * 8 + y]
+                if p is None:
+                    continue
+                if p.cor == cor:
+                    if amiga is not None:
+                        break
+                    amiga = p
+                    continue
+                if isinstance(p, deslizantes):
+                    if amiga is None:
+                        xeques.append(p)
+                        resolve.update(raio[:n + 1])
+                    else:
+                        cravadas[amiga] = frozenset(raio[:n + 1])
+                break
+        for tabela, classes in ((SALTOS_CAVALO[sq], SALTADORES), (CAPTURAS_PEAO[cor][sq], Peao)):
+            for x, y in tabela:
+                p = casas[x * 8 + y]
+                if p is not None and p.cor != cor and isinstance(p, classes):
+                    xeques.append(p)
+                    resolve.add((x, y))
+        return xeques, resolve, cravadas
+
+    def legal_moves(self, cor, origem=None, promocoes=(None,)):
+        """
+        Gera os lances legais de uma cor. Xeques, cravadas e casas atacadas são calculados uma única vez por posição.
+        :param cor: Cor que joga
+        :param origem: Restringe a geração à peça nesta casa
+        :param promocoes: Classes geradas para cada promoção (None usa a padrão de make_move)
+        :return: Gerador de (origem, destino, promocao)
+        """
+        casas = self.__casas
+        inimigo = self.inv_cor(cor)
+        rei = self.rei(cor)
+        if origem is None:
+            pecas = [peca for peca in self.__tabuleiro if peca.cor == cor]
+        else:
+            peca = self.casa(origem)
+            pecas = [peca] if peca is not None and peca.cor == cor else []
+
+        if rei is None:
+            xeques, resolve, cravadas, atacadas = [], set(), {}, set()
+        else:
+            xeques, resolve, cravadas = self.__xeques(rei)
+            casas[rei.x * 8 + rei.y] = None  # Sem o rei, para que não bloqueie os raios que o atacam
+            atacadas = self.__atacadas(inimigo)
+            casas[rei.x * 8 + rei.y] = rei
+
+        for peca in pecas:
+            x, y = pos = peca.x, peca.y
+            if isinstance(peca, Rei):
+                for destino in SALTOS_REI[x * 8 + y]:
+                    outra = casas[destino[0] * 8 + destino[1]]
+                    if (outra is None or outra.cor != cor) and destino not in atacadas:
+                        yield pos, destino, None
+                if not peca.moved and not xeques and pos == ((7 if cor == 'B' else 0), 4):
+                    for ty, vazias, livres in ((7, (5, 6), (5, 6)), (0, (1, 2, 3), (3, 2))):
+                        torre = casas[x * 8 + ty]
+                        if isinstance(torre, Torre) and torre.cor == cor and not torre.moved \
+                                and not any(casas[x * 8 + v] for v in vazias) \
+                                and not any((x, v) in atacadas for v in livres):
+                            yield pos, (x, livres[-1]), None
+                continue
+            if len(xeques) > 1:
+                continue
+
+            permitidas = cravadas.get(peca)
+            if isinstance(peca, Peao):
+                destinos = []
+                frente = (x + peca.orien, y)
+                if 0 <= frente[0] < 8 and casas[frente[0] * 8 + y] is None:
+                    destinos.append(frente)
+                    duplo = (x + 2 * peca.orien, y)
+                    if not peca.moved and 0 <= duplo[0] < 8 and casas[duplo[0] * 8 + y] is None:
+                        destinos.append(duplo)
+                for destino in CAPTURAS_PEAO[cor][x * 8 + y]:
+                    outra = casas[destino[0] * 8 + destino[1]]
+                    if outra is not None:
+                        if outra.cor != cor:
+                            destinos.append(destino)
+                    elif self.__validate_passant(pos, destino):
+                        # Passant tira duas peças da linha do rei: verificado aplicando o lance
+                        desfazer = self.make_move(pos, destino)
+                        legal = rei is None or not self.atacada(rei.pos, inimigo)
+                        self.unmake_move(desfazer)
+                        if legal:
+                            yield pos, destino, None
+                promove = x + peca.orien in (0, 7)
+            else:
+                destinos = [destino for destino in self.alcance(peca)
+                            if casas[destino[0] * 8 + destino[1]] is None or
+                            casas[destino[0] * 8 + destino[1]].cor != cor]
+                promove = False
+
+            for destino in destinos:
+                if (permitidas is not None and destino not in permitidas) or (xeques and destino not in resolve):
+                    continue
+                if promove:
+                    for classe in promocoes:
+                        yield pos, destino, classe
+                else:
+                    yield pos, destino, None
+
+    # Validations
+
+    def __validate_passant(self, origem, destino):
+        comer = [origem[0], destino[1]]
+        cor1 = self.cor(origem)
+        cor2 = self.cor(comer)
+        falsy = [
+            not isinstance(self.casa(origem), Peao),
+            not isinstance(self.casa(comer), Peao),
+            cor1 == cor2,
+            None in (cor1, cor2),
+            self.casa(destino) is not None,
+            self.casa(comer) not in self.__passant
+        ]
+        if any(falsy):
+            return False
+        return 'passant'
+
+    # Moving
+
+    def mover(self, origem, destino, promocao=None):
+        """
+        Joga um lance da vez: aplica, registra notação e peças comidas e avisa os ouvintes.
+        :param promocao: Classe da promoção já escolhida; sem ela a função `promocao` do jogo é consultada
+        :return: Notação do lance ou None se ele foi recusado
+        """
+        peca = self.casa(origem)
+        cor = self.cor(origem)
+
+        # Validation
+        if cor != self.vez:
+            self.__emitir('recusado', motivo='vez')
+            return None
+        elif cor == self.cor(destino):
+            self.__emitir('recusado', motivo='propria')
+            return None
+        elif tuple(destino) not in self.destinos(origem):
+            self.__emitir('recusado', motivo='ilegal')
+            return None
+
+        # Promotion
+        classe = None
+        if isinstance(peca, Peao) and destino[0] in (0, 7):
+            classe = promocao or (self.promocao and self.promocao(cor)) or Supreme
+
+        notation = notacao.san(self, (tuple(origem), tuple(destino), classe), sufixo=False)
+        relogio = self.relogio
+        desfazer = self.make_move(origem, destino, classe)
+        capturada = desfazer[3]
+        if isinstance(peca, Peao) or capturada is not None:
+            self.relogio = 0
+        else:
+            self.relogio += 1
+        if cor == 'P':
+            self.numero += 1
+
+        # Check and Mate (o registro mostra o mate como '++'; a SAN padrão usa '#')
+        state = self.__checker(cor)
+        if state == MATE:
+            notation += '++'
+        elif state == XEQUE:
+            notation += '+'
+        self.__moves[cor].append(notation)
+        self.__chaves.append(self.chave)
+        self.registro.acrescentar(cor, empacotar(origem, destino, desfazer, state), notation, relogio, desfazer)
+
+        self.__emitir('lance', origem=tuple(origem), destino=tuple(destino), notacao=notation, capturada=capturada)
+        if state:
+            self.__emitir('estado', estado=state, cor=self.vez)
+        final = self.teorico() if state not in (MATE, AFOGADO) else None
+        if final is not None:
+            self.__emitir('final', resultado=final[0], plies=final[1], cor=self.vez)
+        return notation
+
+    # History
+
+    def desfazer(self):
+        """
+        Volta o último meio-lance aplicado; ele fica no registro para refazer até outro lance ser jogado.
+        :return: Se havia lance para voltar
+        """
+        if not self.__voltar_lance():
+            return False
+        self.__emitir('registro', atual=self.registro.atual)
+        return True
+
+    def refazer(self):
+        """
+        Aplica de novo o próximo meio-lance do registro.
+        :return: Se havia lance para refazer
+        """
+        if not self.__refazer_lance():
+            return False
+        self.__emitir('registro', atual=self.registro.atual)
+        return True
+
+    def ir_para(self, ply):
+        """
+        Leva a posição para depois do meio-lance `ply` do registro (0 = antes do primeiro), voltando ou refazendo
+        lance a lance a partir da posição atual.
+        """
+        ply = max(0, min(ply, len(self.registro)))
+        if ply == self.registro.atual:
+            return
+        while self.registro.atual > ply:
+            self.__voltar_lance()
+        while self.registro.atual < ply:
+            self.__refazer_lance()
+        self.__emitir('registro', atual=self.registro.atual)
+
+    def __voltar_lance(self):
+        registro = self.registro
+        if registro.atual == 0:
+            return False
+        self.unmake_move(registro.desfazer.pop())
+        registro.atual -= 1
+        self.relogio = registro.relogios[registro.atual]
+        if self.vez == 'P':
+            self.numero -= 1
+        self.__moves[self.vez].pop()
+        self.__chaves.pop()
+        return True
+
+    def __refazer_lance(self):
+        registro = self.registro
+        if registro.atual == len(registro):
+            return False
+        codigo = registro.lances[registro.atual]
+        cor = self.vez
+        registro.desfazer.append(self.make_move(*desempacotar(codigo)))
+        if tipo_peca(codigo) is Peao or tipo_capturada(codigo) is not None:
+            self.relogio = 0
+        else:
+            self.relogio = registro.relogios[registro.atual] + 1
+        if cor == 'P':
+            self.numero += 1
+        self.__moves[cor].append(registro.notacoes[registro.atual])
+        self.__chaves.append(self.chave)
+        registro.atual += 1
+        return True
+
+    def make_move(self, origem, destino, promocao=None):
+        """
+        Aplica um lance no próprio tabuleiro, sem copiar e sem efeitos de tela. A peça capturada entra em `comidas`
+        e os contadores de material e de tabelas peça-casa são atualizados junto com o tabuleiro.
+        :param promocao: Classe da peça que substitui o peão ao chegar na última linha (Supreme se None)
+        :return: Registro para unmake_move:
+            (peca, origem, moved, capturada, torre, promovida, passant, vez)
+        """
+        x1, y1 = origem
+        x2, y2 = destino
+        peca = self.__casas[x1 * 8 + y1]
+        capturada = self.__casas[x2 * 8 + y2]
+        torre = promovida = None
+        self.__lances = None
+        desfazer_passant = self.__passant
+        self.__passant = []
+        moved = peca.moved
+
+        if capturada is not None:
+            self.__retirar(capturada)
+
+        if isinstance(peca, Rei) and abs(y2 - y1) == 2:  # Roque
+            torre = self.__move_roque(peca.cor + ('C' if y2 > y1 else 'L'))
+        elif isinstance(peca, Peao) and y1 != y2 and capturada is None:  # Passant
+            capturada = self.__comer_passant(origem, destino)
+        else:  # Movimento normal
+            self.__mover(peca, x2, y2)
+            if isinstance(peca, Peao) and abs(x2 - x1) == 2:
+                self.__passant = [peca]
+
+        if isinstance(peca, Peao) and x2 in (0, 7):
+            promovida = (promocao or Supreme)(x2, y2, peca.cor)
+            promovida.moved = True
+            self.__retirar(peca)
+            self.__colocar(promovida)
+
+        if capturada is not None:
+            self.__comidas[peca.cor].append(capturada)
+        desfazer = (peca, (x1, y1), moved, capturada, torre, promovida, desfazer_passant, self.vez)
+        self.vez = self.inv_cor(peca.cor)
+        return desfazer
+
+    def unmake_move(self, desfazer):
+        peca, (x1, y1), moved, capturada, torre, promovida, passant, vez = desfazer
+        self.__lances = None
+        if promovida is not None:
+            self.__retirar(promovida)
+            self.__colocar(peca)
+        if torre is not None:
+            rook, rook_moved = torre
+            self.__voltar(rook, rook.x, 0 if rook.y == 3 else 7, rook_moved)
+        self.__voltar(peca, x1, y1, moved)
+        if capturada is not None:
+            self.__colocar(capturada)
+            self.__comidas[peca.cor].pop()
+        self.__passant = passant
+        self.vez = vez
+
+    def __voltar(self, peca, x, y, moved):
+        chaves = zobrist.PECAS[type(peca)][peca.cor]
+        pst = avaliacao.PST[type(peca)][peca.cor]
+        self.__chave ^= chaves[peca.x * 8 + peca.y] ^ chaves[x * 8 + y]
+        self.__pontos += pst[x * 8 + y] - pst[peca.x * 8 + peca.y]
+        self.__casas[peca.x * 8 + peca.y] = None
+        peca.x = x
+        peca.y = y
+        peca.moved = moved
+        self.__casas[x * 8 + y] = peca
+
+    def __move_roque(self, _id):
+        x = 7 if _id[0] == 'B' else 0
+        para = -1 if _id[1] == 'L' else 1
+        ty = 0 if _id[1] == 'L' else 7
+
+        rei = self.rei(_id[0])
+        torre = self.casa([x, ty])
+        moved = torre.moved
+        self.__mover(rei, x, 4 + 2 * para)
+        self.__mover(torre, x, 4 + para)
+        return torre, moved
+
+    def __comer_passant(self, origem, destino):
+        outra = self.casa([origem[0], destino[1]])
+        self.__retirar(outra)
+        self.__mover(self.casa(origem), *destino)
+        return outra
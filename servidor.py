@@ -0,0 +1,527 @@
+"""
+Servidor de partidas em asyncio: milhares de sessões de Xadrez em memória num único processo, com clientes por TCP
+trocando JSON, uma mensagem por linha. Os lances são validados pelas regras (Xadrez.mover) e cada sessão empurra
+para os seus inscritos os lances, xeques, mates, afogamentos e relógios. As buscas do computador rodam num pool de
+processos, então uma busca lenta não segura o laço de eventos.
+
+    python servidor.py servir --porta 8765 --trabalhadores 2
+    python servidor.py carga --sessoes 2000 --conexoes 50 --lances 20    Sobe um servidor local e mede a latência
+
+Cliente -> servidor:
+    {"tipo": "nova", "computador": ["P"], "tempo": 200, "relogio": 300000, "incremento": 2000}
+    {"tipo": "entrar", "sessao": 7}
+    {"tipo": "lance", "sessao": 7, "lance": "e2e4"}         Coordenadas (ver notacao.ler_coordenadas)
+    {"tipo": "sair", "sessao": 7}
+    {"tipo": "status"}
+Servidor -> cliente:
+    {"tipo": "criada", "sessao": 7}
+    {"tipo": "posicao", "sessao": 7, "fen", "vez", "legais": ["e2e4", ...], "relogios": {"B": ms, "P": ms} | null}
+    {"tipo": "lance", "sessao": 7, "lance": "e2e4", "notacao": "e4", "fen", "vez", "legais", "relogios"}
+    {"tipo": "estado", "sessao": 7, "estado": "xeque" | "mate" | "afogado", "cor": "P"}
+    {"tipo": "fim", "sessao": 7, "resultado": "1-0", "motivo": "mate" | "afogado" | "repeticao" | "tempo" | "erro"}
+    {"tipo": "erro", "sessao": 7, "motivo": "vez" | "propria" | "ilegal" | "formato" | "sessao" | "fim" | "busca" | ...}
+    {"tipo": "status", "sessoes", "conexoes", "lances", "cpu"}
+
+Um inscrito que não lê o que recebe e deixa mais de LIMITE_BUFFER bytes pendentes é desconectado, para um cliente
+lento não fazer a memória do servidor crescer sem limite.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter, process_time
+
+from bitboard import Bitboard
+from busca import Busca
+from notacao import ler_coordenadas
+from perft import coordenadas
+from regras import Xadrez, XEQUE, MATE, AFOGADO
+from transposicao import Transposicao
+
+ESTADOS = {XEQUE: 'xeque', MATE: 'mate', AFOGADO: 'afogado'}
+LIMITE_BUFFER = 1 << 20  # Bytes pendentes na escrita para um inscrito antes de ele ser desconectado
+
+_busca = None  # Busca de cada processo trabalhador
+
+
+def _iniciar(megabytes):
+    global _busca
+    _busca = Busca(Transposicao(megabytes))
+
+
+def _pensar(retrato, time_ms, historico):
+    return _busca.best_move(Bitboard.de_posicao(retrato), time_ms, historico=historico)
+
+
+def _linha(mensagem):
+    return (json.dumps(mensagem, separators=(',', ':')) + '\n').encode()
+
+
+class Sessao:
+    def __init__(self, numero, computador=(), tempo=200, relogio=None, incremento=0):
+        """
+        :param computador: Cores jogadas pelo servidor
+        :param tempo: Milissegundos de busca por lance do computador
+        :param relogio: Milissegundos de cada lado (None: sem relógio)
+        :param incremento: Milissegundos somados ao relógio de quem joga, a cada lance
+        """
+        self.numero = numero
+        self.jogo = Xadrez.inicial()
+        self.computador = frozenset(computador)
+        self.tempo = tempo
+        self.relogios = {'B': relogio, 'P': relogio} if relogio else None
+        self.incremento = incremento
+        self.inscritos = set()  # StreamWriters que recebem as mensagens da sessão
+        self.fim = None  # (resultado, motivo)
+        self.pensando = False
+        self.bandeira = None  # asyncio.TimerHandle que derruba quem está na vez quando o relógio zera
+        self.__desde = perf_counter()  # Início da vez atual
+        self.__eventos = []
+        self.jogo.ouvir(lambda evento, dados: self.__eventos.append((evento, dados)))
+
+    def restante(self, cor=None):
+        """
+        :return: Milissegundos no relógio de `cor` (padrão: quem está na vez), descontando a vez em andamento
+        """
+        if self.relogios is None:
+            return None
+        cor = cor or self.jogo.vez
+        gasto = (perf_counter() - self.__desde) * 1000 if cor == self.jogo.vez else 0
+        return self.relogios[cor] - gasto
+
+    def __relogios(self):
+        if self.relogios is None:
+            return None
+        return {cor: max(0, round(self.restante(cor))) for cor in self.relogios}
+
+    def posicao(self, tipo='posicao', **extra):
+        legais = [coordenadas(origem, destino) for origem, destinos in self.jogo.lances_da_vez().items()
+                  for destino in destinos] if self.fim is None else []
+        return {'tipo': tipo, 'sessao': self.numero, **extra, 'fen': self.jogo.fen(), 'vez': self.jogo.vez,
+                'legais': legais, 'relogios': self.__relogios()}
+
+    def esgotar(self):
+        """
+        Termina a partida por tempo de quem está na vez.
+        :return: Mensagens para os inscritos
+        """
+        self.fim = ('0-1' if self.jogo.vez == 'B' else '1-0'), 'tempo'
+        self.relogios[self.jogo.vez] = 0
+        return [{'tipo': 'fim', 'sessao': self.numero, 'resultado': self.fim[0], 'motivo': self.fim[1]}]
+
+    def interromper(self, motivo):
+        """
+        Termina a partida sem resultado, por uma falha do servidor.
+        :return: Mensagens para os inscritos
+        """
+        self.fim = '*', motivo
+        return [{'tipo': 'erro', 'sessao': self.numero, 'motivo': motivo},
+                {'tipo': 'fim', 'sessao': self.numero, 'resultado': '*', 'motivo': 'erro'}]
+
+    def jogar(self, origem, destino, promocao=None):
+        """
+        Joga um lance da vez, validado pelas regras, e desconta o relógio de quem jogou.
+        :return: Mensagens para os inscritos
+        :raise ValueError: Com o motivo da recusa
+        """
+        if self.fim is not None:
+            raise ValueError('fim')
+        cor = self.jogo.vez
+        if self.relogios is not None and self.restante() <= 0:
+            return self.esgotar()
+        self.__eventos.clear()
+        texto = self.jogo.mover(origem, destino, promocao)
+        if texto is None:
+            raise ValueError(self.__eventos[0][1]['motivo'])
+        agora = perf_counter()
+        if self.relogios is not None:
+            self.relogios[cor] += self.incremento - (agora - self.__desde) * 1000
+        self.__desde = agora
+
+        estado = None
+        for evento, dados in self.__eventos:
+            if evento == 'estado':
+                estado = dados['estado']
+        if estado == MATE:
+            self.fim = ('1-0' if cor == 'B' else '0-1'), 'mate'
+        elif estado == AFOGADO:
+            self.fim = '1/2-1/2', 'afogado'
+        elif self.jogo.chaves.count(self.jogo.chaves[-1]) >= 3:
+            self.fim = '1/2-1/2', 'repeticao'
+
+        promovida = promocao or (type(self.jogo.casa(destino)) if '=' in texto else None)
+        mensagens = [self.posicao('lance', lance=coordenadas(origem, destino, promovida), notacao=texto)]
+        if estado:
+            mensagens.append({'tipo': 'estado', 'sessao': self.numero, 'estado': ESTADOS[estado], 'cor': self.jogo.vez})
+        if self.fim is not None:
+            mensagens.append({'tipo': 'fim', 'sessao': self.numero, 'resultado': self.fim[0], 'motivo': self.fim[1]})
+        return mensagens
+
+
+class Servidor:
+    def __init__(self, trabalhadores=None, megabytes=4):
+        """
+        :param trabalhadores: Processos de busca para os lances do computador (padrão: um por núcleo)
+        :param megabytes: Tabela de transposição de cada processo de busca
+        """
+        self.sessoes = {}
+        self.conexoes = 0
+        self.lances = 0
+        self.__proxima = 1
+        self.__trabalhadores = trabalhadores
+        self.__megabytes = megabytes
+        self.__pool = None  # Criado na primeira sessão com computador
+
+    def fechar(self):
+        if self.__pool is not None:
+            self.__pool.shutdown(cancel_futures=True)
+
+    async def servir(self, host='127.0.0.1', porta=8765):
+        """
+        :return: asyncio.Server já escutando
+        """
+        return await asyncio.start_server(self.__conexao, host, porta)
+
+    async def __conexao(self, leitor, escritor):
+        self.conexoes += 1
+        inscricoes = set()
+        try:
+            async for linha in leitor:
+                try:
+                    mensagem = json.loads(linha)
+                    resposta = self.__tratar(mensagem, escritor, inscricoes)
+                except (ValueError, TypeError, KeyError) as erro:
+                    resposta = {'tipo': 'erro', 'motivo': 'formato', 'detalhe': str(erro)}
+                if resposta is not None:
+                    escritor.write(_linha(resposta))
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.conexoes -= 1
+            for numero in inscricoes:
+                self.__desinscrever(numero, escritor)
+            escritor.close()
+
+    def __tratar(self, mensagem, escritor, inscricoes):
+        """
+        :return: Resposta só para quem mandou a mensagem, ou None quando tudo foi publicado aos inscritos
+        """
+        tipo = mensagem['tipo']
+        if tipo == 'nova':
+            sessao = Sessao(self.__proxima, mensagem.get('computador', ()), int(mensagem.get('tempo', 200)),
+                            mensagem.get('relogio'), int(mensagem.get('incremento', 0)))
+            self.__proxima += 1
+            self.sessoes[sessao.numero] = sessao
+            escritor.write(_linha({'tipo': 'criada', 'sessao': sessao.numero}))
+            self.__inscrever(sessao, escritor, inscricoes)
+            self.__proximo_lance(sessao)
+            return None
+        if tipo == 'status':
+            return {'tipo': 'status', 'sessoes': len(self.sessoes), 'conexoes': self.conexoes, 'lances': self.lances,
+                    'cpu': process_time()}
+
+        numero = mensagem.get('sessao')
+        sessao = self.sessoes.get(numero)
+        if sessao is None:
+            return {'tipo': 'erro', 'sessao': numero, 'motivo': 'sessao'}
+        if tipo == 'entrar':
+            self.__inscrever(sessao, escritor, inscricoes)
+        elif tipo == 'sair':
+            inscricoes.discard(numero)
+            self.__desinscrever(numero, escritor)
+        elif tipo == 'lance':
+            if sessao.jogo.vez in sessao.computador:
+                return {'tipo': 'erro', 'sessao': numero, 'motivo': 'vez'}
+            try:
+                mensagens = sessao.jogar(*ler_coordenadas(mensagem['lance']))
+            except ValueError as erro:
+                motivo = str(erro) if str(erro) in ('vez', 'propria', 'ilegal', 'fim') else 'formato'
+                return {'tipo': 'erro', 'sessao': numero, 'motivo': motivo}
+            self.__publicar(sessao, mensagens)
+        else:
+            return {'tipo': 'erro', 'sessao': numero, 'motivo': 'tipo'}
+        return None
+
+    def __inscrever(self, sessao, escritor, inscricoes):
+        sessao.inscritos.add(escritor)
+        inscricoes.add(sessao.numero)
+        self.__enviar(sessao, escritor, _linha(sessao.posicao()))
+
+    def __desinscrever(self, numero, escritor):
+        """
+        Sessões sem nenhum inscrito são descartadas.
+        """
+        sessao = self.sessoes.get(numero)
+        if sessao is None:
+            return
+        sessao.inscritos.discard(escritor)
+        if not sessao.inscritos:
+            if sessao.bandeira is not None:
+                sessao.bandeira.cancel()
+            sessao.fim = sessao.fim or ('*', 'abandono')
+            del self.sessoes[numero]
+
+    def __publicar(self, sessao, mensagens):
+        """
+        Manda as mensagens a todos os inscritos (codificadas uma vez só) e prepara o próximo lance.
+        """
+        dados = b''.join(map(_linha, mensagens))
+        for escritor in list(sessao.inscritos):
+            self.__enviar(sessao, escritor, dados)
+        if mensagens and mensagens[0]['tipo'] == 'lance':
+            self.lances += 1
+        self.__proximo_lance(sessao)
+
+    @staticmethod
+    def __enviar(sessao, escritor, dados):
+        """
+        Escreve sem esperar o cliente; quem já tem mais de LIMITE_BUFFER bytes por ler perde a conexão (o que
+        estava pendente é descartado e a saída da conexão o tira das sessões).
+        """
+        if escritor.transport.get_write_buffer_size() > LIMITE_BUFFER:
+            sessao.inscritos.discard(escritor)
+            escritor.transport.abort()
+            return
+        escritor.write(dados)
+
+    def __proximo_lance(self, sessao):
+        """
+        Arma o relógio de quem está na vez e, se for o computador, manda a busca para o pool.
+        """
+        if sessao.bandeira is not None:
+            sessao.bandeira.cancel()
+            sessao.bandeira = None
+        if sessao.fim is not None:
+            return
+        laco = asyncio.get_running_loop()
+        if sessao.relogios is not None:
+            sessao.bandeira = laco.call_later(max(0, sessao.restante()) / 1000, self.__bandeira, sessao)
+        if sessao.jogo.vez in sessao.computador and not sessao.pensando:
+            laco.create_task(self.__computador(sessao))
+
+    def __bandeira(self, sessao):
+        sessao.bandeira = None
+        if sessao.fim is None and sessao.numero in self.sessoes:
+            self.__publicar(sessao, sessao.esgotar())
+
+    async def __computador(self, sessao):
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(self.__trabalhadores, initializer=_iniciar,
+                                              initargs=(self.__megabytes,))
+        tempo = sessao.tempo
+        if sessao.relogios is not None:
+            tempo = max(10, min(tempo, int(sessao.restante() / 30)))
+        sessao.pensando = True
+        pool = self.__pool
+        try:
+            lance = await asyncio.get_running_loop().run_in_executor(
+                pool, _pensar, sessao.jogo.posicao(), tempo, list(sessao.jogo.chaves))
+        except Exception as erro:
+            # Sem isso a exceção ficaria na tarefa, que ninguém espera, e a partida parada na vez do computador
+            print(f'Sessão {sessao.numero}: erro na busca: {erro!r}', file=sys.stderr)
+            if isinstance(erro, BrokenProcessPool) and self.__pool is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.__pool = None  # A próxima busca cria outro
+            if sessao.fim is None and sessao.numero in self.sessoes:
+                self.__publicar(sessao, sessao.interromper('busca'))
+            return
+        finally:
+            sessao.pensando = False
+        if lance is None or sessao.fim is not None or sessao.numero not in self.sessoes:
+            return
+        self.__publicar(sessao, sessao.jogar(*lance))
+
+
+async def servir(host, porta, trabalhadores=None, pronto=None):
+    """
+    Roda o servidor até o processo ser interrompido.
+    :param pronto: multiprocessing.Event marcado quando a porta já está aberta
+    """
+    servidor = Servidor(trabalhadores)
+    try:
+        async with await servidor.servir(host, porta) as tcp:
+            if pronto is not None:
+                pronto.set()
+            await tcp.serve_forever()
+    finally:
+        servidor.fechar()
+
+
+def _processo_servidor(host, porta, trabalhadores, pronto):
+    async def rodar():
+        # SIGTERM cancela o servidor, que fecha o pool de busca antes de sair (sem deixar processos órfãos)
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await servir(host, porta, trabalhadores, pronto)
+    try:
+        asyncio.run(rodar())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+# Teste de carga
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def _status(host, porta):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    escritor.write(_linha({'tipo': 'status'}))
+    resposta = json.loads(await leitor.readline())
+    escritor.close()
+    return resposta
+
+
+async def _cliente(host, porta, sessoes, lances, gerador, latencias, computador, pico):
+    """
+    Uma conexão que abre `sessoes` partidas ao mesmo tempo e joga em cada uma lances aleatórios da lista de legais
+    que o servidor empurra, medindo do envio até a chegada do lance.
+    """
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    criadas = asyncio.Queue()
+    filas = {}
+    abertas = [0]
+    todas = asyncio.Event()
+
+    async def ler():
+        async for linha in leitor:
+            mensagem = json.loads(linha)
+            if mensagem['tipo'] == 'criada':
+                filas[mensagem['sessao']] = asyncio.Queue()
+                criadas.put_nowait(mensagem['sessao'])
+            elif mensagem.get('sessao') in filas:
+                filas[mensagem['sessao']].put_nowait(mensagem)
+
+    async def partida():
+        escritor.write(_linha({'tipo': 'nova', 'computador': computador}))
+        numero = await criadas.get()
+        fila = filas[numero]
+        ultima = await fila.get()
+        abertas[0] += 1
+        if abertas[0] == sessoes:
+            todas.set()
+        await todas.wait()  # Todas as sessões da conexão ficam abertas ao mesmo tempo
+        pico[0] += 1
+        jogados = 0
+        while jogados < lances and ultima['legais']:
+            if ultima['vez'] in computador:
+                ultima = await fila.get()
+                continue
+            inicio = perf_counter()
+            escritor.write(_linha({'tipo': 'lance', 'sessao': numero, 'lance': gerador.choice(ultima['legais'])}))
+            resposta = await fila.get()
+            while resposta['tipo'] not in ('lance', 'erro'):
+                resposta = await fila.get()
+            latencias.append((perf_counter() - inicio) * 1000)
+            if resposta['tipo'] == 'erro':
+                break
+            ultima = resposta
+            jogados += 1
+        escritor.write(_linha({'tipo': 'sair', 'sessao': numero}))
+
+    leitura = asyncio.create_task(ler())
+    await asyncio.gather(*(partida() for _ in range(sessoes)))
+    await escritor.drain()
+    escritor.close()
+    leitura.cancel()
+
+
+async def carga(host, porta, sessoes=1000, conexoes=20, lances=20, semente=0, computador=()):
+    """
+    Teste de carga contra um servidor já no ar: `sessoes` partidas simultâneas divididas em `conexoes` conexões.
+    :param computador: Cores jogadas pelo servidor em cada sessão (mede também a ida e volta ao pool de busca)
+    :return: Latência p50/p99 dos lances, lances/s e sessões por núcleo (sessões / núcleos ocupados pelo laço)
+    """
+    gerador = random.Random(semente)
+    latencias = []
+    pico = [0]
+    antes = await _status(host, porta)
+    inicio = perf_counter()
+    por_conexao = [sessoes // conexoes + (i < sessoes % conexoes) for i in range(conexoes)]
+    await asyncio.gather(*(_cliente(host, porta, n, lances, gerador, latencias, list(computador), pico)
+                           for n in por_conexao if n))
+    segundos = perf_counter() - inicio
+    depois = await _status(host, porta)
+    ocupacao = (depois['cpu'] - antes['cpu']) / segundos  # Núcleos do servidor em uso durante o teste
+    return {
+        'sessoes': sessoes,
+        'sessoes_simultaneas': pico[0],
+        'conexoes': conexoes,
+        'lances': len(latencias),
+        'segundos': round(segundos, 3),
+        'lances_por_segundo': round(len(latencias) / segundos, 1),
+        'p50_ms': round(_percentil(latencias, 50), 3) if latencias else None,
+        'p99_ms': round(_percentil(latencias, 99), 3) if latencias else None,
+        'max_ms': round(max(latencias), 3) if latencias else None,
+        'ocupacao_cpu': round(ocupacao, 3),
+        'sessoes_por_nucleo': round(sessoes / max(ocupacao, 1e-9)) if ocupacao > 0 else None,
+        'nucleos': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor de partidas (JSON por linha sobre TCP)')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    servir_ = comandos.add_parser('servir', help='Sobe o servidor')
+    servir_.add_argument('--host', default='127.0.0.1')
+    servir_.add_argument('--porta', type=int, default=8765)
+    servir_.add_argument('--trabalhadores', type=int, help='Processos de busca (padrão: um por núcleo)')
+    carga_ = comandos.add_parser('carga', help='Teste de carga com clientes locais')
+    carga_.add_argument('--host', default='127.0.0.1')
+    carga_.add_argument('--porta', type=int, default=8765)
+    carga_.add_argument('--externo', action='store_true', help='Usa um servidor já no ar em vez de subir um')
+    carga_.add_argument('--sessoes', type=int, default=1000)
+    carga_.add_argument('--conexoes', type=int, default=20)
+    carga_.add_argument('--lances', type=int, default=20, help='Lances do cliente por sessão')
+    carga_.add_argument('--computador', default='', help='Cores jogadas pelo servidor, ex.: P')
+    carga_.add_argument('--trabalhadores', type=int, help='Processos de busca do servidor local')
+    carga_.add_argument('--semente', type=int, default=0)
+    carga_.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args(argv)
+
+    if args.comando == 'servir':
+        print(f'Servindo em {args.host}:{args.porta}')
+        try:
+            asyncio.run(servir(args.host, args.porta, args.trabalhadores))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    processo = None
+    if not args.externo:
+        # Servidor num processo à parte, para os clientes não dividirem o laço de eventos com ele
+        pronto = multiprocessing.Event()
+        processo = multiprocessing.Process(target=_processo_servidor,
+                                           args=(args.host, args.porta, args.trabalhadores, pronto))
+        processo.start()
+        if not pronto.wait(30):
+            print('O servidor não subiu', file=sys.stderr)
+            processo.terminate()
+            return 1
+    try:
+        res = asyncio.run(carga(args.host, args.porta, args.sessoes, args.conexoes, args.lances, args.semente,
+                                tuple(args.computador.upper())))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.join()
+    for nome, valor in res.items():
+        print(f'{nome:>20} {valor}')
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(res, arquivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+import random
+
+import pytest
+
+from avaliacao import pontos_completos
+from perft import POSICOES, BACKENDS
+from pecas import PROMOCOES
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+@pytest.mark.parametrize('nome', ['inicial', 'kiwipete', 'posicao4', 'promove_com_xeque'])
+def test_pontos_incrementais(backend, nome):
+    # pontos e fase mantidos por make_move/unmake_move são os mesmos somados do zero sobre as peças
+    posicao = BACKENDS[backend](POSICOES[nome][0])
+    sorteio = random.Random(nome)
+    for _ in range(40):
+        lances = list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES))
+        if not lances:
+            break
+        antes = posicao.pontos, posicao.fase
+        for lance in lances:
+            desfazer = posicao.make_move(*lance)
+            assert (posicao.pontos, posicao.fase) == pontos_completos(posicao.tabuleiro), lance
+            posicao.unmake_move(desfazer)
+            assert (posicao.pontos, posicao.fase) == antes, lance
+        posicao.make_move(*sorteio.choice(lances))
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from bitboard import Bitboard
+from perft import POSICOES, perft
+from regras import Xadrez
+from pecas import PROMOCOES
+
+
+@pytest.mark.parametrize('nome', ['inicial', 'kiwipete', 'posicao3'])
+@pytest.mark.parametrize('profundidade', [2, 3])
+def test_perft(nome, profundidade):
+    fen, folhas = POSICOES[nome]
+    assert perft(Bitboard.de_xadrez(Xadrez.de_fen(fen)), profundidade) == folhas[profundidade - 1]
+
+
+@pytest.mark.parametrize('semente', range(20))
+def test_mesmos_lances_que_o_tabuleiro(semente):
+    # As duas cores, não só a da vez: cobre o en passant pedido para quem não joga
+    sorteio = random.Random(semente)
+    jogo = Xadrez.inicial()
+    for _ in range(80):
+        bitboard = Bitboard.de_xadrez(jogo)
+        for cor in 'BP':
+            esperados = sorted(map(repr, jogo.legal_moves(cor, promocoes=PROMOCOES)))
+            assert sorted(map(repr, bitboard.legal_moves(cor, promocoes=PROMOCOES))) == esperados, jogo.fen()
+        lances = list(jogo.legal_moves(jogo.vez))
+        if not lances:
+            break
+        jogo.make_move(*sorteio.choice(lances))
+
+
+
+def test_casa_passant():
+    jogo = Xadrez.de_fen(POSICOES['passant_da_xeque'][0])  # Peão branco em d4, que acabou de andar duas casas
+    assert jogo.casa_passant == Bitboard.de_xadrez(jogo).casa_passant == (4, 3)
+    jogo = Xadrez.inicial()
+    assert jogo.casa_passant is Bitboard.de_xadrez(jogo).casa_passant is None
+    jogo.make_move((6, 0), (4, 0))
+    assert jogo.casa_passant == Bitboard.de_xadrez(jogo).casa_passant == (4, 0)
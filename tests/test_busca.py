@@ -0,0 +1,45 @@
+import pytest
+
+import busca
+from busca import Busca
+from perft import POSICOES, BACKENDS
+from pecas import PROMOCOES
+
+CASOS = pytest.mark.parametrize('nome', ['inicial', 'kiwipete', 'posicao3', 'posicao4'])
+
+
+class Relogio:
+    """Relógio falso: cada consulta avança um milissegundo, então o teste não depende da carga da máquina."""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        self.agora += 0.001
+        return self.agora
+
+
+def legais(posicao):
+    return set(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES))
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+@CASOS
+def test_best_move_respeita_o_tempo(backend, nome, monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(busca, 'perf_counter', relogio)
+    posicao = BACKENDS[backend](POSICOES[nome][0])
+    lance = Busca().best_move(posicao, 100)
+    # Para na primeira consulta ao relógio depois do limite (mais a leitura do próprio teste)
+    assert relogio() <= 0.1 + 0.002 + 1e-9
+    assert lance in legais(posicao)
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+@CASOS
+def test_best_move_respeita_os_nos(backend, nome):
+    posicao = BACKENDS[backend](POSICOES[nome][0])
+    procura = Busca()
+    lance = procura.best_move(posicao, None, nos=1500)
+    assert procura.nos <= 1500
+    assert lance in legais(posicao)
@@ -0,0 +1,19 @@
+import pytest
+
+from perft import POSICOES, perft
+from regras import Xadrez
+from pecas import PROMOCOES
+
+
+@pytest.mark.parametrize('nome', sorted(POSICOES))
+def test_lances_legais(nome):
+    fen, folhas = POSICOES[nome]
+    jogo = Xadrez.de_fen(fen)
+    assert len(list(jogo.legal_moves(jogo.vez, promocoes=PROMOCOES))) == folhas[0]
+
+
+@pytest.mark.parametrize('nome', ['inicial', 'kiwipete', 'posicao3'])
+@pytest.mark.parametrize('profundidade', [2, 3])
+def test_perft(nome, profundidade):
+    fen, folhas = POSICOES[nome]
+    assert perft(Xadrez.de_fen(fen), profundidade) == folhas[profundidade - 1]
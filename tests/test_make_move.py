@@ -0,0 +1,24 @@
+import random
+
+import pytest
+
+from perft import POSICOES, BACKENDS
+from pecas import PROMOCOES
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+@pytest.mark.parametrize('nome', ['inicial', 'kiwipete', 'posicao3', 'posicao4'])
+def test_unmake_move_restaura_a_posicao(backend, nome):
+    posicao = BACKENDS[backend](POSICOES[nome][0])
+    sorteio = random.Random(nome)
+    for _ in range(40):
+        lances = list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES))
+        if not lances:
+            break
+        antes = posicao.posicao()
+        for lance in lances:
+            desfazer = posicao.make_move(*lance)
+            assert posicao.posicao() != antes, lance
+            posicao.unmake_move(desfazer)
+            assert posicao.posicao() == antes, lance
+        posicao.make_move(*sorteio.choice(lances))
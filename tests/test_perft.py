@@ -0,0 +1,22 @@
+import pytest
+
+from perft import POSICOES, BACKENDS, perft, divide, coordenadas
+from pecas import Rainha, Cavalo
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+@pytest.mark.parametrize('nome', ['kiwipete', 'promove_com_xeque', 'passant_da_xeque'])
+def test_divide_soma_o_perft(backend, nome):
+    fen, folhas = POSICOES[nome]
+    posicao = BACKENDS[backend](fen)
+    antes = posicao.posicao()
+    partes = divide(posicao, 2)
+    assert len(partes) == folhas[0]
+    assert sum(partes.values()) == folhas[1] == perft(posicao, 2)
+    assert posicao.posicao() == antes
+
+
+def test_coordenadas():
+    assert coordenadas((6, 4), (4, 4)) == 'e2e4'
+    assert coordenadas((1, 0), (0, 0), Rainha) == 'a7a8q'
+    assert coordenadas((6, 7), (7, 6), Cavalo) == 'h2g1n'
@@ -0,0 +1,46 @@
+from notacao import ler_coordenadas
+from regras import Xadrez
+
+# Captura, en passant das duas cores, roque e promoção com xeque
+LANCES = 'e2e4 d7d5 e4d5 g8f6 g1f3 c7c5 d5c6 b7c6 f1e2 e7e5 e1g1 e5e4 d2d4 e4d3 b1c3 d3e2 c1g5 e2f1q'.split()
+
+
+def jogar():
+    jogo = Xadrez.inicial()
+    fens = [jogo.fen()]
+    for lance in LANCES:
+        assert jogo.mover(*ler_coordenadas(lance)) is not None, lance
+        fens.append(jogo.fen())
+    return jogo, fens
+
+
+def test_desfazer_e_refazer():
+    jogo, fens = jogar()
+    for ply in range(len(LANCES) - 1, -1, -1):
+        assert jogo.desfazer()
+        assert jogo.fen() == fens[ply]
+    assert not jogo.desfazer()
+    for ply in range(1, len(LANCES) + 1):
+        assert jogo.refazer()
+        assert jogo.fen() == fens[ply]
+    assert not jogo.refazer()
+    assert jogo.registro.atual == len(jogo.registro) == len(LANCES)
+
+
+def test_ir_para():
+    jogo, fens = jogar()
+    for ply in (0, 15, 3, len(LANCES), 12, 12, 1):
+        jogo.ir_para(ply)
+        assert jogo.registro.atual == ply
+        assert jogo.fen() == fens[ply]
+        assert jogo.chaves[-1] == Xadrez.de_fen(fens[ply]).chave
+
+
+def test_lance_novo_descarta_o_que_podia_ser_refeito():
+    jogo, fens = jogar()
+    jogo.ir_para(4)
+    assert jogo.mover(*ler_coordenadas('b1c3')) is not None
+    assert len(jogo.registro) == jogo.registro.atual == 5
+    assert not jogo.refazer()
+    jogo.desfazer()
+    assert jogo.fen() == fens[4]
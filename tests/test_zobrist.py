@@ -0,0 +1,26 @@
+import random
+
+import pytest
+
+from perft import POSICOES, BACKENDS
+from pecas import PROMOCOES
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+@pytest.mark.parametrize('nome', ['inicial', 'kiwipete', 'posicao3', 'posicao4'])
+def test_chave_incremental(backend, nome):
+    # A chave mantida por make_move/unmake_move é a mesma de uma posição montada do zero
+    posicao = BACKENDS[backend](POSICOES[nome][0])
+    do_zero = type(posicao).de_posicao
+    sorteio = random.Random(nome)
+    for _ in range(40):
+        lances = list(posicao.legal_moves(posicao.vez, promocoes=PROMOCOES))
+        if not lances:
+            break
+        antes = posicao.chave
+        for lance in lances:
+            desfazer = posicao.make_move(*lance)
+            assert posicao.chave == do_zero(posicao.posicao()).chave, lance
+            posicao.unmake_move(desfazer)
+            assert posicao.chave == antes, lance
+        posicao.make_move(*sorteio.choice(lances))
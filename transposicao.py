@@ -0,0 +1,139 @@
+"""
+Tabela de transposição: memória de tamanho fixo de posições já analisadas, indexada pela chave Zobrist.
+
+Cada entrada ocupa 16 bytes num único buffer (chave, valor, lance, profundidade, tipo e idade), para que a tabela
+possa morar em memória compartilhada. As entradas vêm em baldes de duas: a primeira prefere a análise mais
+profunda, a segunda é sempre substituída.
+
+Na memória compartilhada vários processos leem e gravam a mesma entrada sem trava. Por isso a entrada guarda
+chave ^ dados em vez da chave: uma entrada rasgada (a chave de uma gravação com os dados de outra) não confere na
+leitura e conta como vazia, em vez de entregar o lance ou o valor de outra posição.
+"""
+import struct
+
+from pecas import PROMOCOES, Supreme
+
+EXATO, INFERIOR, SUPERIOR = 1, 2, 3  # Tipo do valor: exato, cota inferior (corte beta), cota superior
+
+ENTRADA = struct.Struct('<QQ')  # chave ^ dados, dados (ver _dados)
+BALDE = 2
+
+# Lance em 16 bits: origem (6) | destino (6) << 6 | promoção (3) << 12
+_PROMOCOES = (None, *PROMOCOES, Supreme)
+
+
+def _dados(valor, lance, profundidade, info):
+    # Os campos da entrada num inteiro de 64 bits: valor (16) | lance (16) << 16 | profundidade (8) << 32
+    # | tipo | idade << 2 (8) << 40, na mesma ordem de bytes de struct '<hHbB'
+    return valor & 0xFFFF | lance << 16 | (profundidade & 0xFF) << 32 | info << 40
+
+
+def _campos(dados):
+    """
+    :return: (valor, lance, profundidade, info) de _dados
+    """
+    valor, profundidade = dados & 0xFFFF, dados >> 32 & 0xFF
+    return (valor - 0x10000 if valor & 0x8000 else valor, dados >> 16 & 0xFFFF,
+            profundidade - 0x100 if profundidade & 0x80 else profundidade, dados >> 40 & 0xFF)
+
+
+def _ler(buffer, pos):
+    """
+    :return: (chave, valor, lance, profundidade, info); entradas vazias têm info 0
+    """
+    misturada, dados = ENTRADA.unpack_from(buffer, pos)
+    return (misturada ^ dados, *_campos(dados))
+
+
+def codificar(origem, destino, promocao=None):
+    return (origem[0] * 8 + origem[1]) | (destino[0] * 8 + destino[1]) << 6 | _PROMOCOES.index(promocao) << 12
+
+
+def decodificar(lance):
+    """
+    :return: (origem, destino, promocao) como em legal_moves, ou None para o lance vazio (0)
+    """
+    if not lance:
+        return None
+    origem, destino = lance & 63, lance >> 6 & 63
+    return (origem // 8, origem % 8), (destino // 8, destino % 8), _PROMOCOES[lance >> 12 & 7]
+
+
+class Transposicao:
+    def __init__(self, megabytes=16, buffer=None):
+        """
+        :param megabytes: Tamanho aproximado; o número de baldes é arredondado para baixo a uma potência de 2
+        :param buffer: Buffer gravável já alocado (por exemplo memória compartilhada); ignora megabytes
+        """
+        if buffer is None:
+            baldes = 1 << max(0, (megabytes * 2 ** 20 // (ENTRADA.size * BALDE)).bit_length() - 1)
+            buffer = bytearray(baldes * BALDE * ENTRADA.size)
+        self.buffer = memoryview(buffer).cast('B')
+        self.baldes = 1 << (len(self.buffer) // (ENTRADA.size * BALDE)).bit_length() - 1
+        self.idade = 0
+
+        self.acertos = 0
+        self.falhas = 0
+        self.gravacoes = 0
+        self.substituicoes = 0
+
+    def __len__(self):
+        return self.baldes * BALDE
+
+    def nova_busca(self):
+        """
+        Envelhece as entradas: as de buscas anteriores perdem a preferência por profundidade.
+        """
+        self.idade = (self.idade + 1) & 63
+
+    def limpar(self):
+        self.buffer[:] = bytes(len(self.buffer))
+        self.idade = 0
+
+    def buscar(self, chave):
+        """
+        :return: (valor, lance, profundidade, tipo) ou None
+        """
+        inicio = (chave & (self.baldes - 1)) * BALDE * ENTRADA.size
+        for pos in range(inicio, inicio + BALDE * ENTRADA.size, ENTRADA.size):
+            misturada, dados = ENTRADA.unpack_from(self.buffer, pos)
+            if misturada ^ dados == chave and dados:
+                valor, lance, profundidade, info = _campos(dados)
+                self.acertos += 1
+                return valor, lance, profundidade, info & 3
+        self.falhas += 1
+        return None
+
+    def gravar(self, chave, valor, lance, profundidade, tipo):
+        """
+        :param lance: Melhor lance já codificado (ver codificar), 0 se não houver
+        """
+        inicio = (chave & (self.baldes - 1)) * BALDE * ENTRADA.size
+        guardada, _, antigo, prof_antiga, info = _ler(self.buffer, inicio)
+        if guardada == chave or not info or profundidade >= prof_antiga or info >> 2 != self.idade:
+            pos = inicio  # Preferência por profundidade
+            if guardada == chave and not lance:
+                lance = antigo
+        else:
+            pos = inicio + ENTRADA.size  # Sempre substitui
+            guardada, _, antigo, _, info = _ler(self.buffer, pos)
+            if guardada == chave and not lance:
+                lance = antigo
+        if info and guardada != chave:
+            self.substituicoes += 1
+        self.gravacoes += 1
+        dados = _dados(valor, lance, profundidade, tipo | self.idade << 2)
+        ENTRADA.pack_into(self.buffer, pos, chave ^ dados, dados)
+
+    def estatisticas(self):
+        usadas = sum(1 for pos in range(0, len(self.buffer), ENTRADA.size) if self.buffer[pos + 13])
+        consultas = self.acertos + self.falhas
+        return {
+            'entradas': len(self),
+            'ocupacao': usadas / len(self),
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            'gravacoes': self.gravacoes,
+            'substituicoes': self.substituicoes,
+        }
@@ -0,0 +1,243 @@
+"""
+Protocolo UCI, para jogar em interfaces e gerenciadores de torneio (cutechess e afins):
+
+    python main.py --uci
+
+A busca roda numa thread à parte sobre um Bitboard, então a entrada continua sendo lida enquanto o motor pensa:
+`isready` responde na hora e `stop` interrompe a busca no próximo nó. O `position` de cada lance costuma repetir a
+partida inteira; só os lances novos são aplicados, com make_move, sobre a posição que já está montada.
+"""
+import sys
+import threading
+import traceback
+from time import perf_counter
+
+from bitboard import Bitboard
+from busca import Busca, MATE, MAX_PLY, VERIFICAR
+from notacao import ler_coordenadas
+from perft import coordenadas
+from regras import Xadrez
+from transposicao import Transposicao
+
+NOME = 'Xadrez'
+AUTOR = 'Rafael Setton'
+MARGEM_MS = 5  # Folga para a ida e volta com a interface; a da busca vem de Busca.passo (ver __margem)
+PASSO_INICIAL = VERIFICAR / 20000  # Segundos entre consultas ao relógio antes da primeira medição
+LANCES_RESTANTES = 30  # Lances estimados até o fim da partida quando o `go` não traz movestogo
+PARAMETROS_GO = ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'movetime', 'nodes', 'depth')
+
+
+class Motor:
+    def __init__(self, saida=None, megabytes=16):
+        """
+        :param saida: Arquivo de texto das respostas (padrão: stdout)
+        :param megabytes: Tamanho da tabela de transposição
+        """
+        self.saida = saida or sys.stdout
+        self.busca = Busca(Transposicao(megabytes))
+        self.busca.parada = threading.Event()  # Cobre o stop que chega antes de best_move zerar `parar`
+        self.busca.informar = self.__informar
+        self.busca.passo = PASSO_INICIAL
+        self.posicao = None
+        self.__base = None  # 'startpos' ou a FEN do último `position`
+        self.__lances = []  # Lances em texto já aplicados sobre a base
+        self.__historico = []  # Chaves Zobrist da partida, para a busca reconhecer repetições
+        self.__pensador = None  # Thread da busca em andamento
+        self.__liberar = threading.Event()  # Libera o bestmove de um `go ponder` ou `go infinite`
+        self.__ponder_ms = None  # Tempo da busca quando o ponderhit chegar
+        self.__inicio = 0.0
+        self.__variante = []
+        self.__escrita = threading.Lock()
+        self.__comandos = {
+            'uci': self.__uci,
+            'isready': lambda _: self.escrever('readyok'),
+            'ucinewgame': self.__nova,
+            'setoption': self.__opcao,
+            'position': self.__posicao,
+            'go': self.__go,
+            'stop': lambda _: self.parar(),
+            'ponderhit': self.__ponderhit,
+        }
+        self.posicionar('startpos')
+
+    def escrever(self, linha):
+        with self.__escrita:
+            self.saida.write(linha + '\n')
+            self.saida.flush()
+
+    def comando(self, linha):
+        """
+        Trata uma linha da interface.
+        :return: False no `quit`
+        """
+        palavras = linha.split()
+        if not palavras:
+            return True
+        if palavras[0] == 'quit':
+            self.parar()
+            return False
+        tratar = self.__comandos.get(palavras[0])
+        if tratar is not None:
+            tratar(palavras[1:])
+        return True
+
+    def laco(self, entrada=None):
+        entrada = entrada or sys.stdin
+        for linha in iter(entrada.readline, ''):
+            if not self.comando(linha):
+                break
+        self.parar()
+
+    # Comandos
+
+    def __uci(self, _):
+        self.escrever(f'id name {NOME}')
+        self.escrever(f'id author {AUTOR}')
+        self.escrever('option name Hash type spin default 16 min 1 max 1024')
+        self.escrever('option name Ponder type check default false')
+        self.escrever('uciok')
+
+    def __nova(self, _):
+        self.parar()
+        self.busca.tt.limpar()
+        self.busca.tabela_historico.clear()
+        self.posicionar('startpos')
+
+    def __opcao(self, palavras):
+        # setoption name <nome> value <valor>
+        if 'value' not in palavras:
+            return
+        nome = ' '.join(palavras[1:palavras.index('value')]).lower()
+        valor = ' '.join(palavras[palavras.index('value') + 1:])
+        if nome == 'hash':
+            self.parar()
+            self.busca.tt = Transposicao(max(1, int(valor)))
+
+    def __posicao(self, palavras):
+        # position startpos | fen <6 campos> [moves <lance> ...]
+        if 'moves' in palavras:
+            fim = palavras.index('moves')
+            lances = palavras[fim + 1:]
+        else:
+            fim, lances = len(palavras), []
+        base = 'startpos' if palavras[0] == 'startpos' else ' '.join(palavras[1:fim])
+        self.posicionar(base, lances)
+
+    def posicionar(self, base, lances=()):
+        """
+        Monta `base` ('startpos' ou FEN) com os lances em coordenadas. Quando a base é a mesma e a lista só
+        acrescenta lances à anterior, aplica apenas os novos.
+        """
+        self.parar()
+        feitos = len(self.__lances)
+        if base != self.__base or list(lances[:feitos]) != self.__lances:
+            jogo = Xadrez.inicial() if base == 'startpos' else Xadrez.de_fen(base)
+            self.posicao = Bitboard.de_xadrez(jogo)
+            self.__base = base
+            self.__lances = []
+            self.__historico = [self.posicao.chave]
+            feitos = 0
+        for texto in lances[feitos:]:
+            self.posicao.make_move(*ler_coordenadas(texto))
+            self.__lances.append(texto)
+            self.__historico.append(self.posicao.chave)
+
+    def __go(self, palavras):
+        self.parar()
+        opcoes = {}
+        for i, palavra in enumerate(palavras[:-1]):
+            if palavra in PARAMETROS_GO:
+                opcoes[palavra] = int(palavras[i + 1])
+        ponder = 'ponder' in palavras
+        infinito = 'infinite' in palavras
+        tempo = None if infinito else self.__orcamento(opcoes)
+        self.__ponder_ms = tempo if ponder else None
+        self.__liberar.clear()
+        if not (ponder or infinito):
+            self.__liberar.set()
+        self.busca.parada.clear()
+        self.__pensador = threading.Thread(target=self.__pensar, daemon=True,
+                                           args=(None if ponder else tempo, opcoes.get('depth', MAX_PLY),
+                                                 opcoes.get('nodes')))
+        self.__pensador.start()
+
+    def __ponderhit(self, _):
+        # O adversário jogou o lance esperado: a busca continua, agora com o relógio valendo
+        self.busca.limitar(self.__ponder_ms)
+        self.__liberar.set()
+
+    def parar(self):
+        """
+        Interrompe a busca em andamento (que ainda manda o seu bestmove) e espera a thread terminar.
+        """
+        if self.__pensador is None:
+            return
+        self.busca.parar = True
+        self.busca.parada.set()
+        self.__liberar.set()
+        self.__pensador.join()
+        self.__pensador = None
+
+    # Busca
+
+    def __orcamento(self, opcoes):
+        """
+        Milissegundos para este lance: movetime, ou uma fração do relógio mais o incremento; None sem limite.
+        """
+        if 'movetime' in opcoes:
+            return max(1, opcoes['movetime'] - self.__margem())
+        cor = 'w' if self.posicao.vez == 'B' else 'b'
+        restante = opcoes.get(cor + 'time')
+        if restante is None:
+            return None
+        incremento = opcoes.get(cor + 'inc', 0)
+        tempo = restante / max(1, opcoes.get('movestogo', LANCES_RESTANTES)) + incremento * 3 / 4
+        return int(max(1, min(tempo, restante - self.__margem())))
+
+    def __margem(self):
+        """
+        Milissegundos reservados além do tempo da busca: a ida e volta com a interface e o quanto a busca pode passar
+        do limite, que é o intervalo medido entre as suas consultas ao relógio (com folga para uma consulta a mais).
+        """
+        return MARGEM_MS + 2 * self.busca.passo * 1000
+
+    def __pensar(self, tempo, profundidade, nos):
+        self.__inicio = perf_counter()
+        self.__variante = []
+        lance = None
+        try:
+            lance = self.busca.best_move(self.posicao, tempo, profundidade, nos, historico=self.__historico)
+        except Exception as erro:
+            # A interface espera um bestmove de todo `go`; sem ele ficaria parada para sempre
+            traceback.print_exc()
+            self.escrever(f'info string erro na busca: {erro!r}')
+        finally:
+            self.__liberar.wait()  # go ponder / go infinite só respondem depois do stop ou do ponderhit
+            if lance is None:
+                self.escrever('bestmove 0000')
+            else:
+                texto = f'bestmove {coordenadas(*lance)}'
+                if len(self.__variante) > 1 and self.__variante[0] == lance:
+                    texto += f' ponder {coordenadas(*self.__variante[1])}'
+                self.escrever(texto)
+
+    def __informar(self, busca, posicao):
+        segundos = perf_counter() - self.__inicio
+        self.__variante = busca.variante(posicao, busca.profundidade)
+        if abs(busca.valor) >= MATE - MAX_PLY:
+            lances = (MATE - abs(busca.valor) + 1) // 2
+            pontos = f'mate {lances if busca.valor > 0 else -lances}'
+        else:
+            pontos = f'cp {busca.valor}'
+        self.escrever(f'info depth {busca.profundidade} score {pontos} nodes {busca.nos} '
+                      f'nps {int(busca.nos / segundos) if segundos else 0} time {int(segundos * 1000)} '
+                      f'pv {" ".join(coordenadas(*lance) for lance in self.__variante)}')
+
+
+def main(argv=None):
+    Motor().laco()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
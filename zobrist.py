@@ -0,0 +1,41 @@
+"""
+Chaves Zobrist: um número aleatório de 64 bits por (peça, cor, casa), pela vez, por combinação de direitos de roque
+e por coluna de en passant. A chave de uma posição é o XOR das chaves do que está nela, então um lance só precisa
+desfazer e refazer os termos que mudou.
+
+As chaves saem de um gerador com semente fixa: a mesma posição tem a mesma chave em toda execução.
+"""
+from random import Random
+
+from pecas import *
+
+_gerador = Random(0x5EED_C4E55)
+
+# PECAS[classe][cor][casa]
+PECAS = {classe: {cor: [_gerador.getrandbits(64) for _ in range(64)] for cor in ('B', 'P')}
+         for classe in (Peao, Cavalo, Bispo, Torre, Rainha, Rei, Supreme)}
+VEZ = _gerador.getrandbits(64)  # Entra quando as pretas jogam
+_ROQUES = [_gerador.getrandbits(64) for _ in range(4)]
+PASSANT = [_gerador.getrandbits(64) for _ in range(8)]  # Por coluna
+
+# Direitos de roque como bits: 1 = brancas curto, 2 = brancas longo, 4 = pretas curto, 8 = pretas longo
+# (bit, cor, linha, coluna da torre)
+DIREITOS = ((1, 'B', 7, 7), (2, 'B', 7, 0), (4, 'P', 0, 7), (8, 'P', 0, 0))
+
+
+def _roque(direitos):
+    chave = 0
+    for i, parcela in enumerate(_ROQUES):
+        if direitos >> i & 1:
+            chave ^= parcela
+    return chave
+
+
+ROQUE = [_roque(direitos) for direitos in range(16)]
+
+
+def chave_pecas(pecas):
+    chave = 0
+    for peca in pecas:
+        chave ^= PECAS[type(peca)][peca.cor][peca.x * 8 + peca.y]
+    return chave